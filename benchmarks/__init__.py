@@ -0,0 +1,7 @@
+"""
+cckw_tools 的性能基准。
+
+各模块中的类沿用 asv 的写法（params / param_names / setup，
+time_* 记录耗时，peakmem_* 记录峰值内存），用 python -m benchmarks.run 运行，
+结果按提交追加到 benchmarks/results/ 中，便于对比历史、发现性能回退。
+"""
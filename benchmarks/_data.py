@@ -0,0 +1,53 @@
+import os
+import numpy as np
+import xarray as xr
+from typing import Tuple
+from cckw_tools.synthetic import SyntheticPrecip
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def equatorial_grid(nlon: int, nlat: int = 13) -> Tuple[np.ndarray, np.ndarray]:
+    """关于赤道对称的 (-15, 15) 纬度和等间距经度。"""
+    return np.linspace(-15, 15, nlat), np.arange(nlon) * 360. / nlon
+
+
+def daily_precip(ntime: int, nlon: int, nlat: int = 13, seed: int = 0) -> xr.DataArray:
+    """
+    (time, lat, lon) 的合成日降水（cckw_tools.synthetic：红噪声 + 已知 Kelvin 波），
+    只用于计时。
+    """
+    lat, lon = equatorial_grid(nlon, nlat)
+    return SyntheticPrecip(lat, lon, ntime, seed=seed).to_dataarray()
+
+
+def spectra_cube(nmodel: int, nfreq: int = 48, nwn: int = 41, seed: int = 0) -> xr.DataArray:
+    """(model, frequency, wavenumber) 的合成谱，第一个模式名为 'GPCP'。"""
+    rng = np.random.default_rng(seed)
+    models = ['GPCP'] + [f'model{i:02d}' for i in range(1, nmodel)]
+    freq = np.linspace(1. / 96, 0.5, nfreq)
+    wn = np.arange(nwn) - nwn // 2
+    data = 1. + rng.gamma(2., 0.2, size=(nmodel, nfreq, nwn))
+    return xr.DataArray(data, coords={'model': models, 'frequency': freq, 'wavenumber': wn},
+                        dims=('model', 'frequency', 'wavenumber'), name='psumsym')
+
+
+def std_fields(nmodel: int, nlon: int, nlat: int = 31, seed: int = 0) -> Tuple[xr.DataArray, xr.DataArray]:
+    """(model, lat, lon) 的合成标准差场和参考场。"""
+    rng = np.random.default_rng(seed)
+    lat = np.linspace(-15, 15, nlat)
+    lon = np.arange(nlon) * 360. / nlon
+    ref = xr.DataArray(rng.gamma(2., 1., size=(nlat, nlon)), coords={'lat': lat, 'lon': lon}, dims=('lat', 'lon'))
+    noise = rng.normal(0., 0.5, size=(nmodel, nlat, nlon))
+    fields = xr.DataArray(ref.values[None] + noise, dims=('model', 'lat', 'lon'),
+                          coords={'model': [f'model{i:02d}' for i in range(nmodel)], 'lat': lat, 'lon': lon})
+    return fields, ref
+
+
+def observed_spectrum() -> xr.DataArray:
+    """data/all_wk_spectra.nc 中 GPCP 的 psumsym；文件不存在时抛出 NotImplementedError（跳过该基准）。"""
+    path = os.path.join(DATA_DIR, 'all_wk_spectra.nc')
+    if not os.path.exists(path):
+        raise NotImplementedError(f'{path} not found')
+    with xr.open_dataset(path) as ds:
+        return ds['psumsym'].sel(model='GPCP').load()
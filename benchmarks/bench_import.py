@@ -0,0 +1,33 @@
+import textwrap
+
+
+class Import:
+    """在新解释器中导入 cckw_tools 及其子模块的耗时；计算进程不应为绘图依赖付费。"""
+    timeout = 120
+
+    def timeraw_package(self):
+        return 'import cckw_tools'
+
+    def timeraw_compute(self):
+        return textwrap.dedent('''
+            from cckw_tools.kelvin_filter import kelvin_filter
+            from cckw_tools.streaming import stream_stats
+            from cckw_tools.regrid import regrid_conservative
+        ''')
+
+    def timeraw_plotting(self):
+        return textwrap.dedent('''
+            from cckw_tools import plot_space_data, SpectrumPlotter
+        ''')
+
+    def timeraw_worker_pool(self):
+        # spawn 启动的 worker 会重新导入任务函数所在模块（这里与 stream_stats 的 worker 相同），
+        # 计时为 2 个 worker 启动并各完成一个任务
+        return textwrap.dedent('''
+            import multiprocessing
+            import numpy as np
+            from concurrent.futures import ProcessPoolExecutor
+            from cckw_tools.streaming import season_index
+            with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context('spawn')) as pool:
+                list(pool.map(season_index, [np.arange(12)] * 2))
+        ''')
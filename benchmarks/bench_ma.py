@@ -0,0 +1,63 @@
+from cckw_tools import ma
+from cckw_tools.utils import get_curve
+
+
+class ClosedFormModes:
+    """ma 中有解析式的 Kelvin、MRG、EIG(n=0) 模态。"""
+    params = ([100, 500, 2000],)
+    param_names = ['n_wn']
+
+    def time_kelvin_mode(self, n_wn):
+        ma.kelvin_mode(25, max_wn=20, n_wn=n_wn)
+
+    def time_mrg_mode(self, n_wn):
+        ma.mrg_mode(25, max_wn=20, n_wn=n_wn)
+
+    def time_eig_n_0(self, n_wn):
+        ma.eig_n_0(25, max_wn=20, n_wn=n_wn)
+
+
+class SolvedModes:
+    """ma 中需要求根的 ER、WIG、EIG 模态。"""
+    params = ([100, 500, 2000], ['fsolve', 'analytic'])
+    param_names = ['n_wn', 'solver']
+
+    def time_er_n(self, n_wn, solver):
+        ma.er_n(25, 1, max_wn=20, n_wn=n_wn, solver=solver)
+
+    def time_wig_n(self, n_wn, solver):
+        ma.wig_n(25, 1, max_wn=20, n_wn=n_wn, solver=solver)
+
+    def time_eig_n(self, n_wn, solver):
+        ma.eig_n(25, 1, max_wn=20, n_wn=n_wn, solver=solver)
+
+    def peakmem_er_n(self, n_wn, solver):
+        ma.er_n(25, 1, max_wn=20, n_wn=n_wn, solver=solver)
+
+
+class MatsunoModes:
+    """matsuno_modes_wk（不走缓存）与 matsuno_modes_array。"""
+    params = ([[25], [8, 25, 90], [8, 12, 25, 50, 90]], [500, 2000])
+    param_names = ['he', 'n_wn']
+
+    def time_matsuno_modes_wk(self, he, n_wn):
+        ma.matsuno_modes_wk(he=he, n=[1, 2, 3], max_wn=20, n_wn=n_wn, cache=False)
+
+    def time_matsuno_modes_wk_analytic(self, he, n_wn):
+        ma.matsuno_modes_wk(he=he, n=[1, 2, 3], max_wn=20, n_wn=n_wn, solver='analytic', cache=False)
+
+    def time_matsuno_modes_array(self, he, n_wn):
+        ma.matsuno_modes_array(he=he, n=[1, 2, 3], max_wn=20, n_wn=n_wn)
+
+    def peakmem_matsuno_modes_array(self, he, n_wn):
+        ma.matsuno_modes_array(he=he, n=[1, 2, 3], max_wn=20, n_wn=n_wn)
+
+
+class Curve:
+    """utils.get_curve 的 Kelvin 波带包络。"""
+
+    def time_get_curve(self):
+        get_curve()
+
+    def time_get_curve_custom(self):
+        get_curve(he=[12, 25, 50], fmax=[0.4, 0.45, 0.5])
@@ -0,0 +1,64 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib import colors
+import numpy as np
+from cckw_tools.SpectrumPlotter import SpectrumPlotter
+from cckw_tools.TaylorDiagram import TaylorDiagram
+from ._data import observed_spectrum
+
+
+class PlotCmipFuture:
+    """plot_cmip_future 从建图到 Agg 画布绘制完成的完整耗时（与 Fig_all.ipynb 中 fig0 的参数相同）。"""
+    params = ([False, True],)
+    param_names = ['labels']
+    timeout = 120
+
+    def setup(self, labels):
+        self.obs = observed_spectrum()
+        self.norm = colors.BoundaryNorm((0., 1, 1.2, 1.4, 1.6, 1.8, 2, 2.2), 7)
+
+    def _plot(self, labels):
+        plotter = SpectrumPlotter(cpd_lines=[3, 6, 30], norm=self.norm)
+        plotter.plot_cmip_future([self.obs], self.obs.wavenumber, self.obs.frequency,
+                                 figsize=(6, 6), text_size=14, contour_range=[0., 2., 0.4],
+                                 min_contour_range_lines=1., matsuno_lines=True, meridional_modes=[1],
+                                 max_freq_plot=0.5, cmap='YlOrRd', he=[90, 25, 8], max_wn_plot=15,
+                                 freq_lines=True, labels=labels)
+        fig = plt.gcf()
+        fig.canvas.draw()
+        plt.close(fig)
+
+    def time_plot_cmip_future(self, labels):
+        self._plot(labels)
+
+    def peakmem_plot_cmip_future(self, labels):
+        self._plot(labels)
+
+    def teardown(self, labels):
+        plt.close('all')
+
+
+class TaylorSamples:
+    """泰勒图上绘制大量样本点（模式 × 季节 × 区域）并完成 Agg 绘制。"""
+    params = ([168, 1344],)
+    param_names = ['npoint']
+
+    def setup(self, npoint):
+        rng = np.random.default_rng(0)
+        self.std = rng.uniform(0.5, 1.5, npoint)
+        self.corr = rng.uniform(0.3, 0.99, npoint)
+        self.markers = ['$%d$' % (i % 42 + 1) for i in range(npoint)]
+        self.colors = np.where(np.arange(npoint) % 2, 'red', 'blue')
+
+    def time_add_samples(self, npoint):
+        fig = plt.figure(figsize=(10, 8))
+        dia = TaylorDiagram(1., fig, rect=111, label='Obs', srange=(0., 1.8))
+        dia.add_samples(self.std, self.corr, markers=self.markers, colors=self.colors, sizes=64)
+        dia.add_grid()
+        dia.add_contours()
+        fig.canvas.draw()
+        plt.close(fig)
+
+    def teardown(self, npoint):
+        plt.close('all')
@@ -0,0 +1,29 @@
+import numpy as np
+import xarray as xr
+from cckw_tools.regrid import RegridCache, conservative_matrix, regrid_conservative
+from cckw_tools.synthetic import synthetic_grid
+
+
+class Regrid:
+    """CMIP6 原始网格（约 1.25°，非等距纬度）守恒插值到 2x2：权重计算与按时间块应用。"""
+    params = ([96, 192], [365, 3650])
+    param_names = ['nlat', 'ntime']
+
+    def setup(self, nlat, ntime):
+        rng = np.random.default_rng(0)
+        lat = np.sort(np.concatenate([[-89.], rng.uniform(-88, 88, nlat - 2), [89.]]))
+        lon = np.arange(2 * nlat) * 180. / nlat
+        self.src = xr.DataArray(rng.random((ntime, nlat, 2 * nlat), dtype=np.float32),
+                                dims=('time', 'lat', 'lon'), coords={'lat': lat, 'lon': lon})
+        self.target = synthetic_grid(2., 90.)
+        self.cache = RegridCache()
+        self.cache.get(self.src, self.target)
+
+    def time_weights(self, nlat, ntime):
+        conservative_matrix(self.src, self.target)
+
+    def time_regrid(self, nlat, ntime):
+        regrid_conservative(self.src, self.target, cache=self.cache)
+
+    def peakmem_regrid(self, nlat, ntime):
+        regrid_conservative(self.src, self.target, cache=self.cache)
@@ -0,0 +1,128 @@
+import numpy as np
+from cckw_tools.wk_spectrum import wk_spectrum
+from cckw_tools.kelvin_filter import kelvin_filter
+from cckw_tools.skill import field_skill, spectral_skill, taylor_stats
+from cckw_tools.synthetic import SyntheticPrecip, synthetic_grid
+from cckw_tools.regions import RegionIndex
+from cckw_tools.events import detect_events, equatorial_hovmoller
+from ._data import daily_precip, spectra_cube, std_fields
+
+
+class Spectrum:
+    """wk_spectrum 在不同经度分辨率和时间长度下的耗时与内存。"""
+    params = ([72, 144], [730, 3650])
+    param_names = ['nlon', 'ntime']
+
+    def setup(self, nlon, ntime):
+        self.data = daily_precip(ntime, nlon)
+
+    def time_wk_spectrum(self, nlon, ntime):
+        wk_spectrum(self.data)
+
+    def peakmem_wk_spectrum(self, nlon, ntime):
+        wk_spectrum(self.data)
+
+
+class KelvinFilter:
+    """kelvin_filter 在不同网格和时间长度下的耗时与内存。"""
+    params = ([72, 144], [730, 3650])
+    param_names = ['nlon', 'ntime']
+
+    def setup(self, nlon, ntime):
+        self.data = daily_precip(ntime, nlon, nlat=31)
+
+    def time_kelvin_filter(self, nlon, ntime):
+        kelvin_filter(self.data)
+
+    def peakmem_kelvin_filter(self, nlon, ntime):
+        kelvin_filter(self.data)
+
+
+class SpectralSkill:
+    """多模式 WK 谱技巧评分。"""
+    params = ([10, 42, 200],)
+    param_names = ['nmodel']
+
+    def setup(self, nmodel):
+        self.psumsym = spectra_cube(nmodel)
+
+    def time_spectral_skill(self, nmodel):
+        spectral_skill(self.psumsym)
+
+    def peakmem_spectral_skill(self, nmodel):
+        spectral_skill(self.psumsym)
+
+
+class FieldSkill:
+    """多模式空间场技巧评分（面积加权）。"""
+    params = ([10, 42], [144, 720])
+    param_names = ['nmodel', 'nlon']
+
+    def setup(self, nmodel, nlon):
+        self.fields, self.reference = std_fields(nmodel, nlon)
+
+    def time_field_skill(self, nmodel, nlon):
+        field_skill(self.fields, self.reference, area_weighted=True)
+
+    def peakmem_field_skill(self, nmodel, nlon):
+        field_skill(self.fields, self.reference, area_weighted=True)
+
+
+class TaylorStats:
+    """模式 × 季节 × 区域的泰勒图统计量（一次计算）。"""
+    params = ([10, 42], [1, 8])
+    param_names = ['nmodel', 'nregion']
+
+    def setup(self, nmodel, nregion):
+        fields, ref = std_fields(nmodel, 144)
+        seasons = {'season': ['DJF', 'JJA', 'MAM', 'SON']}
+        self.fields = fields.expand_dims(seasons, axis=1).copy()
+        self.reference = ref.expand_dims(seasons).copy()
+        self.regions = {f'r{i}': (-10., 10., 45. * i, 45. * i + 60.) for i in range(nregion)}
+
+    def time_taylor_stats(self, nmodel, nregion):
+        taylor_stats(self.fields, self.reference, self.regions)
+
+
+class RegionReduce:
+    """季节标准差场（模式 × 季节）在多个区域上的面积加权平均。"""
+    params = ([8, 64],)
+    param_names = ['nregion']
+
+    def setup(self, nregion):
+        fields, _ = std_fields(42, 180)
+        self.values = np.repeat(fields.values[:, None], 4, axis=1)
+        boxes = {f'r{i}': (-10., 10., (360. / nregion * i - 20.) % 360., (360. / nregion * i + 40.) % 360.)
+                 for i in range(nregion)}
+        self.index = RegionIndex(fields.lat.values, fields.lon.values, boxes)
+
+    def time_reduce(self, nregion):
+        self.index.reduce(self.values)
+
+
+class Events:
+    """赤道 Hovmöller 上的 Kelvin 波事件识别与追踪（不含读数和滤波）。"""
+    params = ([2., 1.], [4, 18])
+    param_names = ['resolution', 'years']
+
+    def setup(self, resolution, years):
+        lat, lon = synthetic_grid(resolution, 10.)
+        data = SyntheticPrecip(lat, lon, 365 * years, seed=0).to_dataarray()
+        self.hov = equatorial_hovmoller(kelvin_filter(data))
+
+    def time_detect_events(self, resolution, years):
+        detect_events(self.hov)
+
+
+class Synthetic:
+    """合成日降水的生成速度（不含写盘）。"""
+    params = ([2., 1.], [1, 10])
+    param_names = ['resolution', 'years']
+
+    def setup(self, resolution, years):
+        lat, lon = synthetic_grid(resolution, 30.)
+        self.gen = SyntheticPrecip(lat, lon, 365 * years)
+
+    def time_generate(self, resolution, years):
+        for _ in self.gen.chunks():
+            pass
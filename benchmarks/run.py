@@ -0,0 +1,202 @@
+"""
+运行 benchmarks 中的基准并记录结果：
+
+    python -m benchmarks.run                  # 全部基准
+    python -m benchmarks.run -b Spectrum      # 名称包含 Spectrum 的基准
+    python -m benchmarks.run --compare        # 与上一次结果对比，标出变慢/变大的项
+
+time_* 记录多次调用中的最短和中位耗时（秒），peakmem_* 用 tracemalloc 记录
+调用期间的峰值分配（字节，numpy 数组计入在内），timeraw_* 返回一段代码，
+每次在新的解释器中执行并计时（用于导入耗时等只在冷启动时出现的开销）。每次运行写入
+benchmarks/results/<时间>-<提交>.json。
+"""
+import os
+import sys
+import json
+import time
+import socket
+import inspect
+import argparse
+import itertools
+import importlib
+import platform
+import statistics
+import subprocess
+import tracemalloc
+from typing import Dict, Iterator, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, 'results')
+
+
+def discover(pattern: Optional[str] = None) -> Iterator[Tuple[str, type, str]]:
+    """按模块/类/方法顺序产出 (模块.类, 类, 方法名)，方法名以 time_、timeraw_ 或 peakmem_ 开头。"""
+    for f in sorted(os.listdir(HERE)):
+        if not (f.startswith('bench_') and f.endswith('.py')):
+            continue
+        module = importlib.import_module(f'benchmarks.{f[:-3]}')
+        for cls_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            for name in sorted(vars(cls)):
+                if name.startswith(('time_', 'timeraw_', 'peakmem_')):
+                    full = f'{f[6:-3]}.{cls_name}.{name}'
+                    if pattern is None or pattern in full:
+                        yield full, cls, name
+
+
+def param_sets(cls: type) -> List[tuple]:
+    params = getattr(cls, 'params', None)
+    if params is None:
+        return [()]
+    return list(itertools.product(*params))
+
+
+def _call(obj, name: str, args: tuple) -> None:
+    method = getattr(obj, name, None)
+    if method is not None:
+        method(*args)
+
+
+_RAW_TIMER = '''
+import sys, time
+code = sys.stdin.read()
+t0 = time.perf_counter()
+exec(compile(code, '<timeraw>', 'exec'), {'__name__': '__main__'})
+print(time.perf_counter() - t0)
+'''
+
+
+def measure_raw(code: str, repeat: int) -> Dict[str, float]:
+    """在 repeat 个新的解释器中分别执行 code，只计 exec 本身的耗时（不含解释器启动）。"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.dirname(HERE), env.get('PYTHONPATH')]))
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', _RAW_TIMER], input=code, env=env,
+                             capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return {'min': min(times), 'median': statistics.median(times), 'n': len(times)}
+
+
+def measure(cls: type, name: str, args: tuple, repeat: int, min_time: float) -> Dict[str, float]:
+    """对一组参数运行一个基准，setup 抛出 NotImplementedError 时返回 None（跳过）。"""
+    obj = cls()
+    try:
+        _call(obj, 'setup', args)
+    except NotImplementedError:
+        return None
+    func = getattr(obj, name)
+    try:
+        if name.startswith('timeraw_'):
+            return measure_raw(func(*args), repeat)
+        func(*args)  # 预热：首次调用的导入、缓存等不计入
+        if name.startswith('peakmem_'):
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return {'peakmem': peak}
+        times = []
+        start = time.perf_counter()
+        while len(times) < repeat or (time.perf_counter() - start < min_time and len(times) < 100):
+            t0 = time.perf_counter()
+            func(*args)
+            times.append(time.perf_counter() - t0)
+        return {'min': min(times), 'median': statistics.median(times), 'n': len(times)}
+    finally:
+        _call(obj, 'teardown', args)
+
+
+def _commit() -> str:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True, text=True)
+        return out.stdout.strip() or 'unknown'
+    except OSError:
+        return 'unknown'
+
+
+def _format(result: dict) -> str:
+    if 'peakmem' in result:
+        return f"{result['peakmem'] / 2 ** 20:9.1f} MiB"
+    t = result['min']
+    return f'{t * 1e3:9.2f} ms' if t < 1 else f'{t:9.2f} s '
+
+
+def latest_results(machine: str, exclude: Optional[str] = None) -> Optional[dict]:
+    """本机最近一次保存的结果。"""
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    for f in sorted(os.listdir(RESULTS_DIR), reverse=True):
+        path = os.path.join(RESULTS_DIR, f)
+        if f.endswith('.json') and path != exclude:
+            with open(path) as fh:
+                data = json.load(fh)
+            if data.get('machine') == machine:
+                return data
+    return None
+
+
+def compare(new: dict, old: dict, factor: float) -> List[str]:
+    """列出相对 old 变慢或峰值内存变大超过 factor 倍的基准。"""
+    worse = []
+    for key, res in new['results'].items():
+        prev = old['results'].get(key)
+        if prev is None:
+            continue
+        metric = 'peakmem' if 'peakmem' in res else 'min'
+        if prev.get(metric) and res[metric] / prev[metric] > factor:
+            worse.append(f'{key}: {_format(prev).strip()} -> {_format(res).strip()} '
+                         f'(x{res[metric] / prev[metric]:.2f})')
+    return worse
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-b', '--bench', help='只运行名称中包含该字符串的基准')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='time_* 至少重复的次数，默认 3')
+    parser.add_argument('--min-time', type=float, default=0.2, help='time_* 至少累计的秒数，默认 0.2')
+    parser.add_argument('--compare', action='store_true', help='与本机上一次结果对比')
+    parser.add_argument('--factor', type=float, default=1.2, help='判定回退的倍数，默认 1.2')
+    parser.add_argument('--no-save', action='store_true', help='不写入 results/')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(HERE))
+    machine = socket.gethostname()
+    record = {'commit': _commit(), 'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'machine': machine,
+              'python': platform.python_version(), 'cpu_count': os.cpu_count(), 'results': {}}
+
+    for full, cls, name in discover(args.bench):
+        for params in param_sets(cls):
+            key = f"{full}({', '.join(map(repr, params))})" if params else full
+            result = measure(cls, name, params, args.repeat, args.min_time)
+            if result is None:
+                print(f'{key:<70} skipped')
+                continue
+            record['results'][key] = result
+            print(f'{key:<70} {_format(result)}', flush=True)
+
+    path = None
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{record['date'].replace(':', '')}-{record['commit']}.json")
+        with open(path, 'w') as fh:
+            json.dump(record, fh, indent=1)
+        print(f'Results saved at: {path}')
+
+    if args.compare:
+        old = latest_results(machine, exclude=path)
+        if old is None:
+            print('No previous results to compare with')
+            return 0
+        worse = compare(record, old, args.factor)
+        print(f"Compared with {old['commit']} ({old['date']}): {len(worse)} regression(s)")
+        for line in worse:
+            print('  ' + line)
+        return 1 if worse else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
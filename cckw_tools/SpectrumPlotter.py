@@ -3,9 +3,11 @@ from matplotlib import gridspec
 import matplotlib.pyplot as plt
 import numpy as np
 import xarray as xr
-from cckw_tools.utils import filter_series, save_figure
+from cckw_tools.utils import save_figure
 from cckw_tools import ma as mp
-from cckw_tools.utils import get_curve
+from cckw_tools.render import render_panels
+from cckw_tools.overlay import get_overlay
+from cckw_tools.profiling import profiled
 
 class SpectrumPlotter:
     def __init__(self,  cpd_lines,norm=None):
@@ -52,6 +54,7 @@ class SpectrumPlotter:
             ax.text(right+9.9, 0.2 * (bottom+top),'h=8', ha="center",va="center",size=text_size-6,
                     bbox={'facecolor':'w','alpha':0.9,'edgecolor':'none'})
             
+    @profiled('figure')
     def plot_cmip_future(self, cmip_f,wn,fq, figsize=None, text_size=12, contour_range=[1, 2, 0.1], he=[90, 25, 8],
                       min_contour_range_lines=1.1, matsuno_lines=True, meridional_modes=[1], cmap = 'bwr',
                       max_freq_plot=None, max_wn_plot=None, freq_lines=True, cpd_lines=[3, 6, 30], 
@@ -78,7 +81,7 @@ class SpectrumPlotter:
         fig = plt.figure(figsize=figsize)  # 设置Figure的尺寸
         
         modelnames = ['GPCP-obs']
-        kw_x, kw_y = get_curve()
+        overlay = self._overlay(he, meridional_modes, matsuno_lines, freq_lines)
 
         for idx,data in enumerate(cmip_f):
             print(idx)
@@ -115,52 +118,26 @@ class SpectrumPlotter:
                                             )
             cset1_0 = sym.T.plot.contour( ax=ax,levels= contour_range_lines, colors='k',add_colorbar=False,add_labels=False)
 
-            self.set_ax(ax, text_size, freq_lines)
-            ax.plot(kw_x[0], kw_y[0], 'g', linewidth=1.2, linestyle='solid',zorder=5)
-            if matsuno_lines:
-                matsuno_modes = mp.matsuno_modes_wk(he=he,n=meridional_modes,max_wn=self.max_wn_plot)
-                # print(matsuno_modes)
-                kelvin_series_90 = filter_series(matsuno_modes[90]['Kelvin(he=90m)'], 2, 5.2)
-                kelvin_series_8 = filter_series(matsuno_modes[8]['Kelvin(he=8m)'], 2.6, 14)
+            self.set_ax(ax, text_size, freq_lines=False)
+            overlay.attach(ax, text_size)
+            if matsuno_lines and labels:
+                matsuno_modes = mp.matsuno_modes_wk(he=he,n=meridional_modes,max_wn=self.max_wn_plot,
+                                                  solver='analytic')
+                key = list(matsuno_modes.keys())[len(list(matsuno_modes.keys()))//2]
                 
-                for key in matsuno_modes:
-                    print(key)
-                    ax.plot(matsuno_modes[key]['Kelvin(he={}m)'.format(key)],color='k',linestyle='-')
-                    ax.plot(matsuno_modes[key]['ER(n=1,he={}m)'.format(key)],color='k',linestyle='-')
-                  
-                    ax.plot(matsuno_modes[key]['Kelvin(he={}m)'.format(key)],color='k',linestyle='-')
-                    ax.plot(matsuno_modes[key]['ER(n=1,he={}m)'.format(key)],color='k',linestyle='-')
+                wn = matsuno_modes[key].index.values
                 
-                    ax.plot(matsuno_modes[key]['Kelvin(he={}m)'.format(key)],color='k',linestyle='-')
-                    ax.plot(matsuno_modes[key]['ER(n=1,he={}m)'.format(key)],color='k',linestyle='-')
+                k = int((len(wn)/2)+0.3*(len(wn)/2))
+                k, = np.where(wn == wn[k])[0]
+                k = int(0.7*(len(wn)/2))
+                k, = np.where(wn == wn[k])[0]
+                ax.text(wn[k]+0.4,matsuno_modes[key]['ER(n=1,he={}m)'.format(key)].iloc[k]+0.02,'n=1 ER', \
+                bbox={'facecolor':'w','alpha':1,'edgecolor':'none'},fontsize=text_size-6)
                     
+                ax.text(wn[k]+0.4,matsuno_modes[key]['WIG(n=1,he={}m)'.format(key)].iloc[k]+0.02,'n=1 WIG', \
+                    bbox={'facecolor':'w','alpha':1,'edgecolor':'none'},fontsize=text_size-6)
                     
-                    ax.plot(matsuno_modes[key]['WIG(n=1,he={}m)'.format(key)],color='k',linestyle='-')
-                    ax.plot(matsuno_modes[key]['WIG(n=1,he={}m)'.format(key)],color='k',linestyle='-')
-                    ax.plot(matsuno_modes[key]['WIG(n=1,he={}m)'.format(key)],color='k',linestyle='-')
-                    
-                    ax.plot(matsuno_modes[key]['EIG(n=1,he={}m)'.format(key)],color='k',linestyle='-')
-                    ax.plot(matsuno_modes[key]['EIG(n=1,he={}m)'.format(key)],color='k',linestyle='-')
-                    
-                    ax.plot(kelvin_series_90, color='g', linestyle='-')
-                    ax.plot(kelvin_series_8, color='g', linestyle='-')
-
-                if labels:
-                    key = list(matsuno_modes.keys())[len(list(matsuno_modes.keys()))//2]
-                    
-                    wn = matsuno_modes[key].index.values
                     
-                    k = int((len(wn)/2)+0.3*(len(wn)/2))
-                    k, = np.where(wn == wn[k])[0]
-                    k = int(0.7*(len(wn)/2))
-                    k = np.where(wn == wn[k])[0]
-                    ax.text(wn[k]+0.4,matsuno_modes[key]['ER(n=1,he={}m)'.format(key)].iloc[k]+0.02,'n=1 ER', \
-                    bbox={'facecolor':'w','alpha':1,'edgecolor':'none'},fontsize=text_size-6)
-                        
-                    ax.text(wn[k]+0.4,matsuno_modes[key]['WIG(n=1,he={}m)'.format(key)].iloc[k]+0.02,'n=1 WIG', \
-                        bbox={'facecolor':'w','alpha':1,'edgecolor':'none'},fontsize=text_size-6)
-                        
-                        
         cbar_ax = fig.add_axes([0.25, 0.002, 0.55, 0.02])  # left\bottom\length\height              
       
       
@@ -171,4 +148,65 @@ class SpectrumPlotter:
                             bottom=True, left=True, right=True, top=True)
         
         if ofil is not None:
-            save_figure(fig,filename=ofil)
\ No newline at end of file
+            save_figure(fig,filename=ofil)
+
+    def _overlay(self, he, meridional_modes, matsuno_lines=True, freq_lines=True):
+        """
+        Shared dispersion-curve/envelope/period-line overlay (built once per
+        parameter set, see overlay.DispersionOverlay).
+        """
+        return get_overlay(he=he, n=meridional_modes, max_wn=self.max_wn_plot,
+                           modes=('Kelvin', 'ER', 'WIG', 'EIG') if matsuno_lines else (),
+                           kelvin_highlight=((90, 2, 5.2), (8, 2.6, 14)) if matsuno_lines else None,
+                           period_lines=self.cpd_lines if freq_lines else None,
+                           max_freq=self.max_freq_plot)
+
+    def _draw_panel(self, ax, data, title=None, text_size=12, contour_range=[1, 2, 0.1], he=[90, 25, 8],
+                    min_contour_range_lines=1.1, matsuno_lines=True, meridional_modes=[1], cmap='bwr',
+                    freq_lines=True):
+        """
+        Draw one symmetric/background panel on ax (used by plot_panels in worker processes).
+        """
+        levels = np.arange(contour_range[0], contour_range[1], contour_range[2])
+        sym = data.transpose().sel(frequency=slice(0, .5),
+                                   wavenumber=slice(-self.max_wn_plot, self.max_wn_plot))
+        sym.T.plot.contourf(ax=ax, levels=levels, extend='neither', norm=self.norm,
+                            cmap=cmap, add_colorbar=False, add_labels=False)
+        sym.T.plot.contour(ax=ax, levels=levels[levels >= min_contour_range_lines], colors='k',
+                           add_colorbar=False, add_labels=False)
+        self.set_ax(ax, text_size, freq_lines=False)
+        self._overlay(he, meridional_modes, matsuno_lines, freq_lines).attach(ax, text_size)
+        ax.set_xlabel('Zonal Wavenumber', size=text_size)
+        ax.set_ylabel('Frequency (CPD)', size=text_size)
+        if title is not None:
+            ax.set_title(title, size=text_size, loc='left')
+
+    def plot_panels(self, cmip_f, titles=None, ncols=3, max_freq_plot=0.5, max_wn_plot=15,
+                    contour_range=[1, 2, 0.1], cmap='bwr', workers=None, dpi=300,
+                    panel_size=(4., 3.2), ofil=None, **kwargs):
+        """
+        Multi-panel version of plot_cmip_future: every spectrum in cmip_f is drawn
+        in its own process on the Agg backend and the panels are composited
+        into one figure with a shared colorbar (see render.render_panels).
+
+        :param cmip_f: Symmetric/background spectra (frequency, wavenumber).
+        :type cmip_f: list of xarray.DataArray
+        :param titles: Panel titles.
+        :type titles: list of str
+        :param workers: Number of processes, defaults to os.cpu_count().
+        :type workers: int
+        :param kwargs: Passed to _draw_panel (he, meridional_modes, matsuno_lines, ...).
+        :return: The composited figure.
+        """
+        self.max_wn_plot = max_wn_plot
+        self.max_freq_plot = max_freq_plot
+        titles = titles or [None]*len(cmip_f)
+        panel_kwargs = [dict(kwargs, title=t, contour_range=contour_range, cmap=cmap) for t in titles]
+        levels = np.arange(contour_range[0], contour_range[1], contour_range[2])
+        fig = render_panels(self._draw_panel, list(cmip_f), panel_kwargs, ncols=ncols,
+                            panel_size=panel_size, dpi=dpi, workers=workers,
+                            colorbar={'cmap': cmap, 'levels': levels, 'norm': self.norm,
+                                      'ticks': (1, 1.2, 1.4, 1.6, 1.8, 2)})
+        if ofil is not None:
+            save_figure(fig, filename=ofil)
+        return fig
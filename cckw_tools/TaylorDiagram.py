@@ -145,17 +145,64 @@ class TaylorDiagram(object):
         
         return l
 
+    def add_samples(self, stddev, corrcoef, markers='o', colors=None, sizes=36, labels=None, **kwargs):
+        """
+        Add many samples with a single `Axes.scatter` call (one artist
+        instead of one `Line2D` per point).
+
+        :param stddev: standard deviations, any shape (e.g. model x season x region)
+        :param corrcoef: correlations, same shape as *stddev*
+        :param markers: one marker for all points, or one per point
+            (e.g. ``['$%d$' % i for i in range(1, n + 1)]``)
+        :param colors: one color or one per point
+        :param sizes: marker area(s) in points^2, as in `scatter`
+        :param labels: optional per-point labels; one legend proxy per
+            label is appended to *samplePoints* (not drawn)
+        :return: the `PathCollection`
+        """
+        from matplotlib.lines import Line2D
+        from matplotlib.markers import MarkerStyle
+
+        stddev = np.ravel(stddev)
+        theta = np.arccos(np.ravel(corrcoef))
+        n = stddev.size
+        single = isinstance(markers, (str, MarkerStyle))
+        marker_list = [markers] * n if single else list(markers)
+        styles = {}                         # text markers ('$12$') are costly to build
+        for m in marker_list:
+            if m not in styles:
+                styles[m] = MarkerStyle(m)
+        sc = self.ax.scatter(theta, stddev, s=sizes, c=colors,
+                             marker=styles[markers] if single else 'o', **kwargs)
+        if not single:
+            paths = {m: st.get_path().transformed(st.get_transform()) for m, st in styles.items()}
+            sc.set_paths([paths[m] for m in marker_list])
+
+        if labels is None:
+            self.samplePoints.append(sc)
+            return sc
+        if sc.get_array() is not None:      # numeric colors mapped through cmap/norm
+            sc.autoscale_None()
+            color_list = sc.to_rgba(sc.get_array())
+        else:
+            color_list = np.broadcast_to(sc.get_facecolors(), (n, 4))
+        for lab, m, c in zip(labels, marker_list, color_list):
+            self.samplePoints.append(Line2D([], [], ls='', marker=styles[m], mfc=c, mec=c,
+                                            ms=np.sqrt(np.ravel(sizes)[0]), label=lab))
+        return sc
+
     def add_grid(self, *args, **kwargs):
+        """Add a grid, plus constant-stddev circles (drawn once)."""
         grid = self._ax.grid(*args, **kwargs)
-        """Add a grid."""
-        rlocs = [0,0.04,0.08,0.12,0.16,0.20,0.24,0.28,]  # 生成多个标准差值
-        for r in rlocs:
-            print(r)
-            circle = plt.Circle((0, 0), r, transform=self._ax.transData._b, color='k',
-                                fill=False, linestyle='-',linewidth=1.5,zorder=2)
-            self._ax.add_patch(circle)
-        
-        
+        if getattr(self, '_grid_circles', None) is None:
+            from matplotlib.collections import PatchCollection
+            rlocs = [0,0.04,0.08,0.12,0.16,0.20,0.24,0.28,]  # 生成多个标准差值
+            circles = [patches.Circle((0, 0), r) for r in rlocs]
+            self._grid_circles = PatchCollection(circles, transform=self._ax.transData._b,
+                                                 edgecolor='k', facecolor='none',
+                                                 linestyle='-', linewidth=1.5, zorder=2)
+            self._ax.add_collection(self._grid_circles)
+
         return grid
 
     def add_contours(self, levels=5, **kwargs):
@@ -163,10 +210,13 @@ class TaylorDiagram(object):
         Add constant centered RMS difference contours, defined by *levels*.
         """
 
-        rs, ts = np.meshgrid(np.linspace(self.smin, self.smax),
-                              np.linspace(0, self.tmax))
-        # Compute centered RMS difference
-        rms = np.sqrt(self.refstd**2 + rs**2 - 2*self.refstd*rs*np.cos(ts))
+        if getattr(self, '_rms_grid', None) is None:
+            rs, ts = np.meshgrid(np.linspace(self.smin, self.smax),
+                                  np.linspace(0, self.tmax))
+            # Compute centered RMS difference
+            rms = np.sqrt(self.refstd**2 + rs**2 - 2*self.refstd*rs*np.cos(ts))
+            self._rms_grid = ts, rs, rms
+        ts, rs, rms = self._rms_grid
 
         contours = self.ax.contour(ts, rs, rms, levels,colors='green', linestyles='--', **kwargs)
 
@@ -1,5 +1,74 @@
-from .core import *
-from .ma import *
-from .utils import *
-from .functions import *
-from .plot import *
\ No newline at end of file
+"""
+cckw_tools：CMIP6 模式中对流耦合 Kelvin 波（CCKW）的评估工具。
+
+子模块在首次访问其中的名称时才导入（PEP 562 的模块级 __getattr__），
+import cckw_tools 本身不会加载 matplotlib、cartopy、scipy 或 pandas；
+进程池中只做计算的 worker 只导入用到的模块，如
+from cckw_tools.kelvin_filter import kelvin_filter 不会导入任何绘图模块，
+没有安装 cartopy 时计算部分也能正常使用。
+
+顶层名称与以前逐个 from .<module> import * 时相同：cckw_tools.get_curve、
+from cckw_tools import Spectrum 等写法不变；from cckw_tools import * 会导入全部子模块。
+"""
+import importlib
+
+# 子模块 -> 在包顶层导出的名称；新增模块时在这里登记
+_EXPORTS = {
+    'core': ['plot_cckw_envelope'],
+    'ma': ['pi', 're', 'g', 'omega', 'deg2rad', 'sec2day', 'beta_parameters', 'wn_array', 'wn2k',
+           'afreq2freq', 'kelvin_mode', 'mrg_mode', 'eig_n_0', 'er_n', 'eig_n', 'wig_n', 'dispersion',
+           'matsuno_roots', 'er_eig_wig_n', 'matsuno_dataframe', 'standar_plot', 'matsuno_modes_wk',
+           'matsuno_modes_array', 'MatsunoCache', 'matsuno_cache'],
+    'utils': ['filter_series', 'save_figure', 'wait_for_figures', 'get_curve', 'points_in_polygon',
+              'create_cmap_from_string'],
+    'functions': ['Spectrum'],
+    'plot': ['make_space_fig', 'plot_space_data', 'plot_space_grid'],
+    'wk_spectrum': ['smooth_121', 'split_cosine_taper', 'segment_starts', 'background_spectrum', 'wk_spectrum'],
+    'spectra_store': ['input_fingerprint', 'SpectraStore', 'build_wk_spectra'],
+    'kelvin_filter': ['fft_wavenumber_frequency', 'kelvin_band_mask', 'kelvin_filter', 'kelvin_filter_file',
+                      'kelvin_filter_batch'],
+    'wave_bands': ['WaveBand', 'register_wave_band', 'get_wave_band', 'band_mask', 'band_mask_like',
+                   'band_power'],
+    'skill': ['pattern_stats', 'spectral_skill', 'field_skill', 'taylor_stats'],
+    'resampling': ['grid_tiles', 'resample_corr', 'spectral_significance'],
+    'streaming': ['SEASONS', 'month_index', 'season_index', 'StreamingMoments', 'KelvinStats', 'stream_stats',
+                  'stream_stats_file'],
+    'ensemble': ['GOOD_MODELS', 'POOR_MODELS', 'model_file_index', 'groups_from_skill', 'ensemble_fields',
+                 'ensemble_composite'],
+    'cache': ['code_version', 'ProductCache', 'cached_product', 'product_cache'],
+    'render': ['render_panels', 'composite_panels'],
+    'overlay': ['DispersionOverlay', 'get_overlay'],
+    'synthetic': ['SECONDS_PER_DAY', 'KelvinWave', 'DEFAULT_WAVES', 'synthetic_grid', 'expected_kelvin_std',
+                  'SyntheticPrecip', 'synthetic_precip', 'synthetic_filename', 'write_synthetic_model',
+                  'write_synthetic_ensemble', 'synthetic_truth'],
+    'regrid': ['cell_edges', 'grid_edges', 'overlap_matrix', 'conservative_matrix', 'RegridWeights',
+               'RegridCache', 'regrid_conservative', 'regrid_file', 'regrid_batch', 'regrid_cache'],
+    'field_store': ['LAYOUTS', 'OPERATION_LAYOUT', 'FieldStore', 'open_field', 'build_field_store'],
+    'regions': ['Box', 'Region', 'region_mask', 'RegionIndex', 'region_index', 'regional_stats_file',
+                'regional_stats'],
+    'events': ['KM_PER_DEGREE', 'CATALOG_COLUMNS', 'equatorial_hovmoller', 'detect_events', 'event_catalog',
+               'event_summary', 'save_catalog', 'load_catalog'],
+    'profiling': ['Profiler', 'profiler', 'profile_stage', 'profiled', 'enable_profiling'],
+}
+
+# 不导出名称、只能作为子模块访问的模块（cckw_tools.SpectrumPlotter 等）
+_SUBMODULES = set(_EXPORTS) | {'SpectrumPlotter', 'TaylorDiagram', 'pipeline'}
+
+_NAME_TO_MODULE = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_NAME_TO_MODULE)
+
+
+def __getattr__(name):
+    if name in _NAME_TO_MODULE:
+        value = getattr(importlib.import_module(f'.{_NAME_TO_MODULE[name]}', __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    globals()[name] = value  # 之后的访问不再经过 __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_NAME_TO_MODULE) | _SUBMODULES)
\ No newline at end of file
@@ -0,0 +1,239 @@
+import os
+import time
+import hashlib
+import inspect
+import functools
+import xarray as xr
+from typing import Callable, List, Optional, Sequence, Union
+from .spectra_store import PathLike, input_fingerprint
+
+Product = Union[xr.Dataset, xr.DataArray]
+
+
+def code_version(*objs) -> str:
+    """
+    由模块或函数的源文件内容生成的版本号，源码改动后缓存自动失效。
+    """
+    h = hashlib.sha1()
+    for obj in objs:
+        path = getattr(obj, '__file__', None) or getattr(obj, '__code__').co_filename
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+class ProductCache:
+    """
+    中间产品（组合成、标准差场、区域统计等）的磁盘缓存，替代 data/ 目录中
+    手工命名、手工注释 to_netcdf 的 good--15-15month_std.nc 一类文件。
+
+    每个产品以 (名称, 输入文件指纹, 参数, 代码版本) 的哈希为键保存为
+    <name>-<key>.nc。输入文件或代码变化时键随之改变，旧条目不再命中，
+    最终由 LRU 淘汰：总大小超过 max_bytes 时按最近访问时间删除最旧的文件。
+    root 为 None 时缓存关闭（get 总是未命中，put 不写入）。
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: float = 20e9):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    def key(self, name: str, inputs: PathLike = (), version: str = '', **params) -> str:
+        """
+        缓存键。
+
+        参数：
+        --------
+        name : str
+            产品名称，如 'kelvin_std'。
+        inputs : str 或 list of str, optional
+            输入文件（按路径、大小、修改时间计入指纹）。
+        version : str, optional
+            代码版本，见 code_version。
+        **params :
+            影响结果的其他参数（纬度范围、统计量等）。
+        """
+        fp = input_fingerprint(inputs, name=name, version=version, **params)
+        return f'{name}-{fp[:20]}'
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key + '.nc')
+
+    def get(self, key: str) -> Optional[Product]:
+        """取出缓存的产品（已读入内存）；未命中返回 None。缓存关闭时不计数。"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with xr.open_dataset(path) as ds:
+                ds = ds.load()
+            os.utime(path)  # 记录访问时间，用于 LRU
+        except FileNotFoundError:  # 不存在，或刚被其他进程淘汰
+            self.misses += 1
+            return None
+        self.hits += 1
+        if ds.attrs.pop('_cckw_dataarray', None):
+            (name,) = ds.data_vars
+            da = ds[name]
+            return da.rename(None) if name == '__unnamed__' else da
+        return ds
+
+    def put(self, key: str, obj: Product) -> Optional[str]:
+        """
+        写入产品（临时文件 + 替换），然后按 max_bytes 淘汰其他旧条目。
+        单个产品就超过 max_bytes 时不缓存，返回 None。
+        """
+        if not self.enabled:
+            return None
+        os.makedirs(self.root, exist_ok=True)
+        if isinstance(obj, xr.DataArray):
+            ds = obj.to_dataset(name=obj.name if obj.name is not None else '__unnamed__')
+            ds.attrs['_cckw_dataarray'] = 1
+        else:
+            ds = obj
+        path = self._path(key)
+        tmp = path + '.tmp'
+        ds.to_netcdf(tmp)
+        if os.path.getsize(tmp) > self.max_bytes:
+            os.remove(tmp)
+            return None
+        os.replace(tmp, path)
+        self.evict(keep=[os.path.basename(path)])
+        return path
+
+    def entries(self) -> List[dict]:
+        """所有条目（文件名、大小、最近访问时间），按访问时间从旧到新。"""
+        if not self.enabled or not os.path.isdir(self.root):
+            return []
+        out = []
+        for f in os.listdir(self.root):
+            if f.endswith('.nc'):
+                try:
+                    st = os.stat(os.path.join(self.root, f))
+                except FileNotFoundError:  # 已被其他进程淘汰
+                    continue
+                out.append({'file': f, 'bytes': st.st_size, 'accessed': st.st_mtime})
+        return sorted(out, key=lambda e: e['accessed'])
+
+    def size(self) -> int:
+        return sum(e['bytes'] for e in self.entries())
+
+    def evict(self, max_bytes: Optional[float] = None, keep: Sequence[str] = ()) -> List[str]:
+        """删除最久未访问的条目（keep 中的文件名除外），直到总大小不超过 max_bytes。返回被删除的文件名。"""
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(e['bytes'] for e in entries)
+        removed = []
+        for e in entries:
+            if total <= budget:
+                break
+            if e['file'] in keep:
+                continue
+            total -= e['bytes']
+            try:
+                os.remove(os.path.join(self.root, e['file']))
+            except FileNotFoundError:  # 其他进程（如进程池中的 worker）同时淘汰了该条目
+                continue
+            removed.append(e['file'])
+        return removed
+
+    def clear(self) -> None:
+        """删除全部条目并重置计数。"""
+        self.evict(max_bytes=0)
+        self.hits = self.misses = 0
+
+    def info(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries()),
+                'bytes': self.size(), 'max_bytes': self.max_bytes, 'root': self.root}
+
+    def get_or_compute(
+        self,
+        name: str,
+        compute: Callable[[], Product],
+        inputs: PathLike = (),
+        version: str = '',
+        **params
+    ) -> Product:
+        """
+        命中时直接返回缓存，否则调用 compute() 并写入缓存。
+
+        参数：
+        --------
+        name : str
+            产品名称。
+        compute : callable
+            无参数函数，返回 xr.Dataset 或 xr.DataArray。
+        inputs, version, **params :
+            见 key。
+
+        返回：
+        --------
+        xr.Dataset 或 xr.DataArray
+        """
+        key = self.key(name, inputs, version, **params)
+        obj = self.get(key)
+        if obj is None:
+            t0 = time.perf_counter()
+            obj = compute()
+            if self.enabled:
+                obj = obj.load()
+                self.put(key, obj)
+                print(f'{key} computed in {time.perf_counter() - t0:.1f} s and cached')
+        return obj
+
+
+def cached_product(
+    name: Optional[str] = None,
+    inputs: str = 'path',
+    cache: Optional[ProductCache] = None,
+    version: Optional[str] = None,
+    exclude: Sequence[str] = ()
+) -> Callable:
+    """
+    装饰器：以函数参数作为缓存键缓存返回的 xr.Dataset/DataArray。
+
+    参数：
+    --------
+    name : str, optional
+        产品名称，默认函数名。
+    inputs : str, optional
+        表示输入文件的参数名，默认 'path'。
+    cache : ProductCache, optional
+        使用的缓存，默认模块级的 product_cache（调用时解析）。
+    version : str, optional
+        代码版本，默认取被装饰函数所在源文件的 code_version。
+    exclude : list of str, optional
+        不影响结果、不计入键的参数（如 workers）。
+    """
+    def decorator(func):
+        label = name or func.__name__
+        ver = version or code_version(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            store = cache or product_cache
+            bound = _bind(func, args, kwargs)
+            paths = bound.pop(inputs, ())
+            for k in exclude:
+                bound.pop(k, None)
+            return store.get_or_compute(label, lambda: func(*args, **kwargs),
+                                        inputs=paths, version=ver, **bound)
+        return wrapper
+    return decorator
+
+
+def _bind(func: Callable, args: Sequence, kwargs: dict) -> dict:
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+# 共享缓存；设置 CCKW_CACHE_DIR 环境变量（或 product_cache.root）后启用，
+# CCKW_CACHE_MAX_BYTES 设置磁盘预算（默认 20 GB）。
+product_cache = ProductCache(os.environ.get('CCKW_CACHE_DIR'),
+                             float(os.environ.get('CCKW_CACHE_MAX_BYTES', 20e9)))
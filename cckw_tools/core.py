@@ -4,16 +4,18 @@ import numpy as np
 import matplotlib.pyplot as plt
 import os
 from typing import Optional, List, Tuple
-from .utils import get_curve
+from .utils import get_curve, save_figure
 
 def plot_cckw_envelope(
     he: Optional[List[float]] = None,
     fmax: Optional[List[float]] = None,
     savepath: Optional[str] = None,
-    dpi: int = 200
+    dpi: int = 200,
+    rasterize: bool = False,
+    background: bool = False
 ) -> None:
     """
-    绘制 CCKW 包络示意图，可选择保存。
+    绘制 CCKW 包络示意图，可选择保存（rasterize、background 见 utils.save_figure）。
     """
     kw_x, kw_y = get_curve(he=he, fmax=fmax)
 
@@ -64,12 +66,12 @@ def plot_cckw_envelope(
             ax.tick_params(labelleft=False)
 
     if savepath:
-        folder = os.path.dirname(savepath)
-        if folder and not os.path.exists(folder):
-            os.makedirs(folder)
-            print(f'Created folder: {folder}')
-        fig.savefig(f"{savepath}.pdf", dpi=dpi, bbox_inches='tight', format='pdf')
-        print(f'Figure saved at: {savepath}.pdf')
+        future = save_figure(fig, filename=os.path.basename(savepath), folder=os.path.dirname(savepath) or None,
+                             fmt='pdf', dpi=dpi, rasterize=rasterize, background=background)
+        if future is not None:
+            # 后台写入期间不再显示（重绘会与写入线程冲突），直接交给写入线程
+            plt.close(fig)
+            return
 
     plt.show()
     plt.close()
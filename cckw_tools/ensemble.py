@@ -0,0 +1,218 @@
+import os
+import glob
+import numpy as np
+import pandas as pd
+import xarray as xr
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from .streaming import StreamingMoments, stream_stats
+from .cache import ProductCache, code_version, product_cache
+from .field_store import open_field
+
+# 论文中按 Kelvin 波谱技巧划分的好/差模式
+GOOD_MODELS = ['UKESM1-0-LL', 'SAM0-UNICON', 'HadGEM3-GC31-LL', 'MIROC6', 'NorCPM1']
+POOR_MODELS = ['CanESM5', 'INM-CM5-0', 'IPSL-CM6A-LR', 'GFDL-CM4', 'INM-CM4-8']
+
+Statistic = Union[str, Callable[[xr.DataArray], xr.DataArray]]
+
+
+def model_file_index(pattern: str, name_pos: int = 2, sep: str = '_') -> Dict[str, str]:
+    """
+    由文件名得到 模式名 -> 文件 的索引。
+
+    参数：
+    --------
+    pattern : str
+        glob 路径，如 'CCKWs/*.nc'。
+    name_pos : int, optional
+        文件名按 sep 分割后模式名所在位置，默认 2
+        （pr_day_<model>_...；prepocess 目录中的 <model>_... 用 0）。
+    sep : str, optional
+        分隔符，默认 '_'。
+
+    返回：
+    --------
+    dict
+        按模式名排序的 {model: path}。
+    """
+    index = {}
+    for f in glob.glob(pattern):
+        index[os.path.basename(f).split(sep)[name_pos]] = f
+    return dict(sorted(index.items()))
+
+
+def groups_from_skill(
+    skill: pd.Series,
+    threshold: float,
+    above: str = 'good',
+    below: str = 'poor'
+) -> Dict[str, List[str]]:
+    """
+    按技巧评分阈值分组，如 spectral_skill(...)['corr']。
+
+    参数：
+    --------
+    skill : pd.Series
+        以模式名为索引的评分。
+    threshold : float
+        阈值，>= threshold 的归入 above 组，其余归入 below 组。
+    above, below : str, optional
+        两组的名称，默认 'good'、'poor'。
+
+    返回：
+    --------
+    dict
+        组名 -> 模式名列表（按评分从高到低）。
+    """
+    skill = skill.dropna().sort_values(ascending=False)
+    return {above: list(skill.index[skill >= threshold]),
+            below: list(skill.index[skill < threshold])}
+
+
+def ensemble_fields(
+    sources: Dict[str, Union[str, xr.DataArray]],
+    models: Sequence[str],
+    var: str = 'kelvin',
+    sel: Optional[dict] = None,
+    scale: Union[float, Dict[str, float]] = 1.
+) -> Iterator[Tuple[str, xr.DataArray, float]]:
+    """
+    按模式依次产出惰性打开的场（模式维上的“视图”），调用方处理完一个再打开下一个，
+    内存中始终只有一个模式的数据。
+
+    参数：
+    --------
+    sources : dict
+        模式名 -> 文件路径或 DataArray。
+    models : list of str
+        需要的模式。
+    var : str, optional
+        文件中的变量名，默认 'kelvin'。
+    sel : dict, optional
+        传给 .sel 的截取条件，如 {'lat': slice(-15, 15)}。
+    scale : float 或 dict, optional
+        乘数（如模式降水的 86400）；dict 时按模式名查找，缺省为 1。
+
+    返回：
+    --------
+    iterator of (model, xr.DataArray, scale)
+        由本函数打开的文件在取下一个模式时关闭。
+    """
+    for model in models:
+        src = sources[model]
+        data = open_field(src, var, 'stats') if isinstance(src, str) else src
+        factor = scale.get(model, 1.) if isinstance(scale, dict) else scale
+        try:
+            yield model, (data.sel(**sel) if sel else data), factor
+        finally:
+            if isinstance(src, str):
+                data.close()
+
+
+def _apply_statistic(data: xr.DataArray, factor: float, statistic: Statistic) -> xr.DataArray:
+    if callable(statistic):
+        return statistic(data * factor if factor != 1. else data)
+    return stream_stats(data, scale=factor)[statistic]
+
+
+def _model_statistic(src, data: xr.DataArray, factor: float, statistic: Statistic,
+                     var: str, sel: Optional[dict], cache: ProductCache) -> xr.DataArray:
+    # 只缓存来自文件、按名称指定的统计量（自定义函数无法可靠地生成版本号）
+    if isinstance(src, str) and isinstance(statistic, str):
+        return cache.get_or_compute(f'ensemble_{statistic}',
+                                    lambda: _apply_statistic(data, factor, statistic),
+                                    inputs=src, version=code_version(stream_stats),
+                                    var=var, sel=sel, scale=factor)
+    return _apply_statistic(data, factor, statistic).load()
+
+
+def ensemble_composite(
+    sources: Dict[str, Union[str, xr.DataArray]],
+    groups: Dict[str, Sequence[str]],
+    reference: Optional[str] = 'GPCP',
+    statistic: Statistic = 'std',
+    var: str = 'kelvin',
+    sel: Optional[dict] = None,
+    scale: Union[float, Dict[str, float]] = 1.,
+    ddof: int = 0,
+    cache: Optional[ProductCache] = None
+) -> xr.Dataset:
+    """
+    模式组合成：逐个模式计算统计量（如 kelvin 标准差），流式累加到各组的
+    均值和离散度中，不把所有模式同时放入内存。替代 notebook 中各个
+    cal_multimean 的 list + np.array(...).mean(0) 写法，并保留坐标。
+
+    参数：
+    --------
+    sources : dict
+        模式名 -> 文件路径或 DataArray，如 model_file_index(...) 的结果。
+    groups : dict
+        组名 -> 模式名列表，如 {'good': GOOD_MODELS, 'poor': POOR_MODELS}
+        或 groups_from_skill(...) 的结果。sources 中没有的模式会被跳过。
+    reference : str, optional
+        参考（观测）名称，默认 'GPCP'，须在 sources 中；None 表示不计算差值。
+    statistic : str 或 callable, optional
+        每个模式的统计量：stream_stats 的输出变量名（'std'、'mean'、
+        'month_std'、'season_std' 等），或 DataArray -> DataArray 的函数。
+        默认 'std'。
+    var : str, optional
+        变量名，默认 'kelvin'。
+    sel : dict, optional
+        截取条件，如 {'lat': slice(-15, 15)}。
+    scale : float 或 dict, optional
+        乘数，见 ensemble_fields。
+    ddof : int, optional
+        组内离散度（模式间标准差）的自由度修正，默认 0。
+    cache : ProductCache, optional
+        每个模式统计量的缓存，默认 product_cache（设置 CCKW_CACHE_DIR 后启用）。
+
+    返回：
+    --------
+    xr.Dataset
+        mean、spread、count 维度为 (group, ...)，没有成员的组 mean、spread 为 NaN；
+        有参考时另含 reference 和 diff (= mean - reference)。attrs 中记录各组实际使用的模式。
+    """
+    cache = cache or product_cache
+    if reference is not None and reference not in sources:
+        raise ValueError(f'reference {reference!r} is not in sources; pass reference=None to skip the difference')
+    names = list(groups)
+    members = {g: [m for m in groups[g] if m in sources] for g in names}
+    for g in names:
+        missing = sorted(set(groups[g]) - set(members[g]))
+        if missing:
+            print(f'{g}: no input for {missing}, skipping')
+        if not members[g]:
+            print(f'{g}: no models, mean and spread will be NaN')
+
+    acc = None
+    template = None
+    for gi, g in enumerate(names):
+        for model, data, factor in ensemble_fields(sources, members[g], var, sel, scale):
+            field = _model_statistic(sources[model], data, factor, statistic, var, sel, cache)
+            if acc is None:
+                template = field
+                acc = StreamingMoments(len(names), field.shape)
+            elif field.shape != template.shape:
+                raise ValueError(f'{model} has shape {field.shape}, expected {template.shape}')
+            acc.update(field.values[None], np.array([gi]))
+
+    if acc is None:
+        raise ValueError('none of the requested models are available in sources')
+
+    dims = ('group',) + template.dims
+    empty = acc.count == 0  # 没有成员（或全为缺测）的组
+    coords = {**template.coords, 'group': names}
+    ds = xr.Dataset(
+        {
+            'mean': (dims, np.where(empty, np.nan, acc.mean)),
+            'spread': (dims, np.where(empty, np.nan, acc.std(ddof))),
+            'count': (dims, acc.count.astype(int)),
+        },
+        coords=coords,
+        attrs={f'{g}_models': ','.join(members[g]) for g in names},
+    )
+    if reference is not None:
+        for _, data, factor in ensemble_fields(sources, [reference], var, sel, scale):
+            ref = _model_statistic(sources[reference], data, factor, statistic, var, sel, cache)
+        ds['reference'] = ref.drop_vars([c for c in ref.coords if c not in template.coords])
+        ds['diff'] = ds['mean'] - ds['reference']
+    return ds
@@ -0,0 +1,355 @@
+import os
+import numpy as np
+import pandas as pd
+import xarray as xr
+from scipy import ndimage, sparse
+from scipy.sparse.csgraph import connected_components
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple, Union
+from .ma import re as EARTH_RADIUS
+from .field_store import open_field
+from .profiling import profiled
+
+# 赤道上 1 度经度对应的距离（km）
+KM_PER_DEGREE = 2 * np.pi * EARTH_RADIUS / 360. / 1e3
+
+# 事件表的列及其类型（紧凑的列式存储）
+CATALOG_COLUMNS = {
+    'event': np.int32,
+    'start': 'datetime64[ns]',     # cftime 日历（noleap、360_day 等）时为 object
+    'lifetime': np.float32,        # 天
+    'lon_start': np.float32,       # 度，0-360
+    'lon_end': np.float32,
+    'distance': np.float32,        # km，向东为正
+    'speed': np.float32,           # m/s，脊线经度随时间的最小二乘斜率
+    'amplitude': np.float32,       # 事件内 Hovmöller 的最大值
+    'mean_amplitude': np.float32,  # 脊线上的平均值
+    'size': np.int32,              # 事件包含的 (time, lon) 格点数
+}
+
+
+def equatorial_hovmoller(
+    data: xr.DataArray,
+    lat_bounds: Tuple[float, float] = (-10, 10),
+    time_chunk: int = 365,
+    scale: float = 1.
+) -> xr.DataArray:
+    """
+    赤道带的 Hovmöller 图：纬向带内按 cos(lat) 加权的平均，按时间块读入。
+
+    参数：
+    --------
+    data : xr.DataArray
+        (time, lat, lon) 场，如 kelvin 滤波后的降水，可以是惰性读取的。
+    lat_bounds : tuple, optional
+        纬度范围，默认 (-10, 10)。
+    time_chunk : int, optional
+        每次读入的时间步数，默认 365。
+    scale : float, optional
+        乘数（如模式降水的 86400），默认 1。
+
+    返回：
+    --------
+    xr.DataArray
+        (time, lon)，float32。
+    """
+    if data.lat.values[0] > data.lat.values[-1]:
+        data = data.isel(lat=slice(None, None, -1))
+    data = data.sel(lat=slice(*lat_bounds)).transpose('time', 'lat', 'lon')
+    w = np.cos(np.deg2rad(data['lat'].values))
+    w = (w / w.sum()).astype(np.float32)
+    out = np.empty((data.sizes['time'], data.sizes['lon']), dtype=np.float32)
+    for t0 in range(0, data.sizes['time'], time_chunk):
+        block = np.asarray(data.isel(time=slice(t0, t0 + time_chunk)).values, dtype=np.float32)
+        out[t0:t0 + block.shape[0]] = np.einsum('tyx,y->tx', block, w)
+    if scale != 1.:
+        out *= np.float32(scale)
+    return xr.DataArray(out, dims=('time', 'lon'), coords={'time': data['time'].values, 'lon': data['lon'].values},
+                        name=data.name, attrs={**data.attrs, 'lat_bounds': list(lat_bounds)})
+
+
+def _periodic_labels(mask: np.ndarray) -> Tuple[np.ndarray, int]:
+    """(time, lon) 掩膜的 8 连通分量，经度方向首尾相接。"""
+    labels, n = ndimage.label(mask, structure=np.ones((3, 3), dtype=int))
+    if n == 0:
+        return labels, 0
+    first, last = labels[:, 0], labels[:, -1]
+    # 第 0 列与最后一列在同一时刻及相邻时刻相连
+    a = np.concatenate([first, first[1:], first[:-1]])
+    b = np.concatenate([last, last[:-1], last[1:]])
+    link = (a > 0) & (b > 0)
+    if not link.any():
+        return labels, n
+    graph = sparse.coo_matrix((np.ones(link.sum()), (a[link], b[link])), shape=(n + 1, n + 1))
+    n_merged, comp = connected_components(graph, directed=False)
+    # 重新编号为 1..n_merged-1，背景 0 所在的分量固定为 0
+    comp = comp - comp[0]
+    comp[comp < 0] += n_merged
+    return comp[labels], n_merged - 1
+
+
+def _empty_catalog() -> pd.DataFrame:
+    return pd.DataFrame({k: pd.Series(dtype=v) for k, v in CATALOG_COLUMNS.items()})
+
+
+def _elapsed_days(times: np.ndarray) -> np.ndarray:
+    """相对第一个时刻的天数；times 为 datetime64 或 cftime 对象数组。"""
+    return pd.to_timedelta(np.asarray(times - times[0])).total_seconds().to_numpy() / 86400.
+
+
+def detect_events(
+    hovmoller: xr.DataArray,
+    threshold: Optional[float] = None,
+    n_std: float = 1.,
+    min_lifetime: float = 2.,
+    min_distance: float = 0.,
+    speed_range: Tuple[float, float] = (0., np.inf)
+) -> pd.DataFrame:
+    """
+    在 Hovmöller 图中识别并追踪 Kelvin 波事件：超过阈值的格点按 8 连通分量
+    （经度首尾相接）划分为事件，每个时刻取事件内的经向极大值作为脊线，
+    由脊线得到传播速度、距离和生命期。全部计算向量化，不逐事件循环。
+
+    参数：
+    --------
+    hovmoller : xr.DataArray
+        (time, lon)，见 equatorial_hovmoller。
+    threshold : float, optional
+        阈值；默认 n_std 倍的 Hovmöller 标准差。
+    n_std : float, optional
+        threshold 未给出时的标准差倍数，默认 1。
+    min_lifetime : float, optional
+        最短生命期（天），默认 2。
+    min_distance : float, optional
+        最短东传距离（km），默认 0。
+    speed_range : tuple, optional
+        保留的相速度范围（m/s），默认 (0, inf)，即只保留东传事件。
+
+    返回：
+    --------
+    pd.DataFrame
+        列见 CATALOG_COLUMNS，按开始时间排序；attrs 中记录 threshold 和时段长度 years。
+    """
+    hov = hovmoller.transpose('time', 'lon')
+    values = np.asarray(hov.values, dtype=np.float32)
+    times = hov['time'].values
+    lon = hov['lon'].values.astype(np.float64)
+    if threshold is None:
+        threshold = float(n_std * np.nanstd(values))
+    nlon = lon.size
+    days = _elapsed_days(times)
+    spd = 1. / np.median(np.diff(days)) if days.size > 1 else 1.
+    attrs = {'threshold': threshold, 'years': float(days.size / spd / 365.25)}
+
+    labels, n = _periodic_labels(np.nan_to_num(values, nan=-np.inf) > threshold)
+    if n == 0:
+        out = _empty_catalog()
+        out.attrs.update(attrs)
+        return out
+
+    # 脊线：每个 (事件, 时刻) 中数值最大的格点
+    flat = np.flatnonzero(labels)
+    lab = labels.ravel()[flat]
+    t = flat // nlon
+    x = flat % nlon
+    v = values.ravel()[flat]
+    order = np.lexsort((-v, t, lab))
+    lab, t, x, v = lab[order], t[order], x[order], v[order]
+    first = np.ones(lab.size, dtype=bool)
+    first[1:] = (lab[1:] != lab[:-1]) | (t[1:] != t[:-1])
+    lab, t, x, v = lab[first], t[first], x[first], v[first]
+
+    # 事件内按时间展开经度（跨越 0 度经线时连续）
+    ev, g = np.unique(lab, return_inverse=True)
+    start_idx = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+    end_idx = np.r_[start_idx[1:], g.size] - 1
+    step = np.diff(lon[x])
+    step = (step + 180.) % 360. - 180.
+    step[g[1:] != g[:-1]] = 0.
+    cum = np.r_[0., np.cumsum(step)]
+    unwrapped = lon[x][start_idx][g] + cum - cum[start_idx][g]
+
+    # 逐事件的最小二乘斜率
+    td = days[t]
+    count = np.bincount(g).astype(float)
+    sx, sy = np.bincount(g, td), np.bincount(g, unwrapped)
+    sxx, sxy = np.bincount(g, td * td), np.bincount(g, td * unwrapped)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (count * sxy - sx * sy) / (count * sxx - sx * sx)   # 度/天
+    speed = slope * KM_PER_DEGREE * 1e3 / 86400.
+
+    out = pd.DataFrame({
+        'event': ev.astype(np.int32),
+        'start': times[t[start_idx]],
+        'lifetime': ((t[end_idx] - t[start_idx] + 1) / spd).astype(np.float32),
+        'lon_start': (unwrapped[start_idx] % 360.).astype(np.float32),
+        'lon_end': (unwrapped[end_idx] % 360.).astype(np.float32),
+        'distance': ((unwrapped[end_idx] - unwrapped[start_idx]) * KM_PER_DEGREE).astype(np.float32),
+        'speed': speed.astype(np.float32),
+        'amplitude': np.maximum.reduceat(v, start_idx).astype(np.float32),
+        'mean_amplitude': (np.bincount(g, v) / count).astype(np.float32),
+        'size': np.bincount(labels.ravel(), minlength=n + 1)[ev].astype(np.int32),
+    })
+    keep = (out['lifetime'] >= min_lifetime) & (out['distance'] >= min_distance) \
+        & (out['speed'] >= speed_range[0]) & (out['speed'] <= speed_range[1])
+    out = out[keep].sort_values('start', kind='stable').reset_index(drop=True)
+    out['event'] = np.arange(len(out), dtype=np.int32)
+    out.attrs.update(attrs)
+    return out
+
+
+def _file_years(path: str, var: str) -> List[int]:
+    data = open_field(path, var, 'hovmoller')
+    try:
+        return sorted(set(data['time'].dt.year.values.tolist()))
+    finally:
+        data.close()
+
+
+def _year_slice(time: xr.DataArray, year: int) -> slice:
+    """某一年在（单调的）时间坐标中的位置，datetime64 和 cftime 通用。"""
+    idx = np.flatnonzero(time.dt.year.values == year)
+    return slice(int(idx[0]), int(idx[-1]) + 1)
+
+
+@profiled('events', input_arg=0)
+def _hovmoller_task(path: str, var: str, year: int, lat_bounds: Tuple[float, float],
+                    scale: float, time_chunk: int) -> xr.DataArray:
+    data = open_field(path, var, 'hovmoller')
+    try:
+        return equatorial_hovmoller(data.isel(time=_year_slice(data['time'], year)), lat_bounds, time_chunk, scale)
+    finally:
+        data.close()
+
+
+def event_catalog(
+    sources: Dict[str, str],
+    var: str = 'kelvin',
+    lat_bounds: Tuple[float, float] = (-10, 10),
+    scale: Union[float, Dict[str, float]] = 1.,
+    workers: Optional[int] = None,
+    time_chunk: int = 365,
+    **kwargs
+) -> pd.DataFrame:
+    """
+    多模式的 Kelvin 波事件表。读数和纬向平均按 (模式, 年) 分给进程池并行，
+    各年的 Hovmöller 拼接后再整体识别事件，因此跨年的事件不会被截断，
+    阈值（默认 1 倍标准差）也按整个时段计算。
+
+    参数：
+    --------
+    sources : dict
+        模式名 -> kelvin 滤波文件或 FieldStore 目录（如 model_file_index('CCKWs/*.nc')）。
+    var : str, optional
+        变量名，默认 'kelvin'。
+    lat_bounds : tuple, optional
+        Hovmöller 的纬度范围，默认 (-10, 10)。
+    scale : float 或 dict, optional
+        乘数；dict 时按模式名查找，缺省为 1。
+    workers : int, optional
+        进程数，默认 os.cpu_count()；为 1 时串行。
+    time_chunk : int, optional
+        每次读入的时间步数，默认 365。
+    **kwargs :
+        传给 detect_events（threshold、n_std、min_lifetime、min_distance、speed_range）。
+
+    返回：
+    --------
+    pd.DataFrame
+        在 CATALOG_COLUMNS 之前加上 model 列（分类类型）；
+        attrs['threshold']、attrs['years'] 为各模式使用的阈值和时段长度（年）。
+    """
+    def factor(model):
+        return float(scale.get(model, 1.)) if isinstance(scale, dict) else float(scale)
+
+    jobs = [(m, y) for m, path in sources.items() for y in _file_years(path, var)]
+    parts: Dict[str, Dict[int, xr.DataArray]] = {m: {} for m in sources}
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        for m, y in jobs:
+            parts[m][y] = _hovmoller_task(sources[m], var, y, lat_bounds, factor(m), time_chunk)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_hovmoller_task, sources[m], var, y, lat_bounds, factor(m), time_chunk): (m, y)
+                       for m, y in jobs}
+            for fut in as_completed(futures):
+                m, y = futures[fut]
+                parts[m][y] = fut.result()
+
+    tables, thresholds, years = [], {}, {}
+    for m in sources:
+        hov = xr.concat([parts[m][y] for y in sorted(parts[m])], dim='time')
+        table = detect_events(hov, **kwargs)
+        thresholds[m], years[m] = table.attrs['threshold'], table.attrs['years']
+        table.insert(0, 'model', m)
+        tables.append(table)
+        print(f'{m}: {len(table)} events')
+    out = pd.concat(tables, ignore_index=True) if tables else _empty_catalog()
+    out['model'] = pd.Categorical(out['model'], categories=list(sources))
+    out.attrs.update(threshold=thresholds, years=years)
+    return out
+
+
+def event_summary(catalog: pd.DataFrame) -> pd.DataFrame:
+    """
+    逐模式的事件统计：事件数、每年事件数（时段长度取自 attrs['years']），
+    以及相速度、生命期、传播距离、振幅的中位数。
+    """
+    years = pd.Series(catalog.attrs.get('years', {}), dtype=float)
+    table = catalog.groupby('model', observed=False).agg(
+        count=('event', 'size'),
+        speed=('speed', 'median'),
+        lifetime=('lifetime', 'median'),
+        distance=('distance', 'median'),
+        amplitude=('amplitude', 'median'),
+    )
+    table.insert(1, 'per_year', table['count'] / years.reindex(table.index))
+    return table
+
+
+def save_catalog(catalog: pd.DataFrame, path: str) -> str:
+    """
+    保存事件表：.nc（netCDF，每列一个变量）、.parquet（需要 pyarrow）或 .csv。
+    cftime 日历的 start 只有 .nc 能保留日历，.parquet/.csv 中保存为 ISO 字符串。
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    if not path.endswith('.nc') and 'start' in catalog and catalog['start'].dtype == object:
+        catalog = catalog.assign(start=[t.isoformat() for t in catalog['start']])
+    if path.endswith('.nc'):
+        ds = xr.Dataset.from_dataframe(catalog.assign(model=catalog['model'].astype(str))
+                                       if 'model' in catalog else catalog)
+        ds = ds.rename({'index': 'row'})
+        ds.to_netcdf(path)
+    elif path.endswith('.parquet'):
+        catalog.to_parquet(path)
+    else:
+        catalog.to_csv(path, index=False)
+    return path
+
+
+def load_catalog(path: str) -> pd.DataFrame:
+    """
+    读取 save_catalog 保存的事件表，恢复紧凑的列类型。
+    .nc 中的 cftime 时间读回为 cftime 对象；.parquet/.csv 中的时间字符串
+    能转换为 datetime64 时转换，否则（如 360_day 的 2 月 30 日）保留为字符串。
+    """
+    if path.endswith('.nc'):
+        with xr.open_dataset(path) as ds:
+            catalog = ds.to_dataframe().reset_index(drop=True)
+    elif path.endswith('.parquet'):
+        catalog = pd.read_parquet(path)
+    else:
+        catalog = pd.read_csv(path)
+    start = catalog['start']
+    if start.empty or isinstance(start.iloc[0], str):
+        try:
+            catalog['start'] = pd.to_datetime(start)
+        except (ValueError, OverflowError):
+            pass
+    catalog = catalog.astype({k: v for k, v in CATALOG_COLUMNS.items() if k in catalog and k != 'start'})
+    if 'model' in catalog:
+        catalog['model'] = catalog['model'].astype('category')
+        catalog = catalog[['model', *CATALOG_COLUMNS]]
+    return catalog
@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import numpy as np
+import xarray as xr
+from typing import Dict, List, Optional, Sequence, Union
+from .profiling import profiled
+
+# 两种分块布局：
+#   'maps'   时间分块、全场 (time_chunk, lat, lon)：逐时间块读取整个场，
+#            如 stream_stats、wk_spectrum（按时间段批量 FFT）、组合成；
+#   'series' 纬度分块、完整时间 (ntime, lat_chunk, lon)：读取若干纬度的完整序列，
+#            如 kelvin_filter（逐纬度块做时空 FFT）、Hovmöller、事件追踪。
+LAYOUTS = ('maps', 'series')
+
+# 各类操作优先使用的布局（open_field 的 op 参数）
+OPERATION_LAYOUT = {
+    'stats': 'maps',
+    'spectrum': 'maps',
+    'composite': 'maps',
+    'filter': 'series',
+    'hovmoller': 'series',
+    'events': 'series',
+}
+
+
+def _has_zarr() -> bool:
+    try:
+        import zarr  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class FieldStore:
+    """
+    滤波后（kelvin）和原始（pr）日降水的本地存储，每个变量可同时保存
+    LAYOUTS 中的两种布局，读取时按操作自动选择（见 OPERATION_LAYOUT）。
+    避免每次 notebook 运行都从 netCDF 重新读取、并按不适合的分块方向读取。
+
+    backend 为 'zarr'（压缩，需要安装 zarr）或 'memmap'（未压缩的 .npy，
+    通过 np.load(mmap_mode='r') 按需读页；'series' 布局按 (lat, lon, time)
+    顺序存放，每个格点的时间序列连续）。默认有 zarr 时用 zarr。
+
+    目录结构：manifest.json、<var>.<layout>.zarr 或 <var>.<layout>.npy，
+    memmap 时另有 <var>.coords.nc 保存坐标和属性。
+
+    参数：
+    --------
+    root : str
+        存储目录。
+    backend : str, optional
+        'zarr' 或 'memmap'；已有存储时以 manifest 中记录的为准。
+    """
+
+    manifest_name = 'manifest.json'
+
+    def __init__(self, root: str, backend: Optional[str] = None):
+        self.root = root
+        self.manifest = self._read_manifest()
+        stored = self.manifest.get('backend')
+        if stored is not None and backend is not None and backend != stored:
+            raise ValueError(f'{root} was written with backend {stored!r}, not {backend!r}')
+        self.backend = stored or backend or ('zarr' if _has_zarr() else 'memmap')
+        if self.backend not in ('zarr', 'memmap'):
+            raise ValueError(f"unknown backend {self.backend!r}, expected 'zarr' or 'memmap'")
+        if self.backend == 'zarr' and not _has_zarr():
+            raise ImportError("backend='zarr' requires the zarr package; use backend='memmap' instead")
+
+    def __repr__(self):
+        return f'FieldStore({self.root!r}, backend={self.backend!r}, variables={self.variables})'
+
+    @staticmethod
+    def is_store(path: str) -> bool:
+        return os.path.isdir(path) and os.path.exists(os.path.join(path, FieldStore.manifest_name))
+
+    def _read_manifest(self) -> dict:
+        path = os.path.join(self.root, self.manifest_name)
+        if not os.path.exists(path):
+            return {'variables': {}}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_manifest(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, self.manifest_name)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({**self.manifest, 'backend': self.backend}, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+    @property
+    def variables(self) -> List[str]:
+        return sorted(self.manifest['variables'])
+
+    def layouts(self, var: str) -> List[str]:
+        return list(self.manifest['variables'][var]['layouts'])
+
+    def _path(self, var: str, layout: str) -> str:
+        ext = 'zarr' if self.backend == 'zarr' else 'npy'
+        return os.path.join(self.root, f'{var}.{layout}.{ext}')
+
+    def _coords_path(self, var: str) -> str:
+        return os.path.join(self.root, f'{var}.coords.nc')
+
+    # ------------------------------------------------------------------ 写入
+
+    @profiled('store')
+    def write(
+        self,
+        var: str,
+        source: Union[str, xr.DataArray],
+        layouts: Sequence[str] = LAYOUTS,
+        source_var: Optional[str] = None,
+        time_chunk: int = 365,
+        lat_chunk: int = 4,
+        scale: float = 1.,
+        dtype: type = np.float32,
+        max_bytes: float = 2e9
+    ) -> 'FieldStore':
+        """
+        把一个 (time, lat, lon) 场写入存储，按时间块流式读取源数据。
+        'series' 布局按纬度组生成，每组在内存中不超过 max_bytes；
+        同时写 'maps' 时从刚写好的本地 'maps' 读取，而不是再读一遍源文件。
+
+        参数：
+        --------
+        var : str
+            存储中的变量名，如 'kelvin'、'pr'。
+        source : str 或 xr.DataArray
+            netCDF 文件或（惰性的）DataArray。
+        layouts : list of str, optional
+            要保存的布局，默认两种都存。
+        source_var : str, optional
+            源文件中的变量名，默认与 var 相同。
+        time_chunk : int, optional
+            'maps' 布局的时间块长度，默认 365。
+        lat_chunk : int, optional
+            'series' 布局（zarr）的纬度块大小，默认 4（与 kelvin_filter 的 lat_chunk 一致）。
+        scale : float, optional
+            写入前乘以的系数（如模式降水的 86400），默认 1。
+        dtype : type, optional
+            存储精度，默认 float32。
+        max_bytes : float, optional
+            生成 'series' 布局时每组纬度的内存上限，默认 2 GB。
+
+        返回：
+        --------
+        FieldStore
+            self，便于链式调用。
+        """
+        unknown = set(layouts) - set(LAYOUTS)
+        if unknown:
+            raise ValueError(f'unknown layouts {sorted(unknown)}, expected a subset of {LAYOUTS}')
+        t0 = time.perf_counter()
+        src = xr.open_dataset(source)[source_var or var] if isinstance(source, str) else source
+        src = src.transpose('time', 'lat', 'lon')
+        os.makedirs(self.root, exist_ok=True)
+        attrs = {k: v for k, v in src.attrs.items() if isinstance(v, (str, int, float))}
+        if scale != 1.:
+            attrs['scale_applied'] = scale
+        coords = xr.Dataset(coords={c: src[c] for c in ('time', 'lat', 'lon')})
+
+        written = []
+        if 'maps' in layouts:
+            self._write_maps(var, src, coords, attrs, time_chunk, scale, dtype)
+            written.append('maps')
+        if 'series' in layouts:
+            if written:
+                base = self._open_layout(var, 'maps', coords, attrs)
+                self._write_series(var, base, coords, attrs, time_chunk, lat_chunk, 1., dtype, max_bytes)
+            else:
+                self._write_series(var, src, coords, attrs, time_chunk, lat_chunk, scale, dtype, max_bytes)
+            written.append('series')
+        if self.backend == 'memmap':
+            coords.assign_attrs(attrs).to_netcdf(self._coords_path(var))
+        if isinstance(source, str):
+            src.close()
+
+        self.manifest['variables'][var] = {
+            'layouts': written, 'shape': list(src.shape), 'dtype': np.dtype(dtype).str,
+            'time_chunk': time_chunk, 'lat_chunk': lat_chunk,
+            'source': source if isinstance(source, str) else None,
+        }
+        self._write_manifest()
+        print(f'{var} stored in {self.root} as {written} ({time.perf_counter() - t0:.1f} s)')
+        return self
+
+    def _write_maps(self, var, src, coords, attrs, time_chunk, scale, dtype):
+        ntime, nlat, nlon = src.shape
+        path = self._path(var, 'maps')
+        if self.backend == 'memmap':
+            out = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=dtype, shape=(ntime, nlat, nlon))
+        for t0 in range(0, ntime, time_chunk):
+            sl = slice(t0, min(t0 + time_chunk, ntime))
+            block = _scaled(src.isel(time=sl).values, scale, dtype)
+            if self.backend == 'memmap':
+                out[sl] = block
+                continue
+            ds = xr.Dataset({var: (('time', 'lat', 'lon'), block, attrs)},
+                            coords={**coords.coords, 'time': coords['time'][sl]})
+            if t0 == 0:
+                ds.to_zarr(path, mode='w', encoding={var: {'chunks': (time_chunk, nlat, nlon)}})
+            else:
+                ds.to_zarr(path, append_dim='time')
+        if self.backend == 'memmap':
+            out.flush()
+            del out
+            os.replace(path + '.tmp', path)
+
+    def _write_series(self, var, src, coords, attrs, time_chunk, lat_chunk, scale, dtype, max_bytes):
+        ntime, nlat, nlon = src.shape
+        path = self._path(var, 'series')
+        # 每组纬度数：lat_chunk 的整数倍，且 (ntime, rows, lon) 不超过 max_bytes
+        rows = int(max_bytes // (ntime * nlon * np.dtype(dtype).itemsize))
+        rows = max(lat_chunk, rows // lat_chunk * lat_chunk)
+        if self.backend == 'memmap':
+            out = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=dtype, shape=(nlat, nlon, ntime))
+        for l0 in range(0, nlat, rows):
+            lsl = slice(l0, min(l0 + rows, nlat))
+            group = src.isel(lat=lsl)
+            buf = np.empty((ntime, lsl.stop - l0, nlon), dtype=dtype)
+            for t0 in range(0, ntime, time_chunk):
+                sl = slice(t0, min(t0 + time_chunk, ntime))
+                buf[sl] = _scaled(group.isel(time=sl).values, scale, dtype)
+            if self.backend == 'memmap':
+                out[lsl] = buf.transpose(1, 2, 0)
+                continue
+            ds = xr.Dataset({var: (('time', 'lat', 'lon'), buf, attrs)},
+                            coords={**coords.coords, 'lat': coords['lat'][lsl]})
+            if l0 == 0:
+                ds.to_zarr(path, mode='w', encoding={var: {'chunks': (ntime, lat_chunk, nlon)}})
+            else:
+                ds.to_zarr(path, append_dim='lat')
+        if self.backend == 'memmap':
+            out.flush()
+            del out
+            os.replace(path + '.tmp', path)
+
+    # ------------------------------------------------------------------ 读取
+
+    def choose_layout(self, var: str, op: Optional[str] = None) -> str:
+        """op 对应的布局（见 OPERATION_LAYOUT）；变量只存了一种布局时总是返回它。"""
+        available = self.layouts(var)
+        preferred = OPERATION_LAYOUT.get(op, 'maps')
+        return preferred if preferred in available else available[0]
+
+    def _open_layout(self, var: str, layout: str, coords: Optional[xr.Dataset] = None,
+                     attrs: Optional[dict] = None) -> xr.DataArray:
+        path = self._path(var, layout)
+        if self.backend == 'zarr':
+            return xr.open_dataset(path, engine='zarr', chunks=None)[var].transpose('time', 'lat', 'lon')
+        if coords is None:
+            with xr.open_dataset(self._coords_path(var)) as ds:
+                coords = ds.load()
+            attrs = coords.attrs
+        arr = np.load(path, mmap_mode='r')
+        if layout == 'series':
+            arr = arr.transpose(2, 0, 1)  # (lat, lon, time) -> (time, lat, lon) 视图，不复制
+        return xr.DataArray(arr, dims=('time', 'lat', 'lon'), name=var, attrs=dict(attrs or {}),
+                            coords={c: coords[c] for c in ('time', 'lat', 'lon')})
+
+    def open(self, var: str, op: Optional[str] = None, layout: Optional[str] = None) -> xr.DataArray:
+        """
+        惰性打开一个变量，维度 (time, lat, lon)。
+
+        参数：
+        --------
+        var : str
+            变量名。
+        op : str, optional
+            将要进行的操作（OPERATION_LAYOUT 的键，如 'stats'、'filter'），
+            据此选择布局。
+        layout : str, optional
+            直接指定布局，优先于 op。
+        """
+        if var not in self.manifest['variables']:
+            raise KeyError(f'{var!r} is not in {self.root} (available: {self.variables})')
+        layout = layout or self.choose_layout(var, op)
+        if layout not in self.layouts(var):
+            raise ValueError(f'{var!r} has no {layout!r} layout (available: {self.layouts(var)})')
+        return self._open_layout(var, layout)
+
+
+def _scaled(block: np.ndarray, scale: float, dtype: type) -> np.ndarray:
+    block = np.asarray(block, dtype=dtype)
+    if scale != 1.:
+        block = block * np.asarray(scale, dtype=dtype)
+    return block
+
+
+def open_field(path: str, var: str, op: Optional[str] = None) -> xr.DataArray:
+    """
+    打开一个场：path 是 FieldStore 目录时按 op 选择布局，否则按 netCDF 打开。
+    cckw_tools 中读取 kelvin/pr 文件的函数都经由这里，因此把文件换成
+    FieldStore 目录即可自动使用合适的分块布局。
+    """
+    if FieldStore.is_store(path):
+        return FieldStore(path).open(var, op)
+    return xr.open_dataset(path)[var]
+
+
+def build_field_store(
+    root: str,
+    sources: Dict[str, str],
+    layouts: Sequence[str] = LAYOUTS,
+    backend: Optional[str] = None,
+    **kwargs
+) -> FieldStore:
+    """
+    把若干 netCDF 变量写入同一个 FieldStore，如
+    {'pr': 'pr_day_<model>_..._interp_2x2.nc', 'kelvin': '..._kelvin_25.nc'}。
+    kwargs 传给 FieldStore.write（scale、time_chunk 等）。
+    """
+    store = FieldStore(root, backend)
+    for var, path in sources.items():
+        store.write(var, path, layouts, **kwargs)
+    return store
@@ -0,0 +1,259 @@
+import os
+import numpy as np
+import xarray as xr
+from scipy import fft as sfft
+from scipy import signal
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from .utils import get_curve, points_in_polygon
+from .field_store import open_field
+from .profiling import profiled
+
+
+def fft_wavenumber_frequency(nlon: int, ntime: int, spd: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (lon, time) 二维实 FFT（时间方向为实 FFT）输出网格对应的纬向波数和频率。
+
+    参数：
+    --------
+    nlon : int
+        经度格点数。
+    ntime : int
+        时间步数。
+    spd : int, optional
+        每天采样次数，默认 1。
+
+    返回：
+    --------
+    (wavenumber, frequency)
+        wavenumber 保持 FFT 原始顺序，东传为正；frequency 单位 CPD，非负。
+    """
+    # eastward waves exp(i(kx-wt)) land on numpy wavenumber -k for w>0
+    wavenumber = -sfft.fftfreq(nlon, 1. / nlon)
+    frequency = sfft.rfftfreq(ntime, 1. / spd)
+    return wavenumber, frequency
+
+
+def kelvin_band_mask(
+    wavenumber: np.ndarray,
+    frequency: np.ndarray,
+    he: Optional[List[float]] = None,
+    fmax: Optional[List[float]] = None
+) -> np.ndarray:
+    """
+    Kelvin 波带掩膜：get_curve 给出的包络（he=8-90 m 频散线、2-14 波数、
+    20 天至 fmax 周期线）内为 True，边界上的点也算在内。
+
+    参数：
+    --------
+    wavenumber : np.ndarray
+        纬向波数。
+    frequency : np.ndarray
+        频率 (CPD)。
+    he, fmax : list, optional
+        传给 get_curve 的等效深度和最高频率。
+
+    返回：
+    --------
+    np.ndarray
+        (frequency, wavenumber) 布尔数组。
+    """
+    kw_x, kw_y = get_curve(he=he, fmax=fmax)
+    return points_in_polygon(np.asarray(wavenumber)[None, :], np.asarray(frequency)[:, None],
+                             kw_x[0], kw_y[0])
+
+
+def _filter_block(block: np.ndarray, mask: np.ndarray, detrend: bool, dtype) -> np.ndarray:
+    """对 (time, lat, lon) 块做 FFT 掩膜滤波，mask 为 (frequency, wavenumber)。"""
+    x = np.asarray(block, dtype=dtype)
+    if detrend:
+        x = signal.detrend(x, axis=0).astype(dtype, copy=False)
+    spec = sfft.rfft2(x, axes=(2, 0))
+    spec *= mask[:, None, :]
+    return sfft.irfft2(spec, s=(x.shape[2], x.shape[0]), axes=(2, 0)).astype(dtype, copy=False)
+
+
+def _lat_chunks(nlat: int, lat_chunk: int) -> List[slice]:
+    return [slice(i, min(i + lat_chunk, nlat)) for i in range(0, nlat, lat_chunk)]
+
+
+def _iter_filtered(data: xr.DataArray, mask: np.ndarray, lat_chunk: int, threads: Optional[int],
+                   detrend: bool, dtype):
+    """
+    按纬度块并行滤波，逐块产出 (slice, 结果)。同时在途的块数不超过 2*threads，
+    因此内存占用与纬度块大小成正比，而不是与整个场成正比。
+    """
+    chunks = _lat_chunks(data.sizes['lat'], lat_chunk)
+    threads = threads or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pending = {}
+        for sl in chunks:
+            block = data.isel(lat=sl).values
+            pending[pool.submit(_filter_block, block, mask, detrend, dtype)] = sl
+            if len(pending) >= 2 * threads:
+                done = next(as_completed(pending))
+                yield pending.pop(done), done.result()
+        for fut in as_completed(list(pending)):
+            yield pending.pop(fut), fut.result()
+
+
+def kelvin_filter(
+    data: xr.DataArray,
+    he: Optional[List[float]] = None,
+    fmax: Optional[List[float]] = None,
+    spd: int = 1,
+    lat_chunk: int = 4,
+    threads: Optional[int] = None,
+    detrend: bool = True,
+    dtype: type = np.float32
+) -> xr.DataArray:
+    """
+    Kelvin 波时空滤波：对 (time, lon) 做实 FFT，保留 kelvin_band_mask 内的
+    波数-频率系数后逆变换。纬度分块并在线程池中并行处理（scipy.fft 会释放 GIL），
+    默认全程 float32。
+
+    参数：
+    --------
+    data : xr.DataArray
+        (time, lat, lon) 日降水。
+    he, fmax : list, optional
+        Kelvin 波带包络参数，见 utils.get_curve。
+    spd : int, optional
+        每天采样次数，默认 1。
+    lat_chunk : int, optional
+        每块的纬度数，默认 4。
+    threads : int, optional
+        线程数，默认 os.cpu_count()。
+    detrend : bool, optional
+        滤波前是否去除线性趋势，默认 True。
+    dtype : type, optional
+        计算精度，默认 np.float32。
+
+    返回：
+    --------
+    xr.DataArray
+        名为 'kelvin' 的滤波场，坐标与输入一致。
+    """
+    data = data.transpose('time', 'lat', 'lon')
+    ntime, nlat, nlon = data.shape
+    wavenumber, frequency = fft_wavenumber_frequency(nlon, ntime, spd)
+    mask = kelvin_band_mask(wavenumber, frequency, he, fmax)
+
+    out = np.empty((ntime, nlat, nlon), dtype=dtype)
+    for sl, result in _iter_filtered(data, mask, lat_chunk, threads, detrend, dtype):
+        out[:, sl] = result
+
+    return xr.DataArray(out, coords=data.coords, dims=data.dims, name='kelvin',
+                        attrs={**data.attrs, 'filter': 'kelvin', 'spd': spd})
+
+
+@profiled('filter', input_arg=0)
+def kelvin_filter_file(
+    src: str,
+    dst: str,
+    var: str = 'pr',
+    lat_bounds: Tuple[float, float] = (-25, 25),
+    he: Optional[List[float]] = None,
+    fmax: Optional[List[float]] = None,
+    spd: int = 1,
+    lat_chunk: int = 4,
+    threads: Optional[int] = None,
+    detrend: bool = True
+) -> str:
+    """
+    对单个文件做 Kelvin 滤波，按纬度块写入 dst 的 'kelvin' 变量（float32，压缩）。
+    结果不在内存中拼成完整数组，适合长序列、高分辨率数据。
+
+    参数：
+    --------
+    src : str
+        输入 netCDF 文件，如 pr_day_<model>_1997-2014_interp_2x2.nc。
+    dst : str
+        输出 netCDF 文件。
+    var : str, optional
+        输入变量名，默认 'pr'。
+    lat_bounds : tuple, optional
+        纬度范围，默认 (-25, 25)。
+    其余参数见 kelvin_filter。
+
+    返回：
+    --------
+    str
+        输出文件路径。
+    """
+    import netCDF4
+
+    data = open_field(src, var, 'filter').transpose('time', 'lat', 'lon')
+    if data.lat.values[0] > data.lat.values[-1]:
+        data = data.isel(lat=slice(None, None, -1))
+    data = data.sel(lat=slice(*lat_bounds))
+    ntime, nlat, nlon = data.shape
+    wavenumber, frequency = fft_wavenumber_frequency(nlon, ntime, spd)
+    mask = kelvin_band_mask(wavenumber, frequency, he, fmax)
+
+    folder = os.path.dirname(dst)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    tmp = dst + '.tmp'
+    # 先用 xarray 写坐标（保留时间编码），再用 netCDF4 逐块写变量
+    xr.Dataset(coords={c: data[c] for c in ('time', 'lat', 'lon')}).to_netcdf(tmp)
+    with netCDF4.Dataset(tmp, 'a') as nc:
+        v = nc.createVariable('kelvin', 'f4', ('time', 'lat', 'lon'), zlib=True, complevel=1,
+                              chunksizes=(ntime, min(lat_chunk, nlat), nlon))
+        v.setncatts({k: str(val) for k, val in data.attrs.items()})
+        v.filter = 'kelvin'
+        for sl, result in _iter_filtered(data, mask, lat_chunk, threads, detrend, np.float32):
+            v[:, sl, :] = result
+    data.close()
+    os.replace(tmp, dst)
+    return dst
+
+
+def kelvin_filter_batch(
+    jobs: Dict[str, Tuple[str, str]],
+    workers: Optional[int] = None,
+    overwrite: bool = False,
+    **kwargs
+) -> List[str]:
+    """
+    在进程池中批量滤波整个模式集合。输出比输入新时跳过。
+
+    参数：
+    --------
+    jobs : dict
+        模式名 -> (输入文件, 输出文件)。
+    workers : int, optional
+        进程数，默认 os.cpu_count()。每个进程内的线程数由 threads 参数控制（默认 1）。
+    overwrite : bool, optional
+        为 True 时全部重新计算。
+    **kwargs :
+        传给 kelvin_filter_file 的参数。
+
+    返回：
+    --------
+    list of str
+        本次完成滤波的模式名。
+    """
+    kwargs.setdefault('threads', 1)
+    todo = {}
+    for model, (src, dst) in jobs.items():
+        if (not overwrite and os.path.exists(dst)
+                and os.path.getmtime(dst) >= os.path.getmtime(src)):
+            print(f'{model} is up to date, skipping')
+        else:
+            todo[model] = (src, dst)
+
+    done = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(kelvin_filter_file, src, dst, **kwargs): model
+                   for model, (src, dst) in todo.items()}
+        for fut in as_completed(futures):
+            model = futures[fut]
+            try:
+                fut.result()
+            except Exception as e:
+                print(f'{model} failed: {e}')
+                continue
+            done.append(model)
+            print(f'{model} filtered')
+    return done
@@ -17,11 +17,13 @@ Created on %(date)s
 
 
 
+import os
+import hashlib
+from collections import OrderedDict
 import numpy as np
-from scipy.optimize import fsolve
 from functools import reduce
-import matplotlib.pyplot as plt
 import pandas as pd
+import xarray as xr
 
 pi = np.pi
 re    = 6.371008e6 # Earth's radius in meters
@@ -197,7 +199,7 @@ def eig_n_0(he,latitude=0,max_wn=50,n_wn=500):
     df.index.name = 'Wavenumber'
     return df
 
-def er_n(he,n,latitude=0.,max_wn=50,n_wn=500):
+def er_n(he,n,latitude=0.,max_wn=50,n_wn=500,solver='fsolve'):
     """
     Function that calculates the dispersion curve for the Equatorial Mixed
     Rossby Gravity Wave for a given Equivalent Depth.
@@ -212,23 +214,31 @@ def er_n(he,n,latitude=0.,max_wn=50,n_wn=500):
         The global wave number range is (-max_wn,max_wn)
     :param n_wn:
         Number of global wave numbers in the range (-max_wn,max_wn)
+    :param solver(optional):
+        'fsolve' solves the dispersion relationship iteratively from a seed,
+        'analytic' uses the closed-form roots given by matsuno_roots.
     :type he: Float
     :type n: Integer
     :type latitude: Float
     :type maxwn: Positive Integer (max_wn > 0)
     :type n_wn: Integer
+    :type solver: String
     :return: DataFrame with wn and frequency
     :rtype: DataFrame
     """
     (beta,perimeter) = beta_parameters(latitude)
     wn = wn_array(max_wn,n_wn) #Global Wavenumber
     k  = wn2k(wn,perimeter) # Wavenumber[rad m^{-1}]
-    # Use the Approximation to the Equatorial Rossby dispersion relationship as
-    # a seed for the solver function
-    angular_frequency = -beta*k/((k*k)+(2.*n+1.)*(beta/np.sqrt(g*he)))
-    angular_frequency[k>=0] = np.nan
-    angular_frequency[k<0] = fsolve(dispersion,angular_frequency[k<0],\
-                                    args=(k[k<0],n,he,beta))
+    if solver == 'analytic':
+        (angular_frequency,_,_) = matsuno_roots(k,n,he,beta)
+    else:
+        from scipy.optimize import fsolve
+        # Use the Approximation to the Equatorial Rossby dispersion relationship as
+        # a seed for the solver function
+        angular_frequency = -beta*k/((k*k)+(2.*n+1.)*(beta/np.sqrt(g*he)))
+        angular_frequency[k>=0] = np.nan
+        angular_frequency[k<0] = fsolve(dispersion,angular_frequency[k<0],\
+                                        args=(k[k<0],n,he,beta))
     (period,frequency) = afreq2freq(angular_frequency)
     # Period in [days/cycle]
     # Frequency [cycles/day] Cycles per Day(CPD)
@@ -237,7 +247,7 @@ def er_n(he,n,latitude=0.,max_wn=50,n_wn=500):
     df.index.name = 'Wavenumber'
     return df
 
-def eig_n(he,n,latitude=0.,max_wn=50,n_wn=500):
+def eig_n(he,n,latitude=0.,max_wn=50,n_wn=500,solver='fsolve'):
     """
     Function that calculates the dispersion curve for the Equatorial Easterly
     Gravity Wave for a given Equivalent Depth.
@@ -252,23 +262,31 @@ def eig_n(he,n,latitude=0.,max_wn=50,n_wn=500):
         The global wave number range is (-max_wn,max_wn)
     :param n_wn:
         Number of global wave numbers in the range (-max_wn,max_wn)
+    :param solver(optional):
+        'fsolve' solves the dispersion relationship iteratively from a seed,
+        'analytic' uses the closed-form roots given by matsuno_roots.
     :type he: Float
     :type n: Integer
     :type latitude: Float
     :type maxwn: Positive Integer (max_wn > 0)
     :type n_wn: Integer
+    :type solver: String
     :return: DataFrame with wn and frequency
     :rtype: DataFrame
     """
     (beta,perimeter) = beta_parameters(latitude)
     wn = wn_array(max_wn,n_wn) #Global Wavenumber
     k  = wn2k(wn,perimeter) # Wavenumber[rad m^{-1}]
-    # Use the Approximation to the EIG dispersion relationship as
-    # a seed for the solver function
-    angular_frequency = np.sqrt((2.*n+1.)*beta*np.sqrt(g*he)+(k**2)*g*he)
-    angular_frequency[k<=0] = np.nan
-    angular_frequency[k>0] = fsolve(dispersion,angular_frequency[k>0],\
-                                    args=(k[k>0],n,he,beta))
+    if solver == 'analytic':
+        (_,angular_frequency,_) = matsuno_roots(k,n,he,beta)
+    else:
+        from scipy.optimize import fsolve
+        # Use the Approximation to the EIG dispersion relationship as
+        # a seed for the solver function
+        angular_frequency = np.sqrt((2.*n+1.)*beta*np.sqrt(g*he)+(k**2)*g*he)
+        angular_frequency[k<=0] = np.nan
+        angular_frequency[k>0] = fsolve(dispersion,angular_frequency[k>0],\
+                                        args=(k[k>0],n,he,beta))
     (period,frequency) = afreq2freq(angular_frequency)
     # Period in [days/cycle]
     # Frequency [cycles/day] Cycles per Day(CPD)
@@ -277,7 +295,7 @@ def eig_n(he,n,latitude=0.,max_wn=50,n_wn=500):
     df.index.name = 'Wavenumber'
     return df
 
-def wig_n(he,n,latitude=0.,max_wn=50,n_wn=500):
+def wig_n(he,n,latitude=0.,max_wn=50,n_wn=500,solver='fsolve'):
     """
     Function that calculates the dispersion curve for the Equatorial Westerly
     Gravity Wave for a given Equivalent Depth.
@@ -292,23 +310,31 @@ def wig_n(he,n,latitude=0.,max_wn=50,n_wn=500):
         The global wave number range is (-max_wn,max_wn)
     :param n_wn:
         Number of global wave numbers in the range (-max_wn,max_wn)
+    :param solver(optional):
+        'fsolve' solves the dispersion relationship iteratively from a seed,
+        'analytic' uses the closed-form roots given by matsuno_roots.
     :type he: Float
     :type n: Integer
     :type latitude: Float
     :type maxwn: Positive Integer (max_wn > 0)
     :type n_wn: Integer
+    :type solver: String
     :return: DataFrame with wn and frequency
     :rtype: DataFrame
     """
     (beta,perimeter) = beta_parameters(latitude)
     wn = wn_array(max_wn,n_wn) #Global Wavenumber
     k  = wn2k(wn,perimeter) # Wavenumber[rad m^{-1}]
-    # Use the Approximation to the WIG dispersion relationship as
-    # a seed for the solver function
-    angular_frequency = np.sqrt((2.*n+1.)*beta*np.sqrt(g*he)+(k**2)*g*he)
-    angular_frequency[k>=0] = np.nan
-    angular_frequency[k<0] = fsolve(dispersion,angular_frequency[k<0],\
-                                    args=(k[k<0],n,he,beta))
+    if solver == 'analytic':
+        (_,_,angular_frequency) = matsuno_roots(k,n,he,beta)
+    else:
+        from scipy.optimize import fsolve
+        # Use the Approximation to the WIG dispersion relationship as
+        # a seed for the solver function
+        angular_frequency = np.sqrt((2.*n+1.)*beta*np.sqrt(g*he)+(k**2)*g*he)
+        angular_frequency[k>=0] = np.nan
+        angular_frequency[k<0] = fsolve(dispersion,angular_frequency[k<0],\
+                                        args=(k[k<0],n,he,beta))
     (period,frequency) = afreq2freq(angular_frequency)
     # Period in [days/cycle]
     # Frequency [cycles/day] Cycles per Day(CPD)
@@ -344,7 +370,90 @@ def dispersion(w,k,n,he,beta):
     disp = w**3-g*he*(k**2+(beta*(2.*n+1.)/np.sqrt(g*he)))*w-k*beta*g*he
     return disp
 
-def matsuno_dataframe(he,n=[1,2,3],latitude=0.,max_wn=50,n_wn=500):
+def matsuno_roots(k,n,he,beta):
+    """
+    Closed-form roots of the dispersion relationship for Matsuno Modes
+    (see dispersion). The cubic w**3+p*w+q = 0 with
+    p = -g*he*(k**2+beta*(2n+1)/sqrt(g*he)) and q = -k*beta*g*he has p<0, so
+    its three real roots follow from the trigonometric (Viete) solution:
+    w_j = 2*sqrt(-p/3)*cos(arccos(3q/(2p)*sqrt(-3/p))/3-2*pi*j/3), j=0,1,2.
+    The largest root is the EIG (k>0) or WIG (k<0) mode and the middle root
+    is the ER mode (k<0). All arguments are broadcast against each other, so
+    a single call solves whole arrays of k, n and he.
+    The closed-form roots satisfy the cubic to machine precision; the fsolve
+    solutions of er_n, eig_n and wig_n differ from them by up to ~1e-6
+    relative (e.g. eig_n, n=0, he=90m; typically ~1e-9), which is the
+    error of fsolve, not of the closed form.
+    :param k:
+        Longitudinal Wavenumber [rad m^{-1}]
+    :param n:
+        Meridional Mode Number
+    :param he:
+        Equivalent Depth
+    :param beta:
+        Beta-Plane Parameter
+    :type k: Numpy Array
+    :type n: Integer or Numpy Array
+    :type he: Float or Numpy Array
+    :type beta: Float
+    :return: (ER, EIG, WIG) angular frequencies in [rad s^{-1}], NaN where
+        the mode is not defined for the sign of k
+    :rtype: tuple
+    """
+    k = np.asarray(k,dtype=float)
+    n = np.asarray(n,dtype=float)
+    he = np.asarray(he,dtype=float)
+    p = -g*he*(k**2+(beta*(2.*n+1.)/np.sqrt(g*he)))
+    q = -k*beta*g*he
+    amp = 2.*np.sqrt(-p/3.)
+    phi = np.arccos(np.clip(3.*q/(p*amp),-1.,1.))/3.
+    w_max = amp*np.cos(phi)
+    w_mid = amp*np.cos(phi-2.*pi/3.)
+    er  = np.where(k<0,w_mid,np.nan)
+    eig = np.where(k>0,w_max,np.nan)
+    wig = np.where(k<0,w_max,np.nan)
+    return (er,eig,wig)
+
+def er_eig_wig_n(he,n,latitude=0.,max_wn=50,n_wn=500):
+    """
+    Function that calculates the dispersion curves for the Equatorial
+    Rossby, Easterly and Westerly Gravity Waves for a given Equivalent Depth
+    from a single call to matsuno_roots.
+    :param he:
+        Equivalent Depth
+    :param n:
+        Meridional Mode Number
+    :param latitude:
+        Latitude
+    :param max_wn:
+        Max global wave number.
+        The global wave number range is (-max_wn,max_wn)
+    :param n_wn:
+        Number of global wave numbers in the range (-max_wn,max_wn)
+    :type he: Float
+    :type n: Integer
+    :type latitude: Float
+    :type maxwn: Positive Integer (max_wn > 0)
+    :type n_wn: Integer
+    :return: (ER, EIG, WIG) DataFrames with wn and frequency, same as
+        er_n, eig_n and wig_n
+    :rtype: tuple
+    """
+    (beta,perimeter) = beta_parameters(latitude)
+    wn = wn_array(max_wn,n_wn) #Global Wavenumber
+    k  = wn2k(wn,perimeter) # Wavenumber[rad m^{-1}]
+    roots = matsuno_roots(k,n,he,beta)
+    df = []
+    for name,angular_frequency in zip(['ER','EIG','WIG'],roots):
+        (period,frequency) = afreq2freq(angular_frequency)
+        name = name+'(n='+str(n)+',he='+str(he)+'m)'
+        mode = pd.DataFrame(data={name:frequency},index=wn)
+        mode.index.name = 'Wavenumber'
+        df.append(mode)
+    return tuple(df)
+
+def matsuno_dataframe(he,n=[1,2,3],latitude=0.,max_wn=50,n_wn=500,solver='fsolve',
+                      cache=True):
     """
     Creates a dataframe with all Matsuno modes for a given set of meridional
     mode numbers given in a list.
@@ -359,23 +468,40 @@ def matsuno_dataframe(he,n=[1,2,3],latitude=0.,max_wn=50,n_wn=500):
         The global wave number range is (-max_wn,max_wn)
     :param n_wn:
         Number of global wave numbers in the range (-max_wn,max_wn)
+    :param solver(optional):
+        'fsolve' or 'analytic', see er_n
+    :param cache(optional):
+        Look the modes up in (and store them to) matsuno_cache
     :type he: Float
     :type n: List of integers (e.g. [1,2,3])
     :type latitude: Float
     :type maxwn: Positive Integer (max_wn > 0)
     :type n_wn: Integer
+    :type solver: String
+    :type cache: Boolean
     :return: DataFrame with wn and frequency
     :rtype: DataFrame
     """
+    if cache:
+        key = matsuno_cache.key(he,n,latitude,max_wn,n_wn,solver)
+        df = matsuno_cache.get(key)
+        if df is None:
+            df = matsuno_dataframe(he,n,latitude,max_wn,n_wn,solver,cache=False)
+            matsuno_cache.put(key,df)
+        return df.copy()
+
     df = []
     df.append(kelvin_mode(he,latitude,max_wn,n_wn))
     df.append(mrg_mode(he,latitude,max_wn,n_wn))
     df.append(eig_n_0(he,latitude,max_wn,n_wn))
 
     for nn in n:
-        df.append(er_n(he,nn,latitude,max_wn,n_wn))
-        df.append(eig_n(he,nn,latitude,max_wn,n_wn))
-        df.append(wig_n(he,nn,latitude,max_wn,n_wn))
+        if solver == 'analytic':
+            df.extend(er_eig_wig_n(he,nn,latitude,max_wn,n_wn))
+        else:
+            df.append(er_n(he,nn,latitude,max_wn,n_wn))
+            df.append(eig_n(he,nn,latitude,max_wn,n_wn))
+            df.append(wig_n(he,nn,latitude,max_wn,n_wn))
 
     df = reduce(lambda left,right: pd.merge(left,right,on='Wavenumber'), df)
     return df
@@ -408,6 +534,7 @@ def standar_plot(he,size=12,figsize=(8, 8),mx_wn=20,mx_freq=1.,labels='on'):
     :return: Plot with Matsuno Modes
     :rtype: Matplotlib Figure
     """
+    import matplotlib.pyplot as plt
 
     plt.rc('font', size=size)          # controls default text sizes
     plt.rc('axes', titlesize=size)     # fontsize of the axes title
@@ -487,7 +614,8 @@ def standar_plot(he,size=12,figsize=(8, 8),mx_wn=20,mx_freq=1.,labels='on'):
     plt.show()
     return fig
 
-def matsuno_modes_wk(he=[12,25,50],n=[1,],latitude=0.,max_wn=20,n_wn=500):
+def matsuno_modes_wk(he=[12,25,50],n=[1,],latitude=0.,max_wn=20,n_wn=500,solver='fsolve',
+                     cache=True):
     """
     Creates a dataframe with all Matsuno modes for a given set of meridional
     mode numbers given in a list.
@@ -502,29 +630,173 @@ def matsuno_modes_wk(he=[12,25,50],n=[1,],latitude=0.,max_wn=20,n_wn=500):
         The global wave number range is (-max_wn,max_wn)
     :param n_wn:
         Number of global wave numbers in the range (-max_wn,max_wn)
+    :param solver(optional):
+        'fsolve' or 'analytic', see er_n
+    :param cache(optional):
+        Look the modes up in (and store them to) matsuno_cache
     :type he: Float
     :type n: List of integers (e.g. [1,2,3])
     :type latitude: Float
     :type maxwn: Positive Integer (max_wn > 0)
     :type n_wn: Integer
+    :type solver: String
+    :type cache: Boolean
     :return: DataFrame with wn and frequency
     :rtype: DataFrame
     """
     matsuno_modes = {}
 
     for h in he:
-        df = []
-        df.append(kelvin_mode(h,latitude,max_wn,n_wn))
-        df.append(mrg_mode(h,latitude,max_wn,n_wn))
-        df.append(eig_n_0(h,latitude,max_wn,n_wn))
-
-        for nn in n:
-            df.append(er_n(h,nn,latitude,max_wn,n_wn))
-            df.append(eig_n(h,nn,latitude,max_wn,n_wn))
-            df.append(wig_n(h,nn,latitude,max_wn,n_wn))
-
-        df = reduce(lambda left,right: pd.merge(left,right,on='Wavenumber'), df)
-        matsuno_modes[h] = df
+        matsuno_modes[h] = matsuno_dataframe(h,n,latitude,max_wn,n_wn,solver,cache)
     return matsuno_modes
 
+def matsuno_modes_array(he=[12,25,50],n=[1,],latitude=0.,max_wn=20,n_wn=500):
+    """
+    Computes all Matsuno modes for a set of Equivalent Depths and meridional
+    mode numbers in one batched pass and returns them as a single array with
+    dims (he, mode, n, wavenumber). The modes are 'Kelvin', 'MRG', 'EIG0',
+    'ER', 'EIG' and 'WIG'; the n-independent ones (Kelvin, MRG, EIG0) are
+    repeated along n. Curves are picked by label instead of by column name,
+    e.g. modes.sel(he=25,mode='Kelvin',n=1), and the .values of such a
+    selection is a view into the underlying array, so it can be handed to
+    ax.plot without copying.
+    :param he:
+        Equivalent Depths
+    :param n:
+        Meridional Mode Numbers
+    :param latitude:
+        Latitude
+    :param max_wn:
+        Max global wave number.
+        The global wave number range is (-max_wn,max_wn)
+    :param n_wn:
+        Number of global wave numbers in the range (-max_wn,max_wn)
+    :type he: List of floats (e.g. [12,25,50])
+    :type n: List of integers (e.g. [1,2,3])
+    :type latitude: Float
+    :type maxwn: Positive Integer (max_wn > 0)
+    :type n_wn: Integer
+    :return: Frequency in [cycles/day] of every mode
+    :rtype: xarray DataArray
+    """
+    (beta,perimeter) = beta_parameters(latitude)
+    wn = wn_array(max_wn,n_wn) #Global Wavenumber
+    k  = wn2k(wn,perimeter) # Wavenumber[rad m^{-1}]
+    h  = np.asarray(he,dtype=float)[:,None,None]
+    nn = np.asarray(n,dtype=float)[None,:,None]
+    kk = k[None,None,:]
+    c  = np.sqrt(g*h) # Gravity wave speed [m s^{-1}]
+
+    afreq = np.empty((h.shape[0],6,nn.shape[1],k.size))
+    with np.errstate(divide='ignore',invalid='ignore'):
+        afreq[:,0] = np.where(kk>0,c*kk,np.nan)
+        afreq[:,1] = np.where(kk<0,c*kk*(0.5-0.5*np.sqrt(1.+(4*beta/(kk*kk*c)))),np.nan)
+        afreq[:,2] = np.where(kk>0,c*kk*(0.5+0.5*np.sqrt(1.+(4*beta/(kk*kk*c)))),np.nan)
+    (afreq[:,3],afreq[:,4],afreq[:,5]) = matsuno_roots(kk,nn,h,beta)
+    (period,frequency) = afreq2freq(afreq)
+    # Period in [days/cycle]
+    # Frequency [cycles/day] Cycles per Day(CPD)
+
+    modes = xr.DataArray(frequency,dims=('he','mode','n','wavenumber'),
+                         coords={'he':list(he),
+                                 'mode':['Kelvin','MRG','EIG0','ER','EIG','WIG'],
+                                 'n':list(n),'wavenumber':wn},
+                         name='frequency',
+                         attrs={'units':'cycles/day','latitude':latitude})
+    return modes
+
+class MatsunoCache(object):
+    """
+    Memoization cache for the Matsuno mode DataFrames built by
+    matsuno_dataframe (and therefore matsuno_modes_wk). Entries are keyed on
+    (he, n, latitude, max_wn, n_wn, solver) and kept in an in-process LRU of
+    at most *maxsize* entries. If *cache_dir* is given every entry is also
+    written there as a .npz file, so the curves survive kernel restarts.
+    The counters *hits*, *disk_hits* and *misses* tell whether repeated
+    figure builds reach the solver at all.
+    """
+
+    def __init__(self,maxsize=64,cache_dir=None):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self,he,n,latitude,max_wn,n_wn,solver):
+        """
+        Hash of the arguments of matsuno_dataframe. he is kept as given
+        since it is part of the column names ('Kelvin(he=25m)').
+        """
+        args = (he,tuple(n),float(latitude),max_wn,n_wn,solver)
+        return hashlib.sha1(repr(args).encode()).hexdigest()
+
+    def _path(self,key):
+        return os.path.join(self.cache_dir,'matsuno_'+key+'.npz')
+
+    def get(self,key):
+        """
+        Return the cached DataFrame for key or None.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        if self.cache_dir is not None and os.path.exists(self._path(key)):
+            with np.load(self._path(key)) as npz:
+                df = pd.DataFrame(npz['values'],index=npz['wavenumber'],
+                                  columns=list(npz['columns']))
+            df.index.name = 'Wavenumber'
+            self.disk_hits += 1
+            self._remember(key,df)
+            return df
+        self.misses += 1
+        return None
+
+    def put(self,key,df):
+        """
+        Store df in memory and, if cache_dir is set, on disk.
+        """
+        self._remember(key,df)
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir,exist_ok=True)
+            tmp = self._path(key)+'.tmp'
+            with open(tmp,'wb') as f:
+                np.savez(f,values=df.values,wavenumber=df.index.values,
+                         columns=np.array(df.columns,dtype=str))
+            os.replace(tmp,self._path(key))
+
+    def _remember(self,key,df):
+        self._entries[key] = df
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self,disk=False):
+        """
+        Empty the in-process LRU and reset the counters. With disk=True
+        the .npz files in cache_dir are removed too.
+        """
+        self._entries.clear()
+        self.hits = self.disk_hits = self.misses = 0
+        if disk and self.cache_dir is not None and os.path.isdir(self.cache_dir):
+            for f in os.listdir(self.cache_dir):
+                if f.startswith('matsuno_') and f.endswith('.npz'):
+                    os.remove(os.path.join(self.cache_dir,f))
+
+    def info(self):
+        """
+        Counters and sizes of the cache.
+        :rtype: dict
+        """
+        return {'hits':self.hits,'disk_hits':self.disk_hits,
+                'misses':self.misses,'currsize':len(self._entries),
+                'maxsize':self.maxsize,'cache_dir':self.cache_dir}
+
+# Shared cache used by matsuno_dataframe and matsuno_modes_wk. Set the
+# CCKW_MATSUNO_CACHE_DIR environment variable (or matsuno_cache.cache_dir)
+# to keep the curves on disk between sessions.
+matsuno_cache = MatsunoCache(cache_dir=os.environ.get('CCKW_MATSUNO_CACHE_DIR'))
+
 
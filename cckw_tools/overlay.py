@@ -0,0 +1,137 @@
+import functools
+import numpy as np
+from matplotlib.collections import LineCollection
+from typing import List, Optional, Sequence, Tuple
+from .ma import matsuno_modes_array
+from .utils import get_curve
+
+
+def _split_finite(x: np.ndarray, y: np.ndarray) -> List[np.ndarray]:
+    """把含 NaN 的曲线拆成若干段连续的 (N, 2) 顶点数组。"""
+    ok = np.isfinite(y)
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], ok.astype(int), [0]])))
+    return [np.column_stack([x[a:b], y[a:b]]) for a, b in zip(edges[::2], edges[1::2]) if b - a > 1]
+
+
+class DispersionOverlay:
+    """
+    WK 谱图上的叠加线：Matsuno 频散曲线、get_curve 的 Kelvin 包络、
+    Kelvin 高亮段和周期线。所有顶点在构造时一次算好，attach 时只为每个
+    ax 新建一个 LineCollection（外加周期标注文字），因此多子图的绘制时间
+    和 PDF 中的对象数都与曲线条数无关。
+
+    参数：
+    --------
+    he : list of float, optional
+        等效深度，默认 [90, 25, 8]。
+    n : list of int, optional
+        经向模态数，默认 [1]。
+    modes : tuple of str, optional
+        需要画的模态，取自 matsuno_modes_array 的 mode 坐标，
+        默认 ('Kelvin', 'ER', 'WIG', 'EIG')。
+    max_wn : float, optional
+        波数范围 (-max_wn, max_wn)，默认 15。
+    envelope : bool, optional
+        是否画 get_curve 的 Kelvin 包络（绿色），默认 True。
+    kelvin_highlight : tuple, optional
+        绿色高亮的 Kelvin 曲线段 ((he, wn_min, wn_max), ...)，
+        默认与 plot_cmip_future 相同的 ((90, 2, 5.2), (8, 2.6, 14))。
+    period_lines : list of float, optional
+        周期线（天），默认 [3, 6, 30]；None 表示不画。
+    max_freq : float, optional
+        周期线只画在该频率以下，默认 0.5。
+    n_wn : int, optional
+        曲线的波数采样数，默认 500。
+    """
+
+    def __init__(
+        self,
+        he: Sequence[float] = (90, 25, 8),
+        n: Sequence[int] = (1,),
+        modes: Sequence[str] = ('Kelvin', 'ER', 'WIG', 'EIG'),
+        max_wn: float = 15,
+        envelope: bool = True,
+        kelvin_highlight: Optional[Sequence[Tuple[float, float, float]]] = ((90, 2, 5.2), (8, 2.6, 14)),
+        period_lines: Optional[Sequence[float]] = (3, 6, 30),
+        max_freq: float = 0.5,
+        n_wn: int = 500
+    ):
+        self.max_wn = max_wn
+        self.max_freq = max_freq
+        self.period_lines = [d for d in (period_lines or []) if 1. / d <= max_freq]
+        segs, colors, widths, styles = [], [], [], []
+
+        def add(pieces, color, width, style):
+            segs.extend(pieces)
+            colors.extend([color] * len(pieces))
+            widths.extend([width] * len(pieces))
+            styles.extend([style] * len(pieces))
+
+        curves = matsuno_modes_array(he=list(he), n=list(n), max_wn=max_wn, n_wn=n_wn)
+        wn = curves.wavenumber.values
+        # n 无关的模态（Kelvin/MRG/EIG0）在 n 维上是重复的，只取一次
+        for h in curves.he.values:
+            for mode in modes:
+                ns = curves.n.values[:1] if mode in ('Kelvin', 'MRG', 'EIG0') else curves.n.values
+                for nn in ns:
+                    add(_split_finite(wn, curves.sel(he=h, mode=mode, n=nn).values), 'k', 1.5, 'solid')
+        for h, w0, w1 in (kelvin_highlight or []):
+            if h in curves.he.values:
+                f = curves.sel(he=h, mode='Kelvin', n=curves.n.values[0]).values
+                keep = (wn >= w0) & (wn <= w1)
+                add(_split_finite(wn[keep], f[keep]), 'g', 1.5, 'solid')
+        if envelope:
+            kw_x, kw_y = get_curve()
+            add([np.column_stack([kw_x[0], kw_y[0]])], 'g', 1.2, 'solid')
+        for d in self.period_lines:
+            add([np.array([[-max_wn, 1. / d], [max_wn, 1. / d]])], 'k', 0.5, 'dashed')
+
+        self.segments = segs
+        self.colors = colors
+        self.linewidths = widths
+        self.linestyles = styles
+
+    def __len__(self):
+        return len(self.segments)
+
+    def collection(self, zorder: float = 5) -> LineCollection:
+        """新建一个包含全部叠加线的 LineCollection（顶点数组共享，不复制）。"""
+        return LineCollection(self.segments, colors=self.colors, linewidths=self.linewidths,
+                              linestyles=self.linestyles, zorder=zorder)
+
+    def attach(self, ax, text_size: Optional[float] = 12, zorder: float = 5) -> LineCollection:
+        """
+        把叠加线加到 ax 上，并在 text_size 不为 None 时标注周期线（'3 days' 等，
+        与 set_ax 的样式一致）。不改变坐标范围。
+        """
+        lc = ax.add_collection(self.collection(zorder), autolim=False)
+        if text_size is not None:
+            for d in self.period_lines:
+                ax.text(-self.max_wn + 0.8, 1. / d + 0.01, str(d) + ' days', color='k',
+                        size=text_size - 6, bbox={'facecolor': 'w', 'alpha': 0.9, 'edgecolor': 'none'})
+        return lc
+
+
+@functools.lru_cache(maxsize=16)
+def _cached_overlay(he, n, modes, max_wn, envelope, kelvin_highlight, period_lines, max_freq, n_wn):
+    return DispersionOverlay(he, n, modes, max_wn, envelope, kelvin_highlight, period_lines, max_freq, n_wn)
+
+
+def get_overlay(
+    he: Sequence[float] = (90, 25, 8),
+    n: Sequence[int] = (1,),
+    modes: Sequence[str] = ('Kelvin', 'ER', 'WIG', 'EIG'),
+    max_wn: float = 15,
+    envelope: bool = True,
+    kelvin_highlight: Optional[Sequence[Tuple[float, float, float]]] = ((90, 2, 5.2), (8, 2.6, 14)),
+    period_lines: Optional[Sequence[float]] = (3, 6, 30),
+    max_freq: float = 0.5,
+    n_wn: int = 500
+) -> DispersionOverlay:
+    """
+    返回（并缓存）给定参数的 DispersionOverlay，同一进程内同样的参数只构造一次。
+    参数见 DispersionOverlay。
+    """
+    as_tuple = lambda a: None if a is None else tuple(tuple(x) if np.ndim(x) else x for x in a)
+    return _cached_overlay(as_tuple(he), as_tuple(n), tuple(modes), max_wn, envelope,
+                           as_tuple(kelvin_highlight), as_tuple(period_lines), max_freq, n_wn)
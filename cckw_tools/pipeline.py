@@ -0,0 +1,523 @@
+import os
+import json
+import time
+import argparse
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional, Sequence
+from .profiling import profile_stage
+
+STAGES = ('filter', 'stats', 'spectra', 'skill', 'composites', 'figures')
+
+
+class Task:
+    """
+    流水线中的一个任务：调用 func(*args, **kwargs)，读取 inputs，写出 outputs，
+    在 deps 中的任务完成后才能运行。所有输出都存在、比所有输入新，
+    且参数与上次运行相同时视为最新（类似 make）。model 为任务所处理的模式（可选），
+    打开性能记录（见 profiling）时用于按模式汇总。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        stage: str,
+        func: Callable,
+        args: Sequence = (),
+        kwargs: Optional[dict] = None,
+        inputs: Sequence[str] = (),
+        outputs: Sequence[str] = (),
+        deps: Sequence[str] = (),
+        model: Optional[str] = None
+    ):
+        self.name = name
+        self.stage = stage
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = kwargs or {}
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.model = model
+
+    def __repr__(self):
+        return f'Task({self.name!r}, deps={self.deps})'
+
+    @property
+    def signature(self) -> str:
+        """函数名和参数的哈希，参数变化时任务需要重新运行。"""
+        blob = json.dumps([self.func.__module__, self.func.__name__, self.args, self.kwargs],
+                          sort_keys=True, default=str)
+        return hashlib.sha1(blob.encode()).hexdigest()
+
+    def is_current(self, state: dict) -> bool:
+        if state.get(self.name) != self.signature:
+            return False
+        if not self.outputs or not all(os.path.exists(p) for p in self.outputs):
+            return False
+        newest_input = max((os.path.getmtime(p) for p in self.inputs if os.path.exists(p)), default=0.)
+        return min(os.path.getmtime(p) for p in self.outputs) >= newest_input
+
+    def run(self):
+        for p in self.outputs:
+            folder = os.path.dirname(p)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+        return self.func(*self.args, **self.kwargs)
+
+
+def _execute(task: Task) -> float:
+    t0 = time.perf_counter()
+    with profile_stage(task.stage, task=task.name, model=task.model):
+        task.run()
+    return time.perf_counter() - t0
+
+
+def _check_dag(tasks: Dict[str, Task]) -> None:
+    for t in tasks.values():
+        for d in t.deps:
+            if d not in tasks:
+                raise ValueError(f'task {t.name!r} depends on unknown task {d!r}')
+    seen, stack = set(), set()
+
+    def visit(name):
+        if name in stack:
+            raise ValueError(f'dependency cycle through {name!r}')
+        if name not in seen:
+            stack.add(name)
+            for d in tasks[name].deps:
+                visit(d)
+            stack.discard(name)
+            seen.add(name)
+    for name in tasks:
+        visit(name)
+
+
+def run_tasks(
+    tasks: Sequence[Task],
+    workers: Optional[int] = None,
+    force: bool = False,
+    dry_run: bool = False,
+    state_file: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    按依赖关系运行任务：依赖都完成的任务立即提交到进程池，
+    因此相互独立的任务（不同模式的滤波、谱、统计）同时运行。
+
+    参数：
+    --------
+    tasks : list of Task
+        任务列表（名称唯一）。
+    workers : int, optional
+        进程数，默认 os.cpu_count()；为 1 时在当前进程内顺序运行。
+    force : bool, optional
+        为 True 时忽略“最新”判断，全部运行。
+    dry_run : bool, optional
+        只打印将要运行的任务。
+    state_file : str, optional
+        记录各任务参数签名的 JSON 文件，用于判断参数是否变化。
+
+    返回：
+    --------
+    dict
+        任务名 -> 'done' | 'up to date' | 'failed' | 'blocked' | 'would run'。
+    """
+    tasks = {t.name: t for t in tasks}
+    _check_dag(tasks)
+    state = {}
+    if state_file and os.path.exists(state_file):
+        with open(state_file) as f:
+            state = json.load(f)
+
+    status: Dict[str, str] = {}
+    pending = dict(tasks)
+    running = {}
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and not dry_run else None
+
+    def save_state():
+        if state_file and not dry_run:
+            tmp = state_file + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(state, f, indent=1, sort_keys=True)
+            os.replace(tmp, state_file)
+
+    def finish(task, ok, elapsed=None, error=None):
+        if ok:
+            status[task.name] = 'done'
+            state[task.name] = task.signature
+            print(f'[done] {task.name} ({elapsed:.1f} s)')
+        else:
+            status[task.name] = 'failed'
+            state.pop(task.name, None)
+            print(f'[failed] {task.name}: {error}')
+        save_state()
+
+    try:
+        while pending or running:
+            progressed = False
+            for name in list(pending):
+                task = pending[name]
+                dep_status = [status.get(d) for d in task.deps]
+                if any(s in ('failed', 'blocked') for s in dep_status):
+                    status[name] = 'blocked'
+                    del pending[name]
+                    print(f'[blocked] {name}')
+                    progressed = True
+                    continue
+                if not all(s in ('done', 'up to date', 'would run') for s in dep_status):
+                    continue
+                del pending[name]
+                progressed = True
+                if not force and 'would run' not in dep_status and task.is_current(state):
+                    status[name] = 'up to date'
+                    continue
+                if dry_run:
+                    status[name] = 'would run'
+                    print(f'[would run] {name}')
+                elif pool is None:
+                    try:
+                        finish(task, True, _execute(task))
+                    except Exception as e:
+                        finish(task, False, error=e)
+                else:
+                    running[pool.submit(_execute, task)] = task
+            if running and not progressed:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    task = running.pop(fut)
+                    try:
+                        finish(task, True, fut.result())
+                    except Exception as e:
+                        finish(task, False, error=e)
+            elif not running and not progressed:
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+    return status
+
+
+# ---------------------------------------------------------------------------
+# 各阶段的任务函数（模块级函数，便于在子进程中调用）
+
+def _kelvin_filter(src: str, dst: str, **kwargs) -> None:
+    from .kelvin_filter import kelvin_filter_file
+    kwargs.setdefault('threads', 1)
+    kelvin_filter_file(src, dst, **kwargs)
+
+
+def _stats_task(src: str, dst: str, scale: float, **kwargs) -> None:
+    from .streaming import stream_stats_file
+    ds = stream_stats_file(src, scale=scale, **kwargs)
+    ds.to_netcdf(dst + '.tmp')
+    os.replace(dst + '.tmp', dst)
+
+
+def _spectrum_task(src: str, dst: str, var: str, **kwargs) -> None:
+    from .spectra_store import _compute_one
+    _compute_one(os.path.basename(dst)[:-3], src, var, dst, kwargs)
+
+
+def _merge_spectra_task(store_dir: str, models: List[str], dst: str) -> None:
+    from .spectra_store import SpectraStore
+    # 各模式的谱是否最新由流水线判断，这里只按名称拼接，不改动 manifest
+    SpectraStore(store_dir).to_netcdf(dst + '.tmp', models)
+    os.replace(dst + '.tmp', dst)
+
+
+def _skill_task(spectra: str, dst: str, reference: str, band: str, significance: bool) -> None:
+    import xarray as xr
+    from .skill import spectral_skill
+    from .resampling import spectral_significance
+    with xr.open_dataset(spectra) as ds:
+        psumsym = ds.psumsym.load()
+    table = spectral_skill(psumsym, reference=reference, band=band)
+    if significance:
+        sig = spectral_significance(psumsym, reference=reference, band=band, seed=0)
+        table = table.join(sig[['ci_low', 'ci_high', 'p_value']], rsuffix='_block')
+    table.to_csv(dst)
+
+
+def _identity(data):
+    return data
+
+
+def _composite_task(sources: Dict[str, str], variable: str, dst: str, reference: str,
+                    groups: Optional[Dict[str, List[str]]], skill: Optional[str],
+                    threshold: Optional[float]) -> None:
+    import pandas as pd
+    from .ensemble import ensemble_composite, groups_from_skill
+    if groups is None:
+        groups = groups_from_skill(pd.read_csv(skill, index_col=0)['corr'], threshold)
+    ds = ensemble_composite(sources, groups, reference=reference, statistic=_identity, var=variable)
+    ds.to_netcdf(dst + '.tmp')
+    os.replace(dst + '.tmp', dst)
+
+
+def _figure_taylor(skill: str, dst: str, groups: Optional[Dict[str, List[str]]],
+                   threshold: Optional[float]) -> None:
+    import pandas as pd
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from .TaylorDiagram import TaylorDiagram
+    from .ensemble import groups_from_skill
+    table = pd.read_csv(skill, index_col=0)
+    if groups is None:
+        groups = groups_from_skill(table['corr'], threshold)
+    ref_std = float((table['std'] / table['norm_std']).iloc[0])
+    colors = {'good': 'red', 'poor': 'blue'}
+    fig = plt.figure(figsize=(15, 8), dpi=100)
+    dia = TaylorDiagram(ref_std, fig, rect=111, label='Obs', srange=(0., 1.8))
+    group_of = {m: g for g, ms in groups.items() for m in ms}
+    dia.add_samples(table['std'].values, table['corr'].values,
+                    markers=['$%d$' % (i + 1) for i in range(len(table))],
+                    colors=[colors.get(group_of.get(m), 'gray') for m in table.index],
+                    sizes=64, labels=list(table.index), alpha=0.6)
+    contours = dia.add_contours()
+    plt.clabel(contours, inline=1, fontsize=10, fmt='%.2f')
+    fig.legend(dia.samplePoints, [p.get_label() for p in dia.samplePoints], numpoints=1,
+               ncol=2, loc='upper right', frameon=False, bbox_to_anchor=(1.15, 0.7))
+    fig.savefig(dst, bbox_inches='tight')
+    plt.close(fig)
+
+
+def _figure_std_maps(composite: str, dst: str, scale: float) -> None:
+    import xarray as xr
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import cartopy.crs as ccrs
+    from .plot import plot_space_data
+    with xr.open_dataset(composite) as ds:
+        ds = ds.load()
+    panels = [(ds['reference'], 'Reference')] + [(ds['mean'].sel(group=g), str(g)) for g in ds.group.values]
+    fig, axs = plt.subplots(len(panels), 1, figsize=(8, 2.2 * len(panels)),
+                            subplot_kw={'projection': ccrs.PlateCarree(central_longitude=180)})
+    box = [float(ds.lon.min()), float(ds.lon.max()), float(ds.lat.min()), float(ds.lat.max())]
+    for ax, (data, title) in zip(list(axs.flat) if hasattr(axs, 'flat') else [axs], panels):
+        f = plot_space_data(data * scale, ax, 'YlGnBu', 'mm/day', title, box=box)
+    fig.colorbar(f, ax=axs, orientation='horizontal', shrink=0.6, pad=0.08)
+    fig.savefig(dst, bbox_inches='tight')
+    plt.close(fig)
+
+
+def _figure_spectra(spectra: str, dst: str, models: List[str]) -> None:
+    import xarray as xr
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from .utils import get_curve
+    with xr.open_dataset(spectra) as ds:
+        psumsym = ds.psumsym.load()
+    models = [m for m in models if m in psumsym.model.values]
+    fig, axs = plt.subplots(1, len(models), figsize=(4 * len(models), 3.6), squeeze=False)
+    kw_x, kw_y = get_curve()
+    levels = [1, 1.1, 1.2, 1.3, 1.4, 1.5, 1.6, 1.7, 1.8, 1.9]
+    for ax, m in zip(axs.flat, models):
+        sym = psumsym.sel(model=m, frequency=slice(0, 0.5), wavenumber=slice(-15, 15))
+        cs = ax.contourf(sym.wavenumber, sym.frequency, sym, levels=levels, cmap='bwr', extend='neither')
+        ax.plot(kw_x[0], kw_y[0], 'g', linewidth=1.2)
+        ax.axvline(0, color='k', linestyle='--')
+        ax.set_ylim(0.02, 0.5)
+        ax.set_title(m)
+    fig.colorbar(cs, ax=axs, orientation='horizontal', shrink=0.6)
+    fig.savefig(dst, bbox_inches='tight')
+    plt.close(fig)
+
+
+# ---------------------------------------------------------------------------
+# 配置文件 -> 任务 DAG
+
+def load_config(path: str) -> dict:
+    """读取 JSON（.json）或 TOML（.toml）配置文件。"""
+    if path.endswith('.toml'):
+        import tomllib
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    with open(path) as f:
+        return json.load(f)
+
+
+def _resolve_inputs(config: dict) -> Dict[str, str]:
+    from .ensemble import model_file_index
+    inputs = config['inputs']
+    if isinstance(inputs, str):
+        inputs = model_file_index(inputs, config.get('name_pos', 2))
+    models = config.get('models')
+    if models is not None:
+        inputs = {m: inputs[m] for m in models if m in inputs}
+    return dict(inputs)
+
+
+def _scale_for(config: dict, model: str) -> float:
+    scale = config.get('scale', 1.)
+    if isinstance(scale, dict):
+        return float(scale.get(model, scale.get('default', 1.)))
+    return float(scale)
+
+
+def build_tasks(config: dict) -> List[Task]:
+    """
+    由配置生成任务 DAG：
+
+        filter:<m> -> stats:<m> ----------------> composite:<v> -> figure:std_maps
+        spectra:<m> -> spectra:merge -> skill -> figure:taylor
+                                    \\-> figure:spectra
+
+    配置项（JSON/TOML）：
+        inputs      模式名 -> 文件，或 glob 路径（配合 name_pos）
+        models      只处理这些模式（可选）
+        reference   参考资料名，默认 'GPCP'
+        output_dir  输出目录，默认 'output'
+        var         输入变量名，默认 'pr'
+        scale       乘数，数值或 {"default": 86400, "GPCP": 1}
+        filter / stats / spectra   传给 kelvin_filter_file / stream_stats_file / wk_spectrum 的参数
+        skill       {"band": "Kelvin_box", "significance": true}
+        groups      {"good": [...], "poor": [...]}，或 {"threshold": 0.6} 由技巧评分分组
+        composites  需要做组合成的统计量，默认 ["std"]
+        figures     需要的图，可选 "taylor"、"std_maps"、"spectra"
+    """
+    inputs = _resolve_inputs(config)
+    ref = config.get('reference', 'GPCP')
+    out = config.get('output_dir', 'output')
+    var = config.get('var', 'pr')
+    d = {k: os.path.join(out, k) for k in ('kelvin', 'stats', 'spectra', 'skill', 'composites', 'figures')}
+    tasks: List[Task] = []
+
+    stats_files = {}
+    for m, src in inputs.items():
+        kelvin = os.path.join(d['kelvin'], f'{m}_kelvin.nc')
+        tasks.append(Task(f'filter:{m}', 'filter', _kelvin_filter, (src, kelvin),
+                          {'var': var, **config.get('filter', {})}, [src], [kelvin], model=m))
+        stats_files[m] = os.path.join(d['stats'], f'{m}_stats.nc')
+        tasks.append(Task(f'stats:{m}', 'stats', _stats_task, (kelvin, stats_files[m], _scale_for(config, m)),
+                          config.get('stats', {}), [kelvin], [stats_files[m]], [f'filter:{m}'], model=m))
+        spec = os.path.join(d['spectra'], f'{m}.nc')
+        tasks.append(Task(f'spectra:{m}', 'spectra', _spectrum_task, (src, spec, var),
+                          config.get('spectra', {}), [src], [spec], model=m))
+
+    all_spectra = os.path.join(out, 'all_wk_spectra.nc')
+    models = sorted(inputs)
+    tasks.append(Task('spectra:merge', 'spectra', _merge_spectra_task, (d['spectra'], models, all_spectra),
+                      inputs=[os.path.join(d['spectra'], f'{m}.nc') for m in models],
+                      outputs=[all_spectra], deps=[f'spectra:{m}' for m in models]))
+
+    skill_cfg = config.get('skill', {})
+    skill = os.path.join(d['skill'], 'skill.csv')
+    tasks.append(Task('skill', 'skill', _skill_task,
+                      (all_spectra, skill, ref, skill_cfg.get('band', 'Kelvin_box'),
+                       skill_cfg.get('significance', True)),
+                      inputs=[all_spectra], outputs=[skill], deps=['spectra:merge']))
+
+    groups_cfg = config.get('groups', {'threshold': 0.6})
+    groups = None if 'threshold' in groups_cfg else groups_cfg
+    threshold = groups_cfg.get('threshold')
+    # 按阈值分组时组合成读取 skill.csv，技巧表变化后需要重新计算
+    group_deps = ['skill'] if groups is None else []
+    group_inputs = [skill] if groups is None else []
+    stat_deps = [f'stats:{m}' for m in models]
+    for v in config.get('composites', ['std']):
+        comp = os.path.join(d['composites'], f'composite_{v}.nc')
+        tasks.append(Task(f'composite:{v}', 'composites', _composite_task,
+                          (stats_files, v, comp, ref, groups, skill, threshold),
+                          inputs=list(stats_files.values()) + group_inputs, outputs=[comp],
+                          deps=stat_deps + group_deps))
+
+    figures = config.get('figures', ['taylor', 'std_maps', 'spectra'])
+    if 'taylor' in figures:
+        png = os.path.join(d['figures'], 'taylor.png')
+        tasks.append(Task('figure:taylor', 'figures', _figure_taylor, (skill, png, groups, threshold),
+                          inputs=[skill], outputs=[png], deps=['skill']))
+    if 'std_maps' in figures and 'std' in config.get('composites', ['std']):
+        comp = os.path.join(d['composites'], 'composite_std.nc')
+        png = os.path.join(d['figures'], 'std_maps.png')
+        tasks.append(Task('figure:std_maps', 'figures', _figure_std_maps, (comp, png, 1.),
+                          inputs=[comp], outputs=[png], deps=['composite:std']))
+    if 'spectra' in figures:
+        png = os.path.join(d['figures'], 'spectra.png')
+        shown = config.get('spectra_models', [ref])
+        tasks.append(Task('figure:spectra', 'figures', _figure_spectra, (all_spectra, png, shown),
+                          inputs=[all_spectra], outputs=[png], deps=['spectra:merge']))
+    return tasks
+
+
+def _select(tasks: List[Task], stages: Optional[Sequence[str]]) -> List[Task]:
+    """只保留所选阶段的任务及其（传递）依赖。"""
+    if not stages:
+        return tasks
+    by_name = {t.name: t for t in tasks}
+    keep = set()
+    stack = [t.name for t in tasks if t.stage in stages]
+    while stack:
+        name = stack.pop()
+        if name not in keep:
+            keep.add(name)
+            stack.extend(by_name[name].deps)
+    return [t for t in tasks if t.name in keep]
+
+
+def run_pipeline(
+    config: str,
+    workers: Optional[int] = None,
+    stages: Optional[Sequence[str]] = None,
+    force: bool = False,
+    dry_run: bool = False
+) -> Dict[str, str]:
+    """
+    读取配置文件，生成并运行任务 DAG。
+
+    参数：
+    --------
+    config : str
+        配置文件路径（.json 或 .toml）。
+    workers : int, optional
+        进程数，默认取配置中的 workers，否则 os.cpu_count()。
+    stages : list of str, optional
+        只运行这些阶段（及其依赖），取值见 STAGES。
+    force, dry_run :
+        见 run_tasks。
+
+    返回：
+    --------
+    dict
+        任务名 -> 状态。
+    """
+    cfg = load_config(config)
+    tasks = _select(build_tasks(cfg), stages)
+    out = cfg.get('output_dir', 'output')
+    os.makedirs(out, exist_ok=True)
+    status = run_tasks(tasks, workers or cfg.get('workers'), force, dry_run,
+                       state_file=os.path.join(out, '.pipeline_state.json'))
+    counts = {}
+    for s in status.values():
+        counts[s] = counts.get(s, 0) + 1
+    print(', '.join(f'{n} {s}' for s, n in sorted(counts.items())))
+    return status
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m cckw_tools',
+        description='Run the CCKW evaluation pipeline (filter -> stats -> spectra -> skill -> composites -> figures).')
+    parser.add_argument('config', help='pipeline configuration (.json or .toml)')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('-s', '--stage', action='append', choices=STAGES, dest='stages',
+                        help='only run this stage and what it depends on (repeatable)')
+    parser.add_argument('-f', '--force', action='store_true', help='rerun tasks even if up to date')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='list tasks that would run')
+    parser.add_argument('-p', '--profile', metavar='REPORT',
+                        help='record time, CPU, peak RSS and bytes read per task and write a JSON report')
+    args = parser.parse_args(argv)
+
+    import matplotlib
+    matplotlib.use('Agg')
+    if args.profile is None:
+        status = run_pipeline(args.config, args.workers, args.stages, args.force, args.dry_run)
+    else:
+        from .profiling import enable_profiling
+        with enable_profiling(args.profile) as prof:
+            status = run_pipeline(args.config, args.workers, args.stages, args.force, args.dry_run)
+        print(prof.format_summary())
+    return 1 if any(s in ('failed', 'blocked') for s in status.values()) else 0
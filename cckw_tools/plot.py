@@ -3,6 +3,7 @@ import matplotlib.ticker as ticker
 import cartopy.crs as ccrs
 from cartopy.mpl.ticker import LongitudeFormatter, LatitudeFormatter
 from typing import Optional, List
+from .render import render_panels
 
 def make_space_fig(ax, title: str, box: Optional[List[float]] = None):
     """
@@ -103,3 +104,46 @@ def plot_space_data(
         spine.set_linewidth(1.1)
 
     return f
+
+
+def _space_panel(ax, data, cmap, fmt: str, title: str, box=None, levels=None):
+    plot_space_data(data, ax, cmap, fmt, title, box=box, levels=levels)
+
+
+def plot_space_grid(
+    fields: List,
+    titles: List[str],
+    cmap,
+    fmt: str = 'mm/day',
+    box: Optional[List[float]] = None,
+    levels: Optional[np.ndarray] = None,
+    ncols: int = 3,
+    panel_size: tuple = (5., 1.6),
+    dpi: int = 300,
+    workers: Optional[int] = None
+):
+    """
+    多子图版本的 plot_space_data（如 21 个模式的 kelvin 标准差分布）：
+    每个子图在进程池中用 Agg 后端单独绘制，再拼接成一张图并添加共用色标。
+
+    输入:
+        fields: 每个子图的二维 xarray.DataArray。
+        titles: 每个子图的标题。
+        cmap: 颜色映射（名称或可 pickle 的 Colormap）。
+        fmt (str): 色标标注的单位。
+        box, levels: 同 plot_space_data。
+        ncols (int): 列数，默认 3。
+        panel_size (tuple): 单个子图尺寸（英寸）。
+        dpi (int): 子图分辨率，默认 300。
+        workers (int): 进程数，默认 os.cpu_count()。
+
+    输出:
+        fig: 拼接后的 Figure。
+    """
+    if levels is None:
+        levels = np.linspace(0., 4., 41)
+    panel_kwargs = [dict(cmap=cmap, fmt=fmt, title=t, box=box, levels=levels) for t in titles]
+    return render_panels(_space_panel, list(fields), panel_kwargs, ncols=ncols, panel_size=panel_size,
+                         dpi=dpi, subplot_kw={'projection': ccrs.PlateCarree(central_longitude=180)},
+                         workers=workers,
+                         colorbar={'cmap': cmap, 'levels': levels, 'label': fmt})
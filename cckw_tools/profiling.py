@@ -0,0 +1,330 @@
+"""
+流水线各阶段的性能记录：墙钟时间、CPU 时间、峰值常驻内存（RSS）和读取字节数。
+
+默认关闭，此时 profile_stage 返回同一个空上下文、profiled 包装的函数只多一次布尔判断。
+两种打开方式：
+
+    CCKW_PROFILE=report.json python -m cckw_tools config.toml   # 退出时写 JSON 并打印汇总表
+    CCKW_PROFILE=1 python script.py                              # 只打印汇总表
+
+    with enable_profiling('report.json') as prof:
+        kelvin_filter_batch(...)
+    print(prof.summary('model'))
+
+进程池中的 worker（fork 或 spawn）通过环境变量继承开关，把记录逐行追加到
+临时目录中的 <pid>.jsonl，由打开记录的进程在生成报告时合并，
+因此 kelvin_filter_batch、run_tasks 等并行函数不需要额外传递记录。
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import socket
+import tempfile
+import threading
+import functools
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterator, List, Optional, Sequence, Union
+
+ENV_VAR = 'CCKW_PROFILE'
+SPOOL_ENV_VAR = 'CCKW_PROFILE_SPOOL'
+
+_NULL = nullcontext()
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _read_proc(path: str, key: str) -> Optional[int]:
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(key):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def bytes_read() -> Optional[int]:
+    """本进程累计通过 read 类系统调用读取的字节数（/proc/self/io 的 rchar，含页缓存命中）；不支持时为 None。"""
+    return _read_proc('/proc/self/io', 'rchar:')
+
+
+def peak_rss() -> Optional[int]:
+    """本进程的 RSS 峰值（字节）：优先读 /proc/self/status 的 VmHWM，其次 getrusage。"""
+    kb = _read_proc('/proc/self/status', 'VmHWM:')
+    if kb is not None:
+        return kb * 1024
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _reset_peak_rss() -> bool:
+    """把 VmHWM 重置为当前 RSS（Linux 4.0+），使峰值只反映此后的阶段；失败时返回 False。"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class Profiler:
+    """
+    阶段记录器。每条记录是一个 dict：
+
+        stage, wall, cpu, peak_rss, bytes_read, start, pid, depth, parent, 以及调用时给出的标签（model、input 等）
+
+    wall/cpu 单位为秒，cpu 为整个进程（含线程池）的 CPU 时间；peak_rss 为阶段结束时的进程 RSS 峰值，
+    最外层阶段开始时会重置峰值（Linux），嵌套阶段的峰值从最外层阶段开始算起；
+    bytes_read 为阶段内的读取字节数。depth/parent 描述嵌套关系，其他线程（如线程池）中的阶段
+    挂在开始时主线程所处的阶段之下；汇总时默认只统计最外层记录，避免重复计时。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path: Optional[str] = None
+        self.spool: Optional[str] = None
+        self.owner_pid: Optional[int] = None
+        self.records: List[dict] = []
+        self._local = threading.local()
+        self._main_stack: List[str] = []
+        self._lock = threading.Lock()
+
+    # -- 开关 ----------------------------------------------------------------
+
+    def start(self, path: Optional[str] = None) -> None:
+        """在本进程打开记录并成为报告的汇总者；子进程通过环境变量继承开关和临时目录。"""
+        self.enabled = True
+        self.path = path
+        self.owner_pid = os.getpid()
+        self.records = []
+        self.spool = tempfile.mkdtemp(prefix='cckw-profile-')
+        os.environ[ENV_VAR] = path or '1'
+        os.environ[SPOOL_ENV_VAR] = self.spool
+
+    def stop(self) -> None:
+        """关闭记录，合并子进程的记录并删除临时目录，恢复环境变量。"""
+        if self.spool is not None and self.owner_pid == os.getpid():
+            self.records = self.collect()
+            shutil.rmtree(self.spool, ignore_errors=True)
+            os.environ.pop(ENV_VAR, None)
+            os.environ.pop(SPOOL_ENV_VAR, None)
+        self.enabled = False
+        self.spool = None
+
+    def _from_env(self) -> None:
+        value = os.environ.get(ENV_VAR)
+        if not value or value == '0':
+            return
+        path = None if value == '1' else value
+        spool = os.environ.get(SPOOL_ENV_VAR)
+        if spool:  # 由其他进程打开记录，本进程是 worker
+            self.enabled, self.path, self.spool = True, path, spool
+        else:
+            self.start(path)
+            atexit.register(self._finish_at_exit)
+
+    def _finish_at_exit(self) -> None:
+        if self.owner_pid != os.getpid() or not self.enabled:
+            return
+        self.stop()
+        if self.records:
+            if self.path:
+                self.to_json(self.path)
+            print(self.format_summary())
+
+    # -- 记录 ----------------------------------------------------------------
+
+    @property
+    def _stack(self) -> List[str]:
+        if threading.current_thread() is threading.main_thread():
+            return self._main_stack
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def stage(self, name: str, **tags) -> Iterator[dict]:
+        """记录一个阶段；yield 的 dict 可在阶段内补充标签。"""
+        stack = self._stack
+        on_main = stack is self._main_stack
+        if not stack:
+            # 线程内最外层的阶段：记下主线程此时所处的阶段作为上层
+            self._local.outer = [] if on_main else list(self._main_stack)
+            if on_main:
+                _reset_peak_rss()
+        outer = self._local.outer
+        record = {'stage': name, **tags}
+        read0 = bytes_read()
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        start = time.time()
+        stack.append(name)
+        try:
+            yield record
+        finally:
+            stack.pop()
+            wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+            read1 = bytes_read()
+            record.update(wall=wall, cpu=cpu, peak_rss=peak_rss(),
+                          bytes_read=None if read0 is None or read1 is None else read1 - read0,
+                          start=start, pid=os.getpid(), depth=len(outer) + len(stack),
+                          parent=(stack or outer or [None])[-1])
+            self._add(record)
+
+    def _add(self, record: dict) -> None:
+        if self.owner_pid == os.getpid() or self.spool is None:
+            with self._lock:
+                self.records.append(record)
+            return
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock, open(os.path.join(self.spool, f'{os.getpid()}.jsonl'), 'a') as f:
+            f.write(line)
+
+    def collect(self) -> List[dict]:
+        """本进程的记录加上 worker 写入临时目录的记录，按开始时间排序。"""
+        records = list(self.records)
+        if self.spool and os.path.isdir(self.spool):
+            for f in sorted(os.listdir(self.spool)):
+                with open(os.path.join(self.spool, f)) as fh:
+                    records.extend(json.loads(line) for line in fh if line.strip())
+        return sorted(records, key=lambda r: r['start'])
+
+    # -- 报告 ----------------------------------------------------------------
+
+    def report(self) -> dict:
+        return {'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'machine': socket.gethostname(),
+                'cpu_count': os.cpu_count(), 'argv': sys.argv, 'records': self.collect()}
+
+    def to_json(self, path: str) -> str:
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=1, default=str)
+        print(f'Profile saved at: {path}')
+        return path
+
+    def summary(self, by: Union[str, Sequence[str]] = 'stage', top_level: bool = True):
+        """
+        按阶段、模式等汇总的表。
+
+        参数：
+        --------
+        by : str 或 list of str, optional
+            分组的记录字段，如 'stage'、'model'、['stage', 'model']。
+            'model' 缺失时用 'input'（被处理的文件名）代替。
+        top_level : bool, optional
+            只统计最外层的阶段（默认），为 False 时统计全部记录（嵌套阶段会重复计时）。
+
+        返回：
+        --------
+        pandas.DataFrame
+            n、wall、cpu（秒）、cpu_ratio、peak_rss_mb（最大值）、read_mb（总和）、wall_share，按 wall 降序。
+        """
+        import pandas as pd
+        by = [by] if isinstance(by, str) else list(by)
+        records = [r for r in self.collect() if not top_level or r.get('depth', 0) == 0]
+        df = pd.DataFrame(records)
+        if df.empty:
+            return pd.DataFrame(columns=by + ['n', 'wall', 'cpu', 'cpu_ratio', 'peak_rss_mb', 'read_mb', 'wall_share'])
+        if 'model' in by and 'input' in df:
+            df['model'] = df['model'].fillna(df['input']) if 'model' in df else df['input']
+        for col in by:
+            df[col] = df[col].fillna('-') if col in df else '-'
+        table = df.groupby(by).agg(n=('wall', 'size'), wall=('wall', 'sum'), cpu=('cpu', 'sum'),
+                                   peak_rss_mb=('peak_rss', 'max'), read_mb=('bytes_read', 'sum'))
+        table['cpu_ratio'] = table['cpu'] / table['wall']
+        table['peak_rss_mb'] /= 2 ** 20
+        table['read_mb'] /= 2 ** 20
+        table['wall_share'] = table['wall'] / table['wall'].sum()
+        return table[['n', 'wall', 'cpu', 'cpu_ratio', 'peak_rss_mb', 'read_mb', 'wall_share']] \
+            .sort_values('wall', ascending=False)
+
+    def format_summary(self, by: Sequence[Union[str, Sequence[str]]] = ('stage', 'model')) -> str:
+        """各分组方式的汇总表拼成的文本。"""
+        parts = []
+        for b in by:
+            table = self.summary(b)
+            if len(table):
+                parts.append(table.to_string(float_format=lambda x: f'{x:.2f}'))
+        return '\n\n'.join(parts)
+
+
+profiler = Profiler()
+profiler._from_env()
+
+
+def profile_stage(name: str, **tags):
+    """
+    记录一个阶段的上下文管理器；关闭记录时返回共享的空上下文，几乎没有开销。
+
+        with profile_stage('skill', model=m):
+            ...
+    """
+    if not profiler.enabled:
+        return _NULL
+    return profiler.stage(name, **tags)
+
+
+def profiled(stage: str, input_arg: Optional[int] = None) -> Callable:
+    """
+    把函数的每次调用记为一个阶段的装饰器。
+
+    参数：
+    --------
+    stage : str
+        阶段名。
+    input_arg : int, optional
+        该位置参数为输入文件路径时，以其文件名作为 'input' 标签（汇总时按模式分组会用到）。
+    """
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            tags = {'func': func.__qualname__}
+            if input_arg is not None and len(args) > input_arg and isinstance(args[input_arg], (str, os.PathLike)):
+                tags['input'] = os.path.basename(os.fspath(args[input_arg]).rstrip('/'))
+            with profiler.stage(stage, **tags):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def enable_profiling(path: Optional[str] = None) -> Iterator[Profiler]:
+    """
+    在 with 块内打开记录，结束时合并 worker 的记录；给出 path 时写出 JSON 报告。
+    已由 CCKW_PROFILE 打开时只在块内沿用，不会提前关闭。
+
+    参数：
+    --------
+    path : str, optional
+        JSON 报告路径。
+
+    返回：
+    --------
+    Profiler
+        块结束后 records、summary() 仍可使用。
+    """
+    if profiler.enabled:
+        yield profiler
+        if path:
+            profiler.to_json(path)
+        return
+    profiler.start(path)
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        if path:
+            profiler.to_json(path)
@@ -0,0 +1,279 @@
+import os
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import xarray as xr
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from .streaming import SEASONS, stream_stats_file
+
+# (lat1, lat2, lon1, lon2)，lon1 > lon2 时跨越 0 度经线
+Box = Tuple[float, float, float, float]
+# 经纬度框，或 (lat, lon) 上的布尔/权重掩膜
+Region = Union[Box, xr.DataArray]
+
+
+def region_mask(lat: np.ndarray, lon: np.ndarray, region: Region) -> np.ndarray:
+    """
+    区域在 (lat, lon) 网格上的权重掩膜（框为 0/1，DataArray 掩膜按最近格点取值，缺测记为 0）。
+    """
+    if isinstance(region, xr.DataArray):
+        mask = region.sel(lat=lat, lon=lon, method='nearest').transpose('lat', 'lon').values
+        return np.nan_to_num(mask.astype(float))
+    lat1, lat2, lon1, lon2 = region
+    in_lat = (lat >= min(lat1, lat2)) & (lat <= max(lat1, lat2))
+    in_lon = (lon >= lon1) & (lon <= lon2) if lon1 <= lon2 else (lon >= lon1) | (lon <= lon2)
+    return (in_lat[:, None] & in_lon[None, :]).astype(float)
+
+
+def _runs(flags: np.ndarray) -> List[slice]:
+    """布尔数组中连续为 True 的段。"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], flags.astype(np.int8), [0]))))
+    return [slice(a, b) for a, b in zip(edges[::2], edges[1::2])]
+
+
+class RegionIndex:
+    """
+    一组区域在某个网格上的预计算索引：每个区域只保留其包含的纬度行（一个整数切片）
+    和经度列（一个或两个切片，跨越 0 度经线时为两个），以及这些格点上的面积权重。
+    所有区域的纬度并集 lat_slice 用于只读入需要的纬度带。
+
+    reduce 对 (..., lat, lon) 数组按区域做加权平均（忽略缺测），
+    不生成 (region, lat, lon) 的中间数组。
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, regions: Dict[str, Region], area_weighted: bool = True):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        self.names = list(regions)
+        self.shape = (lat.size, lon.size)
+        coslat = np.cos(np.deg2rad(lat)) if area_weighted else np.ones(lat.size)
+
+        masks = [region_mask(lat, lon, r) for r in regions.values()]
+        rows_any = np.any([m.any(axis=1) for m in masks], axis=0)
+        if not rows_any.any():
+            raise ValueError('no grid cell falls in any region')
+        rows = np.flatnonzero(rows_any)
+        self.lat_slice = slice(int(rows[0]), int(rows[-1]) + 1)
+        self.lat = lat[self.lat_slice]
+        self.lon = lon
+
+        self.entries = []
+        for name, mask in zip(self.names, masks):
+            if not mask.any():
+                raise ValueError(f'region {name!r} contains no grid cell')
+            r = np.flatnonzero(mask.any(axis=1))
+            row = slice(int(r[0]) - self.lat_slice.start, int(r[-1]) + 1 - self.lat_slice.start)
+            cols = _runs(mask.any(axis=0))
+            sub = mask[self.lat_slice][row]
+            weights = np.concatenate([sub[:, c] for c in cols], axis=1) * coslat[self.lat_slice][row][:, None]
+            self.entries.append((row, cols, weights))
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def lat_bounds(self) -> Tuple[float, float]:
+        """纬度并集的范围（升序），可直接作为 sel(lat=slice(*lat_bounds)) 的参数。"""
+        return float(self.lat.min()), float(self.lat.max())
+
+    def _block(self, values: np.ndarray, row: slice, cols: List[slice]) -> np.ndarray:
+        block = values[..., row, :]
+        if len(cols) == 1:
+            return block[..., cols[0]]
+        return np.concatenate([block[..., c] for c in cols], axis=-1)
+
+    def reduce(self, values: np.ndarray, subset: bool = False) -> np.ndarray:
+        """
+        按区域做面积加权平均。
+
+        参数：
+        --------
+        values : np.ndarray
+            (..., lat, lon) 数组，网格与建立索引时相同。
+        subset : bool, optional
+            为 True 时 values 的纬度已截取为 lat_slice（如只读入了纬度带）。
+
+        返回：
+        --------
+        np.ndarray
+            (..., region)。
+        """
+        values = np.asarray(values)
+        if not subset:
+            values = values[..., self.lat_slice, :]
+        out = np.empty(values.shape[:-2] + (len(self),))
+        for i, (row, cols, weights) in enumerate(self.entries):
+            block = self._block(values, row, cols)
+            valid = np.isfinite(block)
+            w = valid * weights
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out[..., i] = np.where(valid, block, 0.).reshape(block.shape[:-2] + (-1,)) @ weights.ravel() \
+                    / w.reshape(w.shape[:-2] + (-1,)).sum(axis=-1)
+        return out
+
+    def reduce_dataarray(self, data: xr.DataArray) -> xr.DataArray:
+        """DataArray 版本的 reduce：lat、lon 维换成 region 维，其余维和坐标保留。"""
+        subset = data.sizes['lat'] != self.shape[0]
+        other = [d for d in data.dims if d not in ('lat', 'lon')]
+        data = data.transpose(*other, 'lat', 'lon')
+        out = self.reduce(data.values, subset=subset)
+        coords = {k: v for k, v in data.coords.items() if 'lat' not in v.dims and 'lon' not in v.dims}
+        return xr.DataArray(out, dims=(*other, 'region'), coords={**coords, 'region': self.names},
+                            name=data.name, attrs=data.attrs)
+
+
+def _regions_key(lat: np.ndarray, lon: np.ndarray, regions: Dict[str, Region], area_weighted: bool) -> str:
+    h = hashlib.sha1()
+    for a in (lat, lon):
+        h.update(np.ascontiguousarray(a, dtype=float).tobytes())
+    for name, r in regions.items():
+        h.update(name.encode())
+        if isinstance(r, xr.DataArray):
+            for a in (r['lat'].values, r['lon'].values, r.values):
+                h.update(np.ascontiguousarray(a, dtype=float).tobytes())
+        else:
+            h.update(repr(tuple(float(x) for x in r)).encode())
+    h.update(b'w' if area_weighted else b'u')
+    return h.hexdigest()
+
+
+_INDEX_CACHE: 'OrderedDict[str, RegionIndex]' = OrderedDict()
+
+
+def region_index(lat, lon, regions: Dict[str, Region], area_weighted: bool = True,
+                 maxsize: int = 32) -> RegionIndex:
+    """按 (网格, 区域) 缓存的 RegionIndex；同一网格上的多个模式共用一个索引。"""
+    lat, lon = np.asarray(lat), np.asarray(lon)
+    key = _regions_key(lat, lon, regions, area_weighted)
+    index = _INDEX_CACHE.get(key)
+    if index is None:
+        index = _INDEX_CACHE[key] = RegionIndex(lat, lon, regions, area_weighted)
+        while len(_INDEX_CACHE) > maxsize:
+            _INDEX_CACHE.popitem(last=False)
+    else:
+        _INDEX_CACHE.move_to_end(key)
+    return index
+
+
+def _union_lat_bounds(regions: Dict[str, Region]) -> Optional[Tuple[float, float]]:
+    """所有区域的纬度并集；含掩膜区域时返回 None（读入全部纬度）。"""
+    if any(isinstance(r, xr.DataArray) for r in regions.values()):
+        return None
+    lats = [x for r in regions.values() for x in r[:2]]
+    return min(lats), max(lats)
+
+
+def regional_stats_file(
+    path: str,
+    regions: Dict[str, Region],
+    var: str = 'kelvin',
+    statistics: Sequence[str] = ('season_std',),
+    scale: float = 1.,
+    time_bounds: Optional[Tuple[str, str]] = None,
+    time_chunk: int = 365,
+    area_weighted: bool = True
+) -> xr.Dataset:
+    """
+    单个文件的区域统计：一次读数（只读入区域纬度并集）得到逐格点的统计量
+    （见 stream_stats_file），再对全部区域做面积加权平均。
+
+    参数：
+    --------
+    path : str
+        netCDF 文件或字段存储目录。
+    regions : dict
+        区域名 -> (lat1, lat2, lon1, lon2) 或 (lat, lon) 掩膜。
+    var : str, optional
+        变量名，默认 'kelvin'。
+    statistics : list of str, optional
+        KelvinStats.to_dataset 中的变量，如 'season_std'、'season_mean'、'std'、'month_std'。
+    scale, time_bounds, time_chunk :
+        见 stream_stats_file。
+    area_weighted : bool, optional
+        是否按 cos(lat) 加权，默认 True。
+
+    返回：
+    --------
+    xr.Dataset
+        各统计量的维度为 (region, [season|month])。
+    """
+    ds = stream_stats_file(path, var=var, lat_bounds=_union_lat_bounds(regions), time_bounds=time_bounds,
+                           time_chunk=time_chunk, scale=scale)
+    index = region_index(ds['lat'].values, ds['lon'].values, regions, area_weighted)
+    out = xr.Dataset({s: index.reduce_dataarray(ds[s]) for s in statistics})
+    return out.transpose('region', ...)
+
+
+def regional_stats(
+    sources: Dict[str, str],
+    regions: Dict[str, Region],
+    var: str = 'kelvin',
+    statistics: Sequence[str] = ('season_std',),
+    scale: Union[float, Dict[str, float]] = 1.,
+    reference: Optional[str] = None,
+    seasons: Sequence[str] = SEASONS,
+    workers: Optional[int] = None,
+    **kwargs
+) -> xr.Dataset:
+    """
+    多模式、多区域、多季节的区域统计，结果为带标签的 (model, region, season) 立方体，
+    替代逐区域重新打开全部文件、再用 np.expand_dims 减去观测的做法。
+    每个文件只读一遍；文件之间在进程池中并行。
+
+    参数：
+    --------
+    sources : dict
+        模式名 -> 文件（如 model_file_index('CCKWs/*.nc')）。
+    regions : dict
+        区域名 -> (lat1, lat2, lon1, lon2) 或 (lat, lon) 掩膜。
+    var : str, optional
+        变量名，默认 'kelvin'。
+    statistics : list of str, optional
+        需要的统计量，默认只有 'season_std'（逐格点季节标准差的区域平均）。
+    scale : float 或 dict, optional
+        乘数；dict 时按模式名查找，缺省为 1（如 {'GPCP': 1, 'CanESM5': 86400}）。
+    reference : str, optional
+        给出时结果为各模式减去该模式（如 'GPCP'），参考模式本身不在结果中，
+        其值保存在 <statistic>_reference 变量中。
+    seasons : list of str, optional
+        季节顺序，默认 SEASONS；Fig.12 中为 ['MAM', 'JJA', 'SON', 'DJF']。
+    workers : int, optional
+        进程数，默认 min(文件数, os.cpu_count())；为 1 时串行。
+    **kwargs :
+        传给 regional_stats_file（time_bounds、time_chunk、area_weighted）。
+
+    返回：
+    --------
+    xr.Dataset
+        各统计量维度为 (model, region, season)（或 month，或无季节维）。
+    """
+    def factor(model):
+        return float(scale.get(model, 1.)) if isinstance(scale, dict) else float(scale)
+
+    models = list(sources)
+    workers = min(len(models), workers or os.cpu_count() or 1)
+    results = {}
+    if workers <= 1:
+        for m in models:
+            results[m] = regional_stats_file(sources[m], regions, var, statistics, factor(m), **kwargs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(regional_stats_file, sources[m], regions, var, statistics, factor(m), **kwargs): m
+                       for m in models}
+            for fut in as_completed(futures):
+                m = futures[fut]
+                results[m] = fut.result()
+                print(f'{m} done')
+
+    cube = xr.concat([results[m] for m in models], dim='model').assign_coords(model=models)
+    if 'season' in cube.dims:
+        cube = cube.sel(season=list(seasons))
+    cube = cube.transpose('model', 'region', ...)
+    if reference is not None:
+        ref = cube.sel(model=reference, drop=True)
+        cube = cube.drop_sel(model=reference) - ref
+        for s in statistics:
+            cube[f'{s}_reference'] = ref[s]
+        cube.attrs['reference'] = reference
+    return cube
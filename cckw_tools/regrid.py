@@ -0,0 +1,417 @@
+import os
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import xarray as xr
+from scipy import sparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple, Union
+from .profiling import profiled
+
+Grid = Union[xr.Dataset, xr.DataArray, Tuple[np.ndarray, np.ndarray]]
+
+
+def cell_edges(centers: np.ndarray, lat: bool = False) -> np.ndarray:
+    """
+    由单调递增的格点中心得到 n+1 个格边：内部取相邻中心的中点，两端外推半个格距。
+    纬度的格边截断在 ±90；经度的两端格边相差恰好 360 时视为全球周期网格。
+    """
+    c = np.asarray(centers, dtype=float)
+    if len(c) == 1:
+        raise ValueError('at least two grid points are needed to infer cell edges')
+    mid = 0.5 * (c[1:] + c[:-1])
+    edges = np.concatenate([[c[0] - (mid[0] - c[0])], mid, [c[-1] + (c[-1] - mid[-1])]])
+    if lat:
+        edges = np.clip(edges, -90., 90.)
+    return edges
+
+
+def _bounds_edges(bnds: np.ndarray) -> np.ndarray:
+    """(n, 2) 的 lat_bnds/lon_bnds 转为 n+1 个格边。"""
+    b = np.sort(np.asarray(bnds, dtype=float), axis=1)
+    return np.concatenate([b[:, 0], b[-1:, 1]])
+
+
+def _bounds_name(ds: xr.Dataset, coord: str) -> Optional[str]:
+    """坐标 coord 的格边变量名（CF 的 bounds 属性，其次 <coord>_bnds）；没有时为 None。"""
+    for name in (ds[coord].attrs.get('bounds'), f'{coord}_bnds'):
+        if name and name in ds.variables:
+            return name
+    return None
+
+
+def grid_edges(grid: Grid) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    网格的 (lat, lon, lat_edges, lon_edges)，坐标按升序排列。
+    Dataset 中有格边变量（坐标的 bounds 属性所指，或 lat_bnds/lon_bnds）时直接使用，
+    否则由格点中心推断；DataArray 不带格边变量，总是推断。
+    """
+    lat_b = lon_b = None
+    if isinstance(grid, (xr.Dataset, xr.DataArray)):
+        lat, lon = grid['lat'].values, grid['lon'].values
+        if isinstance(grid, xr.Dataset):
+            lat_name, lon_name = _bounds_name(grid, 'lat'), _bounds_name(grid, 'lon')
+            lat_b = grid[lat_name].values if lat_name else None
+            lon_b = grid[lon_name].values if lon_name else None
+    else:
+        lat, lon = (np.asarray(a, dtype=float) for a in grid)
+    if np.any(np.diff(lat) < 0) or np.any(np.diff(lon) < 0):
+        raise ValueError('lat and lon must be increasing; sort the input first (see regrid_conservative)')
+    lat_e = _bounds_edges(lat_b) if lat_b is not None else cell_edges(lat, lat=True)
+    lon_e = _bounds_edges(lon_b) if lon_b is not None else cell_edges(lon)
+    return lat, lon, lat_e, lon_e
+
+
+def overlap_matrix(src_edges: np.ndarray, tgt_edges: np.ndarray, period: Optional[float] = None) -> sparse.csr_matrix:
+    """
+    一维区间重叠长度矩阵 (n_tgt, n_src)。把两组格边合并排序，每个小区间
+    只属于一个源格和一个目标格，一次 searchsorted 即可得到全部非零元素。
+    period 不为 None 时源网格按周期平移 ±period 后参与重叠（经度跨 0°/360°）。
+    """
+    src_edges = np.asarray(src_edges, dtype=float)
+    tgt_edges = np.asarray(tgt_edges, dtype=float)
+    nsrc, ntgt = len(src_edges) - 1, len(tgt_edges) - 1
+    if period is not None:
+        shifts = np.arange(np.floor((tgt_edges[0] - src_edges[-1]) / period),
+                           np.ceil((tgt_edges[-1] - src_edges[0]) / period) + 1)
+        src_all = np.concatenate([src_edges[:-1] + k * period for k in shifts] + [src_edges[-1:] + shifts[-1] * period])
+        src_index = np.tile(np.arange(nsrc), len(shifts))
+    else:
+        src_all, src_index = src_edges, np.arange(nsrc)
+    lo, hi = max(src_all[0], tgt_edges[0]), min(src_all[-1], tgt_edges[-1])
+    merged = np.unique(np.concatenate([src_all, tgt_edges]))
+    merged = merged[(merged >= lo) & (merged <= hi)]
+    length = np.diff(merged)
+    mid = 0.5 * (merged[1:] + merged[:-1])
+    i = np.searchsorted(tgt_edges, mid) - 1
+    j = src_index[np.searchsorted(src_all, mid) - 1]
+    keep = length > 0
+    return sparse.coo_matrix((length[keep], (i[keep], j[keep])), shape=(ntgt, nsrc)).tocsr()
+
+
+def conservative_matrix(src: Grid, tgt: Grid) -> sparse.csr_matrix:
+    """
+    一阶守恒插值权重 (n_tgt_lat * n_tgt_lon, n_src_lat * n_src_lon)：
+    W[t, s] = 源格 s 与目标格 t 的球面重叠面积 / 目标格被源网格覆盖的面积。
+    经纬度网格上面积可分离（纬向按 sin(lat)、经向按经度差），
+    因此 W 是纬向与经向重叠矩阵的 Kronecker 积再按行归一化。
+    目标格完全不被覆盖的行全为 0（插值结果为 NaN）。
+    """
+    _, _, slat_e, slon_e = grid_edges(src)
+    _, _, tlat_e, tlon_e = grid_edges(tgt)
+    wlat = overlap_matrix(np.sin(np.deg2rad(slat_e)), np.sin(np.deg2rad(tlat_e)))
+    periodic = np.isclose(slon_e[-1] - slon_e[0], 360.)
+    wlon = overlap_matrix(slon_e, tlon_e, period=360. if periodic else None)
+    w = sparse.kron(wlat, wlon, format='csr')
+    rows = np.asarray(w.sum(axis=1)).ravel()
+    scale = np.divide(1., rows, out=np.zeros_like(rows), where=rows > 0)
+    return sparse.diags(scale) @ w
+
+
+class RegridWeights:
+    """
+    一对 (源网格, 目标网格) 的守恒插值权重及其应用。
+
+    参数：
+    --------
+    matrix : scipy.sparse.csr_matrix
+        (n_tgt, n_src) 权重，见 conservative_matrix。
+    tgt_lat, tgt_lon : np.ndarray
+        目标网格坐标。
+    """
+
+    def __init__(self, matrix: sparse.csr_matrix, tgt_lat: np.ndarray, tgt_lon: np.ndarray):
+        self.matrix = matrix.tocsr()
+        self.tgt_lat = np.asarray(tgt_lat)
+        self.tgt_lon = np.asarray(tgt_lon)
+        self._covered = np.diff(self.matrix.indptr) > 0
+        self._typed = {np.dtype(np.float64): self.matrix}
+
+    def _matrix(self, dtype) -> sparse.csr_matrix:
+        # 与数据同精度的权重：float32 数据的稀疏矩阵乘约快一倍
+        dtype = np.dtype(dtype) if np.issubdtype(dtype, np.floating) else np.dtype(np.float64)
+        if dtype not in self._typed:
+            self._typed[dtype] = self.matrix.astype(dtype)
+        return self._typed[dtype]
+
+    def __repr__(self):
+        return f'RegridWeights({self.matrix.shape[1]} -> {self.matrix.shape[0]} cells, nnz={self.matrix.nnz})'
+
+    def apply(self, block: np.ndarray, skipna: bool = True) -> np.ndarray:
+        """
+        对 (..., src_lat, src_lon) 数组插值，前面的维度（时间等）合并后作一次稀疏矩阵乘。
+        skipna 时源格中的 NaN（如陆地掩膜）不参与加权，权重按有效面积重新归一化。
+        """
+        lead = block.shape[:-2]
+        x = block.reshape(-1, block.shape[-2] * block.shape[-1])
+        w = self._matrix(x.dtype)
+        nan = np.isnan(x) if skipna and np.issubdtype(x.dtype, np.floating) else None
+        if nan is not None and nan.any():
+            valid = (~nan).astype(x.dtype)
+            num = w @ np.where(nan, 0, x).T
+            den = w @ valid.T
+            out = np.divide(num, den, out=np.full(num.shape, np.nan, dtype=num.dtype), where=den > 0)
+        else:
+            out = w @ x.T
+        out = out.T.astype(block.dtype, copy=False)
+        out[:, ~self._covered] = np.nan
+        return out.reshape(lead + (len(self.tgt_lat), len(self.tgt_lon)))
+
+
+class RegridCache:
+    """
+    守恒插值权重的缓存：进程内 LRU（最多 maxsize 对网格），设置 cache_dir 时
+    另以 scipy.sparse.save_npz 写入 regrid_<key>.npz，之后的会话直接读取。
+    键是源、目标网格格边的哈希。
+    """
+
+    def __init__(self, maxsize: int = 16, cache_dir: Optional[str] = None):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, src: Grid, tgt: Grid) -> str:
+        h = hashlib.sha1()
+        for grid in (src, tgt):
+            for arr in grid_edges(grid)[2:]:
+                h.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+                h.update(b'|')
+        return h.hexdigest()[:20]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'regrid_{key}.npz')
+
+    def get(self, src: Grid, tgt: Grid) -> RegridWeights:
+        """返回 src -> tgt 的权重，未缓存时计算并保存。"""
+        key = self.key(src, tgt)
+        tgt_lat, tgt_lon = grid_edges(tgt)[:2]
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        if self.cache_dir is not None and os.path.exists(self._path(key)):
+            matrix = sparse.load_npz(self._path(key))
+            self.disk_hits += 1
+        else:
+            matrix = conservative_matrix(src, tgt)
+            self.misses += 1
+            if self.cache_dir is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp = self._path(key) + '.tmp.npz'
+                sparse.save_npz(tmp, matrix)
+                os.replace(tmp, self._path(key))
+        weights = RegridWeights(matrix, tgt_lat, tgt_lon)
+        self._entries[key] = weights
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return weights
+
+    def clear(self, disk: bool = False) -> None:
+        """清空进程内缓存和计数；disk=True 时同时删除 cache_dir 中的 .npz。"""
+        self._entries.clear()
+        self.hits = self.disk_hits = self.misses = 0
+        if disk and self.cache_dir is not None and os.path.isdir(self.cache_dir):
+            for f in os.listdir(self.cache_dir):
+                if f.startswith('regrid_') and f.endswith('.npz'):
+                    os.remove(os.path.join(self.cache_dir, f))
+
+    def info(self) -> dict:
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'currsize': len(self._entries), 'maxsize': self.maxsize, 'cache_dir': self.cache_dir}
+
+
+def _source_grid(ds: xr.Dataset) -> xr.Dataset:
+    """只含 lat、lon 及其格边变量的 Dataset（升序，见 _sorted_grid），作为权重的源网格。"""
+    names = [n for n in (_bounds_name(ds, 'lat'), _bounds_name(ds, 'lon')) if n is not None]
+    grid = xr.Dataset({n: ds[n].load() for n in names}, coords={'lat': ds['lat'], 'lon': ds['lon']})
+    return _sorted_grid(grid)
+
+
+def _sorted_grid(data: Union[xr.Dataset, xr.DataArray]) -> Union[xr.Dataset, xr.DataArray]:
+    """纬度、经度升序，经度换算到 [0, 360)；Dataset 的经度格边随格点中心一起平移。"""
+    if (data['lon'] < 0).any():
+        lon = data['lon'] % 360.
+        bounds = _bounds_name(data, 'lon') if isinstance(data, xr.Dataset) else None
+        if bounds is not None:
+            data = data.assign({bounds: data[bounds] + (lon - data['lon'])})
+        data = data.assign_coords(lon=lon)
+    # 已经有序时不调用 sortby：对惰性数据按索引数组取值会很慢
+    unsorted = [c for c in ('lat', 'lon') if np.any(np.diff(data[c].values) < 0)]
+    return data.sortby(unsorted) if unsorted else data
+
+
+def regrid_conservative(
+    data: xr.DataArray,
+    target: Grid,
+    time_chunk: int = 365,
+    skipna: bool = True,
+    cache: Optional[RegridCache] = None,
+    source_grid: Optional[xr.Dataset] = None
+) -> xr.DataArray:
+    """
+    一阶守恒插值到目标网格：权重按 (源网格, 目标网格) 只计算一次并缓存，
+    数据按 time_chunk 分块读取，每块一次稀疏矩阵乘。
+
+    参数：
+    --------
+    data : xr.DataArray
+        含 lat、lon 维的场（如 (time, lat, lon) 日降水），可以是惰性打开的。
+    target : xr.Dataset、xr.DataArray 或 (lat, lon)
+        目标网格，如 synthetic_grid(2., 90.) 或某个 *_interp_2x2.nc。
+    time_chunk : int, optional
+        每次读入的时间步数，默认 365。
+    skipna : bool, optional
+        源数据中的 NaN 不参与加权，默认 True。
+    cache : RegridCache, optional
+        权重缓存，默认 regrid_cache。
+    source_grid : xr.Dataset, optional
+        data 所在的原始 Dataset（如 xr.open_dataset 的结果），用于读取 lat_bnds/lon_bnds；
+        不给出时源网格格边由格点中心推断（非均匀网格上可能不准确）。
+
+    返回：
+    --------
+    xr.DataArray
+        目标网格上的场，其余维度和属性不变。
+    """
+    cache = cache or regrid_cache
+    data = _sorted_grid(data)
+    src = data if source_grid is None else _source_grid(source_grid)
+    if src['lat'].size != data['lat'].size or src['lon'].size != data['lon'].size:
+        raise ValueError('source_grid does not match the lat/lon of data')
+    weights = cache.get(src, target)
+    other = [d for d in data.dims if d not in ('lat', 'lon')]
+    data = data.transpose(*other, 'lat', 'lon')
+    out = np.empty(data.shape[:-2] + (len(weights.tgt_lat), len(weights.tgt_lon)), dtype=data.dtype)
+    if 'time' in other and other[0] == 'time':
+        for t0 in range(0, data.sizes['time'], time_chunk):
+            sl = slice(t0, t0 + time_chunk)
+            out[sl] = weights.apply(data.isel(time=sl).values, skipna)
+    else:
+        out[...] = weights.apply(data.values, skipna)
+    coords = {c: data.coords[c] for c in data.coords if 'lat' not in data.coords[c].dims
+              and 'lon' not in data.coords[c].dims}
+    coords.update(lat=weights.tgt_lat, lon=weights.tgt_lon)
+    return xr.DataArray(out, dims=data.dims, coords=coords, name=data.name,
+                        attrs={**data.attrs, 'regrid_method': 'conservative'})
+
+
+@profiled('regrid', input_arg=0)
+def regrid_file(
+    src: str,
+    dst: str,
+    target: Grid,
+    var: str = 'pr',
+    time_chunk: int = 365,
+    skipna: bool = True,
+    cache: Optional[RegridCache] = None
+) -> str:
+    """
+    对单个文件做守恒插值，按时间块读入、插值并写入 dst（float32），
+    内存中只有一个时间块。
+
+    参数：
+    --------
+    src : str
+        输入 netCDF 文件（CMIP6 原始网格）。
+    dst : str
+        输出 netCDF 文件。
+    target : 见 regrid_conservative。
+    var : str, optional
+        变量名，默认 'pr'。
+    其余参数见 regrid_conservative。
+
+    返回：
+    --------
+    str
+        输出文件路径。
+    """
+    import netCDF4
+
+    cache = cache or regrid_cache
+    ds = xr.open_dataset(src)
+    data = _sorted_grid(ds[var]).transpose('time', 'lat', 'lon')
+    weights = cache.get(_source_grid(ds), target)
+    ntime = data.sizes['time']
+
+    folder = os.path.dirname(dst)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder, exist_ok=True)
+    tmp = dst + '.tmp'
+    # 先用 xarray 写坐标（保留时间编码），再用 netCDF4 逐块写变量
+    xr.Dataset(coords={'time': data['time'], 'lat': ('lat', weights.tgt_lat, data['lat'].attrs),
+                       'lon': ('lon', weights.tgt_lon, data['lon'].attrs)},
+               attrs=ds.attrs).to_netcdf(tmp)
+    with netCDF4.Dataset(tmp, 'a') as nc:
+        v = nc.createVariable(var, 'f4', ('time', 'lat', 'lon'),
+                              chunksizes=(min(time_chunk, ntime), len(weights.tgt_lat), len(weights.tgt_lon)))
+        v.setncatts({k: str(val) for k, val in data.attrs.items()})
+        v.regrid_method = 'conservative'
+        for t0 in range(0, ntime, time_chunk):
+            sl = slice(t0, t0 + time_chunk)
+            v[sl] = weights.apply(data.isel(time=sl).values.astype(np.float32), skipna)
+    ds.close()
+    os.replace(tmp, dst)
+    return dst
+
+
+def regrid_batch(
+    jobs: Dict[str, Tuple[str, str]],
+    target: Grid,
+    workers: Optional[int] = None,
+    overwrite: bool = False,
+    **kwargs
+) -> List[str]:
+    """
+    在进程池中批量插值整个模式集合，输出比输入新时跳过。
+    同一原始网格的模式在各进程中共享 regrid_cache 的磁盘缓存
+    （设置 CCKW_REGRID_CACHE_DIR 后），权重只计算一次。
+
+    参数：
+    --------
+    jobs : dict
+        模式名 -> (输入文件, 输出文件)。
+    target : 见 regrid_conservative。目标网格为 Dataset/DataArray 时只传递其 (lat, lon)。
+    workers : int, optional
+        进程数，默认 os.cpu_count()。
+    overwrite : bool, optional
+        为 True 时全部重新插值。
+    **kwargs :
+        传给 regrid_file 的参数。
+
+    返回：
+    --------
+    list of str
+        本次完成插值的模式名。
+    """
+    if isinstance(target, (xr.Dataset, xr.DataArray)):
+        target = grid_edges(target)[:2]
+    todo = {}
+    for model, (src, dst) in jobs.items():
+        if (not overwrite and os.path.exists(dst)
+                and os.path.getmtime(dst) >= os.path.getmtime(src)):
+            print(f'{model} is up to date, skipping')
+        else:
+            todo[model] = (src, dst)
+
+    done = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(regrid_file, src, dst, target, **kwargs): model
+                   for model, (src, dst) in todo.items()}
+        for fut in as_completed(futures):
+            model = futures[fut]
+            try:
+                fut.result()
+            except Exception as e:
+                print(f'{model} failed: {e}')
+                continue
+            done.append(model)
+            print(f'{model} regridded')
+    return done
+
+
+# 共享的权重缓存；设置 CCKW_REGRID_CACHE_DIR 环境变量（或 regrid_cache.cache_dir）
+# 后权重以 .npz 保存在磁盘上，跨会话、跨进程复用。
+regrid_cache = RegridCache(cache_dir=os.environ.get('CCKW_REGRID_CACHE_DIR'))
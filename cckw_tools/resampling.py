@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence, Tuple
+from .wave_bands import band_mask
+
+
+def grid_tiles(shape: Tuple[int, int], block: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    将二维网格划分为 block 大小的块。
+
+    参数：
+    --------
+    shape : tuple
+        网格形状 (ny, nx)。
+    block : tuple
+        块大小 (by, bx)。
+
+    返回：
+    --------
+    (membership, full)
+        membership: (ntile, ny*nx) 0/1 矩阵，每行是一个块包含的格点；
+        full: 完整（未被边界截断）块的编号。
+    """
+    ny, nx = shape
+    by, bx = block
+    iy = np.arange(ny) // by
+    ix = np.arange(nx) // bx
+    ntx = ix.max() + 1
+    tile_id = (iy[:, None] * ntx + ix[None, :]).ravel()
+    ntile = tile_id.max() + 1
+    membership = np.zeros((ntile, ny * nx))
+    membership[tile_id, np.arange(ny * nx)] = 1.
+    full = np.flatnonzero(membership.sum(1) == by * bx)
+    return membership, full
+
+
+def _weighted_corr(w: np.ndarray, x: np.ndarray, ref: np.ndarray) -> np.ndarray:
+    """w: (B, N) 权重，x: (M, N)，ref: (N,) -> (B, M) 加权相关系数。"""
+    sw = w.sum(1, keepdims=True)
+    mx = (w @ x.T) / sw
+    my = (w @ ref)[:, None] / sw
+    sxx = (w @ (x ** 2).T) / sw - mx ** 2
+    syy = (w @ ref ** 2)[:, None] / sw - my ** 2
+    sxy = (w @ (x * ref).T) / sw - mx * my
+    return sxy / np.sqrt(sxx * syy)
+
+
+def _bootstrap_batch(x, ref, mask, membership, n, seed, batch_size):
+    rng = np.random.default_rng(seed)
+    ntile = membership.shape[0]
+    out = []
+    for b0 in range(0, n, batch_size):
+        nb = min(batch_size, n - b0)
+        draws = rng.integers(0, ntile, size=(nb, ntile))
+        flat = (draws + np.arange(nb)[:, None] * ntile).ravel()
+        counts = np.bincount(flat, minlength=nb * ntile).reshape(nb, ntile)
+        out.append(_weighted_corr((counts @ membership) * mask, x, ref))
+    return np.concatenate(out)
+
+
+def _permutation_batch(x, ref, mask, membership, full, n, seed, batch_size):
+    rng = np.random.default_rng(seed)
+    cells = np.stack([np.flatnonzero(membership[t]) for t in full])  # (nfull, tile_size)
+    xm = x[:, mask]
+    xc = xm - xm.mean(1, keepdims=True)
+    xn = np.sqrt((xc ** 2).sum(1))
+    out = []
+    for b0 in range(0, n, batch_size):
+        nb = min(batch_size, n - b0)
+        perm = rng.permuted(np.tile(np.arange(len(full)), (nb, 1)), axis=1)
+        idx = np.tile(np.arange(ref.size), (nb, 1))
+        idx[:, cells.ravel()] = cells[perm].reshape(nb, -1)
+        r = ref[idx][:, mask]
+        rc = r - r.mean(1, keepdims=True)
+        out.append((rc @ xc.T) / (np.sqrt((rc ** 2).sum(1))[:, None] * xn))
+    return np.concatenate(out)
+
+
+def _run(func, args, n, seed, workers):
+    if not workers or workers == 1:
+        return func(*args[:-1], n, seed, args[-1])
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = seed.spawn(workers)
+    sizes = [len(a) for a in np.array_split(np.arange(n), workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(func, *args[:-1], m, s, args[-1]) for m, s in zip(sizes, seeds) if m]
+        return np.concatenate([f.result() for f in futures])
+
+
+def resample_corr(
+    x: np.ndarray,
+    ref: np.ndarray,
+    block: Tuple[int, int],
+    mask: Optional[np.ndarray] = None,
+    n_resamples: int = 10000,
+    ci: float = 0.95,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+    batch_size: int = 2000
+) -> dict:
+    """
+    二维网格上型相关的块重采样显著性检验（所有模式、所有重采样一次批量计算）。
+
+    置信区间：对块做有放回抽样（block bootstrap），每次重采样表示为
+    各格点的抽中次数权重，相关系数由加权矩阵乘法一次得到。
+    p 值：随机置换参考场的完整块（block permutation），
+    统计 |r_perm| >= |r_obs| 的比例（双侧）。
+
+    参数：
+    --------
+    x : np.ndarray
+        (model, ny, nx) 模式场。
+    ref : np.ndarray
+        (ny, nx) 参考场。
+    block : tuple
+        块大小 (by, bx)，应不小于场的去相关尺度。
+    mask : np.ndarray, optional
+        (ny, nx) 布尔数组，只在 True 的格点上计算相关，默认全部。
+    n_resamples : int, optional
+        重采样次数，默认 10000。
+    ci : float, optional
+        置信水平，默认 0.95。
+    seed : int, optional
+        随机种子。
+    workers : int, optional
+        大于 1 时将重采样分给进程池。
+    batch_size : int, optional
+        每批重采样数，控制内存，默认 2000。
+
+    返回：
+    --------
+    dict
+        corr, ci_low, ci_high, p_value, 每项为 (model,) 数组。
+    """
+    x = np.asarray(x, dtype=float)
+    ref = np.asarray(ref, dtype=float)
+    shape = ref.shape
+    x = x.reshape(x.shape[0], -1)
+    ref = ref.ravel()
+    mask = np.ones(ref.size, bool) if mask is None else np.asarray(mask, bool).ravel()
+    membership, full = grid_tiles(shape, block)
+    if len(full) < 2:
+        raise ValueError(f'block {block} is too large for a grid of shape {shape}')
+
+    xm, rm = x[:, mask], ref[mask]
+    xc = xm - xm.mean(1, keepdims=True)
+    rc = rm - rm.mean()
+    corr = (xc @ rc) / np.sqrt((xc ** 2).sum(1) * (rc ** 2).sum())
+
+    ss = np.random.SeedSequence(seed)
+    boot_seed, perm_seed = ss.spawn(2)
+    boot = _run(_bootstrap_batch, (x, ref, mask.astype(float), membership, batch_size),
+                n_resamples, boot_seed, workers)
+    perm = _run(_permutation_batch, (x, ref, mask, membership, full, batch_size),
+                n_resamples, perm_seed, workers)
+
+    alpha = (1. - ci) / 2.
+    return {
+        'corr': corr,
+        'ci_low': np.nanquantile(boot, alpha, axis=0),
+        'ci_high': np.nanquantile(boot, 1. - alpha, axis=0),
+        'p_value': (1. + (np.abs(perm) >= np.abs(corr)).sum(0)) / (n_resamples + 1.),
+    }
+
+
+def spectral_significance(
+    psumsym: xr.DataArray,
+    reference: str = 'GPCP',
+    band: str = 'Kelvin_box',
+    block: Tuple[int, int] = (4, 3),
+    models: Optional[Sequence[str]] = None,
+    **kwargs
+) -> pd.DataFrame:
+    """
+    WK 谱型相关的块重采样显著性：在波带外接矩形上划分 (frequency, wavenumber)
+    块，只在波带内格点上计算相关。
+
+    参数：
+    --------
+    psumsym : xr.DataArray
+        (model, frequency, wavenumber) 谱。
+    reference : str, optional
+        参考模式名，默认 'GPCP'。
+    band : str, optional
+        wave_bands 中的波带名称，默认 'Kelvin_box'。
+    block : tuple, optional
+        (频率格点数, 波数格点数) 块大小，默认 (4, 3)。
+    models : list of str, optional
+        需要检验的模式，默认除参考外的全部。
+    **kwargs :
+        传给 resample_corr 的参数（n_resamples, ci, seed, workers, batch_size）。
+
+    返回：
+    --------
+    pd.DataFrame
+        以 model 为索引，列为 corr, ci_low, ci_high, p_value。
+    """
+    psumsym = psumsym.transpose('model', 'frequency', 'wavenumber')
+    mask = band_mask(band, psumsym.wavenumber.values, psumsym.frequency.values)
+    rows = np.flatnonzero(mask.any(1))
+    cols = np.flatnonzero(mask.any(0))
+    box = psumsym.isel(frequency=slice(rows[0], rows[-1] + 1), wavenumber=slice(cols[0], cols[-1] + 1))
+    box_mask = mask[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+    names = [str(m) for m in box.model.values]
+    keep = [i for i, m in enumerate(names) if m != reference and (models is None or m in models)]
+    values = box.values
+    result = resample_corr(values[keep], values[names.index(reference)], block, box_mask, **kwargs)
+    return pd.DataFrame(result, index=pd.Index([names[i] for i in keep], name='model'))
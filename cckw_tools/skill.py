@@ -0,0 +1,239 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+from scipy import stats
+from typing import Dict, Optional, Sequence
+from .wave_bands import band_mask
+from .regions import Region, region_mask
+
+
+def pattern_stats(x: np.ndarray, ref: np.ndarray, weights: Optional[np.ndarray] = None) -> dict:
+    """
+    对多个模式同时计算与参考场的型相关统计量（一次广播计算，无逐模式循环）。
+
+    参数：
+    --------
+    x : np.ndarray
+        (model, cell) 模式场。
+    ref : np.ndarray
+        (cell,) 参考场。
+    weights : np.ndarray, optional
+        (cell,) 权重（如纬度余弦），默认等权。
+
+    返回：
+    --------
+    dict
+        corr, p_value, std, norm_std, crmse, bias, rmse，
+        每项为 (model,) 数组；另含参考场标准差 ref_std 和样本数 n。
+    """
+    x = np.asarray(x, dtype=float)
+    ref = np.asarray(ref, dtype=float)
+    n = ref.shape[-1]
+    w = np.full(n, 1. / n) if weights is None else np.asarray(weights, dtype=float) / np.sum(weights)
+
+    x_mean = x @ w
+    r_mean = ref @ w
+    xa = x - x_mean[:, None]
+    ra = ref - r_mean
+    x_var = (xa ** 2) @ w
+    r_var = (ra ** 2) @ w
+    cov = xa @ (w * ra)
+
+    corr = cov / np.sqrt(x_var * r_var)
+    crmse = np.sqrt(x_var + r_var - 2 * cov)
+    rmse = np.sqrt(((x - ref) ** 2) @ w)
+
+    # 与 stats.pearsonr 相同的双侧 t 检验（假设各格点独立）
+    dof = n - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = corr * np.sqrt(dof / (1. - corr ** 2))
+    p_value = 2 * stats.t.sf(np.abs(t), dof)
+
+    return {
+        'corr': corr,
+        'p_value': p_value,
+        'std': np.sqrt(x_var),
+        'norm_std': np.sqrt(x_var / r_var),
+        'crmse': crmse,
+        'bias': x_mean - r_mean,
+        'rmse': rmse,
+        'ref_std': float(np.sqrt(r_var)),
+        'n': n,
+    }
+
+
+def _skill_table(result: dict, models: Sequence[str], reference: str) -> pd.DataFrame:
+    df = pd.DataFrame({k: result[k] for k in ('corr', 'p_value', 'std', 'norm_std', 'crmse', 'bias', 'rmse')},
+                      index=pd.Index(list(models), name='model'))
+    df.attrs['reference'] = reference
+    df.attrs['ref_std'] = result['ref_std']
+    df.attrs['n'] = result['n']
+    return df
+
+
+def spectral_skill(
+    psumsym: xr.DataArray,
+    reference: str = 'GPCP',
+    band: str = 'Kelvin_box',
+    models: Optional[Sequence[str]] = None,
+    include_reference: bool = False
+) -> pd.DataFrame:
+    """
+    多模式 WK 谱技巧评分：在波带内对所有模式一次性计算与参考谱的
+    型相关、p 值、中心化 RMSE、标准化标准差、偏差和 RMSE。
+
+    参数：
+    --------
+    psumsym : xr.DataArray
+        (model, frequency, wavenumber) 谱，如 all_wk_spectra.nc 的 psumsym。
+    reference : str, optional
+        参考模式名，默认 'GPCP'。
+    band : str, optional
+        wave_bands 中注册的波带，默认 'Kelvin_box'（即 cal_corr 的
+        wavenumber 2-14、frequency 1/20-1/3 区域）。
+    models : list of str, optional
+        需要评分的模式，默认全部。
+    include_reference : bool, optional
+        结果中是否保留参考模式本身，默认 False。
+
+    返回：
+    --------
+    pd.DataFrame
+        以 model 为索引的表；attrs 中含 reference、ref_std（Taylor 图的参考标准差）和 n。
+    """
+    psumsym = psumsym.transpose('model', 'frequency', 'wavenumber')
+    mask = band_mask(band, psumsym.wavenumber.values, psumsym.frequency.values)
+    names = [str(m) for m in psumsym.model.values]
+    cube = psumsym.values[:, mask]
+    ref = cube[names.index(reference)]
+
+    keep = [i for i, m in enumerate(names)
+            if (models is None or m in models) and (include_reference or m != reference)]
+    result = pattern_stats(cube[keep], ref)
+    return _skill_table(result, [names[i] for i in keep], reference)
+
+
+def field_skill(
+    fields: xr.DataArray,
+    reference: xr.DataArray,
+    dims: Sequence[str] = ('lat', 'lon'),
+    model_dim: str = 'model',
+    area_weighted: bool = False
+) -> pd.DataFrame:
+    """
+    空间场（如 kelvin 标准差分布）的多模式技巧评分，算法同 spectral_skill。
+
+    参数：
+    --------
+    fields : xr.DataArray
+        含 model_dim 与 dims 维的模式场。
+    reference : xr.DataArray
+        含 dims 维的参考场。
+    dims : tuple of str, optional
+        参与计算的维度，默认 ('lat', 'lon')。
+    model_dim : str, optional
+        模式维名称，默认 'model'。
+    area_weighted : bool, optional
+        是否按 cos(lat) 加权，默认 False。
+
+    返回：
+    --------
+    pd.DataFrame
+        以 model 为索引的表。
+    """
+    dims = list(dims)
+    fields = fields.transpose(model_dim, *dims)
+    reference = reference.transpose(*dims)
+    x = fields.values.reshape(fields.shape[0], -1)
+    ref = reference.values.ravel()
+    weights = None
+    if area_weighted:
+        weights = np.cos(np.deg2rad(reference['lat'])).broadcast_like(reference).transpose(*dims).values.ravel()
+    valid = np.isfinite(ref) & np.isfinite(x).all(axis=0)
+    if weights is not None:
+        weights = weights[valid]
+    result = pattern_stats(x[:, valid], ref[valid], weights)
+    return _skill_table(result, [str(m) for m in fields[model_dim].values], str(reference.name))
+
+
+def taylor_stats(
+    fields: xr.DataArray,
+    reference: xr.DataArray,
+    regions: Optional[Dict[str, Region]] = None,
+    model_dim: str = 'model',
+    area_weighted: bool = True
+) -> xr.Dataset:
+    """
+    泰勒图所需统计量（标准差、相关系数、中心化均方根误差）的批量计算：
+    模式 × 季节（或其他附加维）× 区域一次算完。各区域的加权矩量由
+    (…, cell) @ (cell, region) 的矩阵乘法同时得到，缺测格点按模式分别剔除。
+
+    参数：
+    --------
+    fields : xr.DataArray
+        含 model_dim、lat、lon 维的模式场，可带 season 等附加维。
+    reference : xr.DataArray
+        含 lat、lon 维的参考场，附加维与 fields 相同（或缺省时对所有附加维共用）。
+    regions : dict, optional
+        区域名 -> (lat1, lat2, lon1, lon2) 或 (lat, lon) 掩膜（见 regions.region_mask），
+        lon1 > lon2 表示跨越 0 度经线；默认整个场记为 'all'。
+    model_dim : str, optional
+        模式维名称，默认 'model'。
+    area_weighted : bool, optional
+        是否按 cos(lat) 加权，默认 True。
+
+    返回：
+    --------
+    xr.Dataset
+        std、corr、crmse、norm_std、bias 维度为 (model_dim, *附加维, region)，
+        ref_std 维度为 (*附加维, region)，n 为各区域的格点数。
+    """
+    regions = regions or {'all': (-90., 90., -360., 360.)}
+    extra = [d for d in fields.dims if d not in (model_dim, 'lat', 'lon')]
+    fields = fields.transpose(*extra, model_dim, 'lat', 'lon')
+    reference = reference.broadcast_like(fields.isel({model_dim: 0}, drop=True)).transpose(*extra, 'lat', 'lon')
+    lat, lon = fields['lat'].values, fields['lon'].values
+
+    # (cell, region) 权重矩阵
+    masks = np.stack([region_mask(lat, lon, r).ravel() for r in regions.values()], axis=1)
+    w = np.cos(np.deg2rad(lat))[:, None].repeat(lon.size, axis=1).ravel() if area_weighted else np.ones(masks.shape[0])
+    weights = masks * w[:, None]
+
+    x = fields.values.reshape(fields.shape[:-2] + (-1,)).astype(float)            # (..., model, cell)
+    ref = reference.values.reshape(reference.shape[:-2] + (1, -1)).astype(float)   # (..., 1, cell)
+    valid = np.isfinite(x) & np.isfinite(ref)
+    x = np.where(valid, x, 0.)
+    ref = np.where(valid, ref, 0.)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total = valid @ weights
+        x_mean = (x @ weights) / total
+        r_mean = (ref @ weights) / total
+        x_var = np.maximum((x * x) @ weights / total - x_mean ** 2, 0.)
+        r_var = np.maximum((ref * ref) @ weights / total - r_mean ** 2, 0.)
+        cov = (x * ref) @ weights / total - x_mean * r_mean
+        corr = cov / np.sqrt(x_var * r_var)
+        crmse = np.sqrt(np.maximum(x_var + r_var - 2 * cov, 0.))
+        norm_std = np.sqrt(x_var / r_var)
+
+    # (..., model, region) -> (model, ..., region)
+    def out(a):
+        return np.moveaxis(a, -2, 0)
+
+    dims = (model_dim, *extra, 'region')
+    coords = {model_dim: fields[model_dim].values, 'region': list(regions),
+              **{d: fields[d].values for d in extra if d in fields.coords}}
+    return xr.Dataset(
+        {
+            'std': (dims, out(np.sqrt(x_var))),
+            'corr': (dims, out(corr)),
+            'crmse': (dims, out(crmse)),
+            'norm_std': (dims, out(norm_std)),
+            'bias': (dims, out(x_mean - r_mean)),
+            # 参考场统计量在各模式间相同（缺测分布不同时取第一个模式）
+            'ref_std': ((*extra, 'region'), np.sqrt(r_var)[..., 0, :]),
+            'n': (('region',), (masks > 0).sum(axis=0)),
+        },
+        coords=coords,
+        attrs={'reference': str(reference.name), 'area_weighted': int(area_weighted)},
+    )
@@ -0,0 +1,222 @@
+import os
+import json
+import hashlib
+import pandas as pd
+import xarray as xr
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Union
+from .wk_spectrum import wk_spectrum
+from .field_store import open_field
+from .profiling import profile_stage
+
+PathLike = Union[str, Sequence[str]]
+
+
+def input_fingerprint(paths: PathLike, **params) -> str:
+    """
+    根据输入文件（绝对路径、大小、修改时间）和计算参数生成指纹，
+    用于判断某个模式的谱是否需要重新计算。
+
+    参数：
+    --------
+    paths : str 或 list of str
+        输入文件路径。
+    **params :
+        影响结果的计算参数（如 seg_len、lat_bounds）。
+
+    返回：
+    --------
+    str
+        sha1 十六进制字符串。
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    items = []
+    for p in sorted(os.path.abspath(p) for p in paths):
+        # FieldStore 目录以其 manifest 为准（每次写入都会替换）
+        manifest = os.path.join(p, 'manifest.json')
+        st = os.stat(manifest if os.path.isdir(p) and os.path.exists(manifest) else p)
+        items.append([p, st.st_size, st.st_mtime_ns])
+    blob = json.dumps({'inputs': items, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def _open_input(paths: PathLike, var: str) -> xr.DataArray:
+    if isinstance(paths, str):
+        return open_field(paths, var, 'spectrum')
+    # 逐个惰性打开后按时间拼接，不依赖 dask（open_mfdataset 需要 dask）
+    parts = [xr.open_dataset(p)[var] for p in paths]
+    return xr.concat(parts, dim='time').sortby('time')
+
+
+def _atomic_write_json(obj: dict, path: str) -> None:
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(obj, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+class SpectraStore:
+    """
+    可追加的多模式 WK 谱存储：每个模式一个 netCDF 文件（<model>.nc），
+    外加 manifest.json 记录每个模式的输入指纹。open() 将其按 model 维拼接，
+    得到与 all_wk_spectra.nc 相同的 psumsym (model, frequency, wavenumber) 布局。
+    """
+
+    manifest_name = 'manifest.json'
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._manifest_path = os.path.join(root, self.manifest_name)
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+
+    def path(self, model: str) -> str:
+        return os.path.join(self.root, f'{model}.nc')
+
+    def models(self) -> List[str]:
+        """已存储的模式名（按名称排序）。"""
+        return sorted(m for m in self.manifest if os.path.exists(self.path(m)))
+
+    def is_current(self, model: str, fingerprint: str) -> bool:
+        """模式已存在且输入指纹未变时返回 True。"""
+        entry = self.manifest.get(model)
+        return (entry is not None and entry['fingerprint'] == fingerprint
+                and os.path.exists(self.path(model)))
+
+    def commit(self, model: str, fingerprint: str) -> None:
+        """在 <model>.nc 写好之后登记到 manifest（原子写入）。"""
+        self.manifest[model] = {'fingerprint': fingerprint, 'file': os.path.basename(self.path(model))}
+        _atomic_write_json(self.manifest, self._manifest_path)
+
+    def write(self, model: str, ds: xr.Dataset, fingerprint: str) -> None:
+        """写入单个模式的谱（先写临时文件再替换），并登记到 manifest。"""
+        tmp = self.path(model) + '.tmp'
+        ds.to_netcdf(tmp)
+        os.replace(tmp, self.path(model))
+        self.commit(model, fingerprint)
+
+    def remove(self, model: str) -> None:
+        """删除某个模式。"""
+        self.manifest.pop(model, None)
+        _atomic_write_json(self.manifest, self._manifest_path)
+        if os.path.exists(self.path(model)):
+            os.remove(self.path(model))
+
+    def open(self, models: Optional[Sequence[str]] = None) -> xr.Dataset:
+        """
+        打开存储中的谱并按 model 维拼接。
+
+        参数：
+        --------
+        models : list of str, optional
+            需要的模式及顺序，默认全部（按名称排序）。
+
+        返回：
+        --------
+        xr.Dataset
+            psumsym/psumanti 等变量，维度 (model, frequency, wavenumber)。
+        """
+        if models is None:
+            models = self.models()
+        dsets = [xr.open_dataset(self.path(m)) for m in models]
+        return xr.concat(dsets, dim=pd.Index(list(models), name='model'))
+
+    def to_netcdf(self, path: str, models: Optional[Sequence[str]] = None) -> None:
+        """导出为单个 all_wk_spectra.nc 形式的文件。"""
+        ds = self.open(models)
+        ds.load().to_netcdf(path)
+        ds.close()
+
+
+def _compute_one(model: str, paths: PathLike, var: str, out: str, spectrum_kwargs: dict) -> str:
+    with profile_stage('spectrum', model=model):
+        data = _open_input(paths, var)
+        ds = wk_spectrum(data, **spectrum_kwargs)
+        ds.attrs['model'] = model
+        tmp = out + '.tmp'
+        ds.to_netcdf(tmp)
+        os.replace(tmp, out)
+    return model
+
+
+def build_wk_spectra(
+    inputs: Dict[str, PathLike],
+    store_dir: str,
+    var: str = 'pr',
+    workers: Optional[int] = None,
+    overwrite: bool = False,
+    **spectrum_kwargs
+) -> List[str]:
+    """
+    批量计算多个模式的 WK 谱，并写入可追加的 SpectraStore。
+
+    已存在且输入未变化的模式会被跳过；每个模式完成后立即登记，
+    因此中断后重新运行会从未完成的模式继续。
+
+    参数：
+    --------
+    inputs : dict
+        模式名 -> 输入文件路径（或路径列表）。
+    store_dir : str
+        存储目录。
+    var : str, optional
+        输入文件中的降水变量名，默认 'pr'。
+    workers : int, optional
+        进程池大小，默认 os.cpu_count()；为 1 时在当前进程内顺序计算。
+    overwrite : bool, optional
+        为 True 时忽略指纹，全部重新计算。
+    **spectrum_kwargs :
+        传给 wk_spectrum 的参数。
+
+    返回：
+    --------
+    list of str
+        本次新计算的模式名。
+
+    某个模式计算失败时继续计算其余模式（成功的照常登记），
+    全部结束后抛出 RuntimeError，列出失败的模式。
+    """
+    store = SpectraStore(store_dir)
+    todo = {}
+    for model, paths in inputs.items():
+        fp = input_fingerprint(paths, var=var, **spectrum_kwargs)
+        if overwrite or not store.is_current(model, fp):
+            todo[model] = fp
+        else:
+            print(f'{model} is up to date, skipping')
+
+    done, failed = [], {}
+    if not todo:
+        return done
+
+    def finish(model, run):
+        try:
+            run()
+        except Exception as e:
+            failed[model] = e
+            print(f'{model} failed: {e}')
+            return
+        store.commit(model, todo[model])
+        done.append(model)
+        print(f'{model} spectrum saved')
+
+    if workers == 1:
+        for model in todo:
+            finish(model, lambda: _compute_one(model, inputs[model], var, store.path(model), spectrum_kwargs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_compute_one, model, inputs[model], var,
+                                   store.path(model), spectrum_kwargs): model
+                       for model in todo}
+            for fut in as_completed(futures):
+                finish(futures[fut], fut.result)
+    if failed:
+        raise RuntimeError(f'spectrum failed for {sorted(failed)} '
+                           f'(the other {len(done)} models were saved; rerun to retry)') \
+            from next(iter(failed.values()))
+    return done
@@ -0,0 +1,277 @@
+import numpy as np
+import xarray as xr
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from .cache import cached_product
+from .field_store import open_field
+from .profiling import profiled
+
+# 与 xarray groupby('time.season') 的排序一致
+SEASONS = ('DJF', 'JJA', 'MAM', 'SON')
+_MONTH_TO_SEASON = np.array([0, 0, 2, 2, 2, 1, 1, 1, 3, 3, 3, 0])
+
+
+def month_index(time) -> np.ndarray:
+    """时间坐标（datetime64 或 cftime）-> 0-11 的月份索引。"""
+    return xr.DataArray(np.asarray(time), dims='time').dt.month.values.astype(np.intp) - 1
+
+
+def season_index(month: np.ndarray) -> np.ndarray:
+    """0-11 的月份索引 -> SEASONS 中的季节索引。"""
+    return _MONTH_TO_SEASON[np.asarray(month)]
+
+
+class StreamingMoments:
+    """
+    分组的逐格点滑动矩（计数、均值、离差平方和 M2）。每个时间块先在块内
+    一次算出各组的矩，再按 Chan et al. (1979) 的公式与已有结果合并，
+    因此数值稳定，并且两个累加器可以任意顺序 merge（用于并行）。
+    没有有效数据的格点（count 为 0）mean 为 NaN，与 xarray 的 mean 一致。
+    """
+
+    def __init__(self, ngroups: int, shape: Tuple[int, ...]):
+        self.ngroups = ngroups
+        self.shape = tuple(shape)
+        self.count = np.zeros((ngroups,) + self.shape)
+        self._mean = np.zeros((ngroups,) + self.shape)  # 累加状态，无数据处为 0
+        self.m2 = np.zeros((ngroups,) + self.shape)
+
+    def _combine(self, count, mean, m2) -> None:
+        total = self.count + count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frac = np.where(total > 0, count / total, 0.)
+        delta = mean - self._mean
+        self._mean += delta * frac
+        self.m2 += m2 + delta ** 2 * self.count * frac
+        self.count = total
+
+    def update(self, x: np.ndarray, groups: np.ndarray) -> None:
+        """
+        累加一个时间块。
+
+        参数：
+        --------
+        x : np.ndarray
+            (time, *shape) 数据，NaN 不计入。
+        groups : np.ndarray
+            (time,) 0..ngroups-1 的组索引。
+        """
+        x = np.asarray(x, dtype=float).reshape(len(groups), -1)
+        onehot = np.zeros((self.ngroups, len(groups)))
+        onehot[groups, np.arange(len(groups))] = 1.
+        valid = np.isfinite(x)
+        x0 = np.where(valid, x, 0.)
+
+        count = onehot @ valid
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(count > 0, (onehot @ x0) / count, 0.)
+        anom = np.where(valid, x0 - mean[groups], 0.)
+        m2 = onehot @ anom ** 2
+        shape = (self.ngroups,) + self.shape
+        self._combine(count.reshape(shape), mean.reshape(shape), m2.reshape(shape))
+
+    def merge(self, other: 'StreamingMoments') -> 'StreamingMoments':
+        """将另一个累加器（如另一段时间的结果）合并进来。"""
+        if other.ngroups != self.ngroups or other.shape != self.shape:
+            raise ValueError('cannot merge accumulators with different groups or shapes')
+        self._combine(other.count, other._mean, other.m2)
+        return self
+
+    def regroup(self, index: np.ndarray, ngroups: int) -> 'StreamingMoments':
+        """
+        将各组合并为更粗的分组（如 12 个月 -> 4 个季节），index[g] 为第 g 组的新组号。
+        """
+        index = np.asarray(index, dtype=np.intp)
+        onehot = np.zeros((ngroups, self.ngroups))
+        onehot[index, np.arange(self.ngroups)] = 1.
+        flat = lambda a: a.reshape(self.ngroups, -1)
+        out = StreamingMoments(ngroups, self.shape)
+        count = onehot @ flat(self.count)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(count > 0, (onehot @ flat(self.count * self._mean)) / count, 0.)
+        m2 = onehot @ (flat(self.m2) + flat(self.count) * (flat(self._mean) - mean[index]) ** 2)
+        shape = (ngroups,) + self.shape
+        out.count, out._mean, out.m2 = count.reshape(shape), mean.reshape(shape), m2.reshape(shape)
+        return out
+
+    @property
+    def mean(self) -> np.ndarray:
+        return np.where(self.count > 0, self._mean, np.nan)
+
+    def var(self, ddof: int = 0) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan)
+
+    def std(self, ddof: int = 0) -> np.ndarray:
+        return np.sqrt(self.var(ddof))
+
+
+class KelvinStats:
+    """
+    一次读数同时得到全时段、逐月和逐季的矩，对应 notebook 中的 std('time')、
+    groupby('time.month').std 和 groupby('time.season').std。
+    每个时间块只累加 12 个月的矩，季节和全时段在输出时由月份合并得到。
+    """
+
+    def __init__(self, shape: Tuple[int, ...]):
+        self.month = StreamingMoments(12, shape)
+
+    @property
+    def season(self) -> StreamingMoments:
+        return self.month.regroup(_MONTH_TO_SEASON, 4)
+
+    @property
+    def total(self) -> StreamingMoments:
+        return self.month.regroup(np.zeros(12, dtype=np.intp), 1)
+
+    def update(self, x: np.ndarray, month: np.ndarray) -> None:
+        """累加 (time, *shape) 数据块，month 为 0-11 的月份索引。"""
+        self.month.update(x, np.asarray(month, dtype=np.intp))
+
+    def merge(self, other: 'KelvinStats') -> 'KelvinStats':
+        self.month.merge(other.month)
+        return self
+
+    def to_dataset(self, coords: dict, dims: Tuple[str, ...], ddof: int = 0) -> xr.Dataset:
+        """
+        输出结果。
+
+        返回：
+        --------
+        xr.Dataset
+            std (*dims)、month_std (month, *dims)、season_std (season, *dims)
+            以及对应的 mean。
+        """
+        dims = tuple(dims)
+        month = {'month': np.arange(1, 13)}
+        season = {'season': list(SEASONS)}
+        total, seasonal = self.total, self.season
+        return xr.Dataset(
+            {
+                'mean': (dims, total.mean[0]),
+                'std': (dims, total.std(ddof)[0]),
+                'month_mean': (('month',) + dims, self.month.mean),
+                'month_std': (('month',) + dims, self.month.std(ddof)),
+                'season_mean': (('season',) + dims, seasonal.mean),
+                'season_std': (('season',) + dims, seasonal.std(ddof)),
+            },
+            coords={**coords, **month, **season},
+        )
+
+
+def _accumulate(data: xr.DataArray, start: int, stop: int, time_chunk: int, scale: float) -> KelvinStats:
+    stats = KelvinStats(data.shape[1:])
+    for t0 in range(start, stop, time_chunk):
+        block = data.isel(time=slice(t0, min(t0 + time_chunk, stop)))
+        stats.update(block.values * scale, month_index(block.time.values))
+    return stats
+
+
+def _open_field(path: str, var: str, lat_bounds: Optional[Tuple[float, float]],
+                time_bounds: Optional[Tuple[str, str]]) -> xr.DataArray:
+    data = open_field(path, var, 'stats')
+    data = data.transpose('time', *[d for d in data.dims if d != 'time'])
+    if time_bounds is not None:
+        data = data.sel(time=slice(*time_bounds))
+    if lat_bounds is not None:
+        if data.lat.values[0] > data.lat.values[-1]:
+            data = data.isel(lat=slice(None, None, -1))
+        data = data.sel(lat=slice(*lat_bounds))
+    return data
+
+
+def _accumulate_file(path, var, lat_bounds, time_bounds, start, stop, time_chunk, scale) -> KelvinStats:
+    data = _open_field(path, var, lat_bounds, time_bounds)
+    try:
+        return _accumulate(data, start, stop, time_chunk, scale)
+    finally:
+        data.close()
+
+
+def stream_stats(
+    data: xr.DataArray,
+    time_chunk: int = 365,
+    scale: float = 1.,
+    ddof: int = 0
+) -> xr.Dataset:
+    """
+    单次遍历计算全时段、逐月和逐季的标准差（及均值）。
+
+    参数：
+    --------
+    data : xr.DataArray
+        含 time 维的场（如 kelvin 滤波后的降水），可以是惰性读取的。
+    time_chunk : int, optional
+        每次读入的时间步数，默认 365。
+    scale : float, optional
+        读入后乘以的系数（如模式数据的 86400），默认 1。
+    ddof : int, optional
+        自由度修正，默认 0（与 xarray 的 std 一致）。
+
+    返回：
+    --------
+    xr.Dataset
+        见 KelvinStats.to_dataset。
+    """
+    data = data.transpose('time', *[d for d in data.dims if d != 'time'])
+    stats = _accumulate(data, 0, data.sizes['time'], time_chunk, scale)
+    dims = data.dims[1:]
+    return stats.to_dataset({d: data[d] for d in dims if d in data.coords}, dims, ddof)
+
+
+@profiled('stats', input_arg=0)
+@cached_product(exclude=('workers',))
+def stream_stats_file(
+    path: str,
+    var: str = 'kelvin',
+    lat_bounds: Optional[Tuple[float, float]] = (-15, 15),
+    time_bounds: Optional[Tuple[str, str]] = None,
+    time_chunk: int = 365,
+    scale: float = 1.,
+    workers: Optional[int] = None,
+    ddof: int = 0
+) -> xr.Dataset:
+    """
+    对单个文件计算 stream_stats。workers 大于 1 时按时间段分给进程池，
+    各段的累加器最后合并，结果与串行计算一致。
+    设置 CCKW_CACHE_DIR 后结果会缓存，输入文件不变时直接读取（见 cache.py）。
+
+    参数：
+    --------
+    path : str
+        netCDF 文件，如 pr_day_<model>_1997-2014_interp_2x2_kelvin_25.nc。
+    var : str, optional
+        变量名，默认 'kelvin'。
+    lat_bounds : tuple, optional
+        纬度范围，默认 (-15, 15)；None 表示不截取。
+    time_bounds : tuple, optional
+        时间范围，如 ('1997', '2014')。
+    time_chunk, scale, ddof :
+        见 stream_stats。
+    workers : int, optional
+        进程数，默认串行。
+
+    返回：
+    --------
+    xr.Dataset
+        见 KelvinStats.to_dataset。
+    """
+    data = _open_field(path, var, lat_bounds, time_bounds)
+    ntime = data.sizes['time']
+    dims = data.dims[1:]
+    coords = {d: data[d].load() for d in dims if d in data.coords}
+    if not workers or workers == 1:
+        stats = _accumulate(data, 0, ntime, time_chunk, scale)
+        data.close()
+        return stats.to_dataset(coords, dims, ddof)
+    data.close()
+
+    edges = np.linspace(0, ntime, min(workers, ntime) + 1).astype(int)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_accumulate_file, path, var, lat_bounds, time_bounds,
+                               a, b, time_chunk, scale)
+                   for a, b in zip(edges[:-1], edges[1:]) if b > a]
+        stats = futures[0].result()
+        for fut in futures[1:]:
+            stats.merge(fut.result())
+    return stats.to_dataset(coords, dims, ddof)
@@ -0,0 +1,423 @@
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+import xarray as xr
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, Optional, Sequence, Tuple, Union
+from .ma import re, g, omega, deg2rad, sec2day
+
+SECONDS_PER_DAY = 86400.
+
+
+class KelvinWave:
+    """
+    合成数据中的一列赤道 Kelvin 波：
+    A * exp(-(y / L)^2 / 2) * cos(k * lon - 2π f t + phase)，
+    其中 L = sqrt(c / β) 为赤道变形半径，c = sqrt(g he)，
+    f 由浅水 Kelvin 波频散关系 ω = c k 给出。
+
+    参数：
+    --------
+    he : float
+        等效深度 (m)。
+    wavenumber : int
+        纬向波数（正值为东传）。
+    amplitude : float
+        赤道上的振幅 (mm/day)。
+    phase : float, optional
+        初相位 (rad)，默认 0。
+    """
+
+    def __init__(self, he: float, wavenumber: int, amplitude: float, phase: float = 0.):
+        self.he = float(he)
+        self.wavenumber = int(wavenumber)
+        self.amplitude = float(amplitude)
+        self.phase = float(phase)
+
+    def __repr__(self):
+        return (f'KelvinWave(he={self.he:g}, wavenumber={self.wavenumber}, '
+                f'amplitude={self.amplitude:g}, frequency={self.frequency:.4f})')
+
+    @property
+    def phase_speed(self) -> float:
+        """相速度 (m/s)。"""
+        return np.sqrt(g * self.he)
+
+    @property
+    def frequency(self) -> float:
+        """频率 (CPD)。"""
+        return self.phase_speed * self.wavenumber / (2 * np.pi * re) / sec2day
+
+    @property
+    def trapping_scale(self) -> float:
+        """赤道变形半径，以纬度（度）表示。"""
+        beta = 2 * omega / re
+        return np.sqrt(self.phase_speed / beta) / re / deg2rad
+
+    def structure(self, lat: np.ndarray) -> np.ndarray:
+        """经向结构 exp(-(y / L)^2 / 2)。"""
+        return np.exp(-0.5 * (np.asarray(lat) / self.trapping_scale) ** 2)
+
+    def to_dict(self) -> dict:
+        return {'he': self.he, 'wavenumber': self.wavenumber, 'amplitude': self.amplitude,
+                'phase': self.phase, 'frequency': self.frequency}
+
+
+# 默认的三列 Kelvin 波，都落在 kelvin_band_mask 的 Kelvin 波带内（周期约 14、5、3 天）
+DEFAULT_WAVES = (
+    KelvinWave(12, 3, 2.0),
+    KelvinWave(25, 5, 1.5, phase=1.0),
+    KelvinWave(50, 7, 1.0, phase=2.0),
+)
+
+
+def synthetic_grid(resolution: float = 2., lat_max: float = 30.) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (lat, lon) 网格：纬度关于赤道对称（包含 0°），经度 0 ~ 360 - resolution。
+    """
+    nhalf = int(round(lat_max / resolution))
+    lat = np.arange(-nhalf, nhalf + 1) * resolution
+    lon = np.arange(int(round(360. / resolution))) * resolution
+    return lat, lon
+
+
+def expected_kelvin_std(waves: Sequence[KelvinWave], lat: np.ndarray) -> np.ndarray:
+    """
+    各纬度上 Kelvin 波信号的理论标准差 (mm/day)，即 sqrt(Σ A² s(lat)² / 2)，
+    可与 kelvin_filter + stream_stats 的结果对照。
+    """
+    var = sum(0.5 * (w.amplitude * w.structure(lat)) ** 2 for w in waves)
+    return np.sqrt(var)
+
+
+class SyntheticPrecip:
+    """
+    CMIP 风格日降水的合成器：气候态（ITCZ + 年循环）+ AR(1) 红噪声 + 若干 Kelvin 波。
+    按时间块生成，红噪声的状态在块之间延续，因此任意分块得到的序列完全相同。
+    Kelvin 波写成 cos(k lon) 和 sin(k lon) 两个空间型与时间系数的乘积，
+    每块只做一次矩阵乘法。
+
+    参数：
+    --------
+    lat, lon : np.ndarray
+        网格，见 synthetic_grid。
+    ntime : int
+        总天数。
+    waves : list of KelvinWave, optional
+        嵌入的 Kelvin 波，默认 DEFAULT_WAVES。
+    noise_std : float, optional
+        红噪声标准差 (mm/day)，默认 4。
+    noise_lag1 : float, optional
+        红噪声的滞后 1 天自相关，默认 0.6。
+    mean_pr : float, optional
+        ITCZ 中心的平均降水 (mm/day)，默认 8；远离赤道处约为其 1/4。
+    snap : bool, optional
+        为 True（默认）时把每列波的频率调整到整段序列可分辨的 FFT 频率
+        (整数个周期)，滤波和谱分析结果与真值可精确比对；真值中记录调整后的频率。
+    seed : int 或 np.random.SeedSequence, optional
+        随机种子。
+    """
+
+    def __init__(
+        self,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        ntime: int,
+        waves: Optional[Sequence[KelvinWave]] = None,
+        noise_std: float = 4.,
+        noise_lag1: float = 0.6,
+        mean_pr: float = 8.,
+        snap: bool = True,
+        seed: Union[int, np.random.SeedSequence, None] = 0
+    ):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.ntime = int(ntime)
+        self.waves = list(DEFAULT_WAVES if waves is None else waves)
+        self.noise_std = noise_std
+        self.noise_lag1 = noise_lag1
+        self.mean_pr = mean_pr
+        self.snap = snap
+        self.seed = seed
+
+        # 每列波的频率（CPD），snap 时取整段序列上最近的整数周期数
+        freq = np.array([w.frequency for w in self.waves])
+        if snap:
+            freq = np.round(freq * self.ntime) / self.ntime
+        self.frequencies = freq
+
+        nlat, nlon = len(self.lat), len(self.lon)
+        klon = np.outer([w.wavenumber for w in self.waves], self.lon * deg2rad)       # (W, lon)
+        prof = np.array([w.amplitude * w.structure(self.lat) for w in self.waves])     # (W, lat)
+        # cos(k lon - ω t + φ) = cos(k lon) cos(ω t - φ) + sin(k lon) sin(ω t - φ)
+        self._patterns = np.concatenate([
+            prof[:, :, None] * np.cos(klon)[:, None, :],
+            prof[:, :, None] * np.sin(klon)[:, None, :],
+        ]).reshape(2 * len(self.waves), nlat * nlon).astype(np.float32)
+
+        itcz = 0.25 + 0.75 * np.exp(-0.5 * ((self.lat - 5.) / 8.) ** 2)
+        self._climatology = np.broadcast_to(mean_pr * itcz[:, None], (nlat, nlon)).ravel()
+        self._seasonal = 0.3 * mean_pr * np.sin(self.lat * deg2rad)[:, None] * np.ones(nlon)
+        self._seasonal = self._seasonal.ravel()
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.ntime, len(self.lat), len(self.lon)
+
+    def truth(self) -> dict:
+        """嵌入信号与噪声参数，写入文件属性 synthetic_truth（JSON）。"""
+        waves = []
+        for w, f in zip(self.waves, self.frequencies):
+            d = w.to_dict()
+            d['frequency'] = float(f)
+            waves.append(d)
+        return {'waves': waves, 'noise_std': self.noise_std, 'noise_lag1': self.noise_lag1,
+                'mean_pr': self.mean_pr, 'snap': self.snap}
+
+    def kelvin_signal(self, t: np.ndarray) -> np.ndarray:
+        """第 t 天（可为数组）的 Kelvin 波信号，形状 (len(t), lat, lon)，单位 mm/day。"""
+        t = np.asarray(t, dtype=float)
+        arg = 2 * np.pi * np.outer(t, self.frequencies) - np.array([w.phase for w in self.waves])
+        coef = np.concatenate([np.cos(arg), np.sin(arg)], axis=1).astype(np.float32)
+        return (coef @ self._patterns).reshape(len(t), len(self.lat), len(self.lon))
+
+    def chunks(self, chunk: int = 365, dtype: type = np.float32) -> Iterator[Tuple[slice, np.ndarray]]:
+        """
+        按时间块依次产出 (时间切片, (chunk, lat, lon) 日降水 mm/day)。
+        """
+        rng = np.random.default_rng(self.seed)
+        npoint = len(self.lat) * len(self.lon)
+        a = np.float32(self.noise_lag1)
+        b = np.float32(self.noise_std * np.sqrt(1. - self.noise_lag1 ** 2))
+        # 初始状态取平稳分布，序列从第一天起就是平稳的
+        prev = (self.noise_std * rng.standard_normal(npoint, dtype=np.float32))
+        clim = self._climatology.astype(np.float32)
+        seasonal = self._seasonal.astype(np.float32)
+        for t0 in range(0, self.ntime, chunk):
+            t1 = min(t0 + chunk, self.ntime)
+            t = np.arange(t0, t1)
+            # AR(1) 递推在时间上逐步进行、在空间上向量化（比沿 axis=0 的 lfilter 快一个量级）
+            pr = rng.standard_normal((t1 - t0, npoint), dtype=np.float32)
+            pr *= b
+            pr[0] += a * prev
+            for i in range(1, t1 - t0):
+                pr[i] += a * pr[i - 1]
+            prev = pr[-1].copy()
+            annual = np.cos(2 * np.pi * (t - 15) / 365.25).astype(np.float32)[:, None]
+            pr += clim
+            pr += annual * seasonal
+            pr += self.kelvin_signal(t).reshape(t1 - t0, npoint)
+            yield slice(t0, t1), pr.reshape(t1 - t0, len(self.lat), len(self.lon)).astype(dtype, copy=False)
+
+    def to_dataarray(self, start: str = '1997-01-01', chunk: int = 365) -> xr.DataArray:
+        """一次性在内存中生成全部数据 (mm/day)，适合小规模测试。"""
+        out = np.empty(self.shape, dtype=np.float32)
+        for sl, block in self.chunks(chunk):
+            out[sl] = block
+        return xr.DataArray(out, dims=('time', 'lat', 'lon'), name='pr',
+                            coords={'time': pd.date_range(start, periods=self.ntime, freq='D'),
+                                    'lat': self.lat, 'lon': self.lon},
+                            attrs={'units': 'mm/day', 'synthetic_truth': json.dumps(self.truth())})
+
+
+def synthetic_precip(
+    years: int = 2,
+    resolution: float = 2.,
+    lat_max: float = 30.,
+    start_year: int = 1997,
+    **kwargs
+) -> xr.DataArray:
+    """
+    在内存中生成合成日降水 (mm/day)。kwargs 传给 SyntheticPrecip。
+    """
+    lat, lon = synthetic_grid(resolution, lat_max)
+    dates = pd.date_range(f'{start_year}-01-01', f'{start_year + years - 1}-12-31', freq='D')
+    return SyntheticPrecip(lat, lon, len(dates), **kwargs).to_dataarray(f'{start_year}-01-01')
+
+
+def synthetic_filename(model: str, start_year: int, end_year: int, resolution: float, engine: str = 'netcdf') -> str:
+    """与 CMIP 预处理文件相同的命名 pr_day_<model>_<y0>-<y1>_interp_<res>x<res>.nc。"""
+    res = f'{resolution:g}'
+    return f"pr_day_{model}_{start_year}-{end_year}_interp_{res}x{res}.{'zarr' if engine == 'zarr' else 'nc'}"
+
+
+def write_synthetic_model(
+    path: str,
+    model: str = 'SYNTH',
+    years: int = 18,
+    resolution: float = 2.,
+    lat_max: float = 30.,
+    start_year: int = 1997,
+    engine: str = 'netcdf',
+    chunk: int = 365,
+    compress: bool = False,
+    **kwargs
+) -> str:
+    """
+    按时间块生成一个模式的合成日降水并写入文件，内存中只有一个时间块。
+    变量 pr 的单位与 CMIP 文件相同 (kg m-2 s-1)，即 mm/day / 86400；
+    全局属性 synthetic_truth 以 JSON 记录嵌入的 Kelvin 波，见 synthetic_truth。
+
+    参数：
+    --------
+    path : str
+        输出文件（netCDF）或目录（zarr）。
+    model : str, optional
+        模式名，写入属性 source_id。
+    years : int, optional
+        年数，默认 18（1997-2014）。
+    resolution : float, optional
+        网格分辨率（度），默认 2。
+    lat_max : float, optional
+        纬度范围 (-lat_max, lat_max)，默认 30；取 90 得到全球网格。
+    start_year : int, optional
+        起始年份，默认 1997。
+    engine : str, optional
+        'netcdf'（默认）或 'zarr'（需要安装 zarr）。
+    chunk : int, optional
+        每次生成和写入的天数，也是文件的时间分块大小，默认 365。
+    compress : bool, optional
+        netCDF 是否 zlib 压缩，默认 False（随机噪声几乎不可压缩，压缩只会变慢）。
+    **kwargs :
+        传给 SyntheticPrecip（waves、noise_std、noise_lag1、mean_pr、snap、seed）。
+
+    返回：
+    --------
+    str
+        输出路径。
+    """
+    lat, lon = synthetic_grid(resolution, lat_max)
+    dates = pd.date_range(f'{start_year}-01-01', f'{start_year + years - 1}-12-31', freq='D')
+    gen = SyntheticPrecip(lat, lon, len(dates), **kwargs)
+    attrs = {'source_id': model, 'synthetic_truth': json.dumps(gen.truth())}
+    var_attrs = {'units': 'kg m-2 s-1', 'long_name': 'Precipitation', 'standard_name': 'precipitation_flux'}
+    coords = {'time': dates, 'lat': ('lat', lat, {'units': 'degrees_north'}),
+              'lon': ('lon', lon, {'units': 'degrees_east'})}
+
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder, exist_ok=True)
+
+    if engine == 'zarr':
+        try:
+            import zarr  # noqa: F401
+        except ImportError:
+            raise ImportError("engine='zarr' requires the zarr package; use engine='netcdf' instead")
+        for sl, block in gen.chunks(chunk):
+            ds = xr.Dataset({'pr': (('time', 'lat', 'lon'), block / SECONDS_PER_DAY, var_attrs)},
+                            coords={**coords, 'time': dates[sl]}, attrs=attrs)
+            if sl.start == 0:
+                ds.to_zarr(path, mode='w', encoding={'pr': {'chunks': (chunk, len(lat), len(lon))}})
+            else:
+                ds.to_zarr(path, append_dim='time')
+        return path
+
+    if engine != 'netcdf':
+        raise ValueError(f"unknown engine {engine!r}, expected 'netcdf' or 'zarr'")
+
+    import netCDF4
+
+    tmp = path + '.tmp'
+    # 先用 xarray 写坐标（保留时间编码），再用 netCDF4 逐块写变量
+    xr.Dataset(coords=coords, attrs=attrs).to_netcdf(tmp)
+    with netCDF4.Dataset(tmp, 'a') as nc:
+        v = nc.createVariable('pr', 'f4', ('time', 'lat', 'lon'), zlib=compress, complevel=1,
+                              chunksizes=(min(chunk, len(dates)), len(lat), len(lon)))
+        v.setncatts(var_attrs)
+        for sl, block in gen.chunks(chunk):
+            v[sl] = block / np.float32(SECONDS_PER_DAY)
+    os.replace(tmp, path)
+    return path
+
+
+def _write_one(model: str, path: str, seed: np.random.SeedSequence, scale: float, kwargs: dict) -> Tuple[str, float]:
+    t0 = time.perf_counter()
+    waves = [KelvinWave(w.he, w.wavenumber, w.amplitude * scale, w.phase)
+             for w in (kwargs.pop('waves', None) or DEFAULT_WAVES)]
+    write_synthetic_model(path, model=model, waves=waves, seed=seed, **kwargs)
+    return path, time.perf_counter() - t0
+
+
+def write_synthetic_ensemble(
+    folder: str,
+    nmodel: int = 60,
+    models: Optional[Sequence[str]] = None,
+    amplitude_spread: float = 0.3,
+    seed: int = 0,
+    workers: Optional[int] = None,
+    overwrite: bool = False,
+    **kwargs
+) -> pd.DataFrame:
+    """
+    在进程池中批量生成合成模式集合，文件命名与 CMIP 预处理文件相同，
+    可直接用 model_file_index(os.path.join(folder, 'pr_day_*')) 建立索引。
+    每个模式的 Kelvin 波振幅乘以一个对数正态分布的系数，
+    因此模式间的 Kelvin 波强度（和 skill 评分）有已知的差异。
+
+    参数：
+    --------
+    folder : str
+        输出目录。
+    nmodel : int, optional
+        模式数，默认 60；给定 models 时忽略。
+    models : list of str, optional
+        模式名，默认 SYNTH00、SYNTH01 …
+    amplitude_spread : float, optional
+        振幅系数的对数标准差，默认 0.3；0 表示所有模式相同。
+    seed : int, optional
+        随机种子，每个模式的噪声种子由它派生。
+    workers : int, optional
+        进程数，默认 os.cpu_count()。
+    overwrite : bool, optional
+        为 False（默认）时已存在的文件跳过。
+    **kwargs :
+        传给 write_synthetic_model（years、resolution、lat_max、engine、chunk、waves 等）。
+
+    返回：
+    --------
+    pd.DataFrame
+        以 model 为索引，列为 path 和 amplitude_scale（振幅系数，真值）。
+    """
+    models = list(models) if models is not None else [f'SYNTH{i:02d}' for i in range(nmodel)]
+    ss = np.random.SeedSequence(seed)
+    scales = np.exp(amplitude_spread * np.random.default_rng(ss).standard_normal(len(models)))
+    seeds = ss.spawn(len(models))
+    years = kwargs.get('years', 18)
+    start_year = kwargs.get('start_year', 1997)
+    resolution = kwargs.get('resolution', 2.)
+    engine = kwargs.get('engine', 'netcdf')
+
+    table = pd.DataFrame(index=pd.Index(models, name='model'))
+    table['path'] = [os.path.join(folder, synthetic_filename(m, start_year, start_year + years - 1,
+                                                             resolution, engine)) for m in models]
+    table['amplitude_scale'] = scales
+
+    todo = [(m, table.at[m, 'path'], s, scale) for m, s, scale in zip(models, seeds, scales)
+            if overwrite or not os.path.exists(table.at[m, 'path'])]
+    for m in models:
+        if not overwrite and os.path.exists(table.at[m, 'path']):
+            print(f'{m} exists, skipping')
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_write_one, m, path, s, scale, dict(kwargs)): m for m, path, s, scale in todo}
+        for fut in as_completed(futures):
+            path, elapsed = fut.result()
+            print(f'{futures[fut]} written to {path} ({os.path.getsize(path) / 1e9:.2f} GB, {elapsed:.1f} s)'
+                  if os.path.isfile(path) else f'{futures[fut]} written to {path} ({elapsed:.1f} s)')
+    return table
+
+
+def synthetic_truth(path: str) -> Dict:
+    """
+    读取合成文件中记录的真值：{'waves': DataFrame(he, wavenumber, amplitude, phase, frequency), ...}。
+    """
+    if os.path.isdir(path):
+        ds = xr.open_zarr(path)
+    else:
+        ds = xr.open_dataset(path)
+    with ds:
+        truth = json.loads(ds.attrs['synthetic_truth'])
+    truth['waves'] = pd.DataFrame(truth['waves'])
+    return truth
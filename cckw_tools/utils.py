@@ -1,22 +1,60 @@
 
 import numpy as np
-import matplotlib.pyplot as plt
 import os
-from matplotlib import colors
-from typing import Optional, List, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional, List, Tuple
+from .profiling import profiled
+
+if TYPE_CHECKING:
+    # matplotlib 只在用到绘图函数时导入，计算模块（get_curve 等）保持轻量
+    from matplotlib.colors import ListedColormap
+    from matplotlib.figure import Figure
 
 
 def filter_series(series, min_wn, max_wn):
     return series[(series.index >= min_wn) & (series.index <= max_wn)]
 
 
+_FIGURE_WRITER = None
+_PENDING_WRITES = []
+
+
+def _rasterize_fills(fig: 'Figure') -> int:
+    """把图中的填色对象（contourf、pcolormesh、fill 等）设为栅格化，线、文字、海岸线保持矢量。"""
+    from matplotlib.collections import PolyCollection, QuadMesh
+    from matplotlib.image import AxesImage
+    count = 0
+    for ax in fig.axes:
+        for c in ax.collections:
+            if getattr(c, 'filled', False) or isinstance(c, (PolyCollection, QuadMesh)):
+                c.set_rasterized(True)
+                count += 1
+        for im in ax.images:
+            if isinstance(im, AxesImage):
+                im.set_rasterized(True)
+    return count
+
+
+@profiled('figure')
+def _write_figure(fig: 'Figure', outpath: str, dpi: int, fmt: str) -> Tuple[int, float]:
+    t0 = time.perf_counter()
+    fig.savefig(outpath, dpi=dpi, bbox_inches='tight', format=fmt)
+    elapsed = time.perf_counter() - t0
+    size = os.path.getsize(outpath)
+    print(f'Figure saved at: {outpath} ({size / 1e6:.2f} MB, {elapsed:.1f} s)')
+    return size, elapsed
+
+
 def save_figure(
-    fig: plt.Figure,
+    fig: 'Figure',
     filename: str = 'meridional_mean',
     folder: Optional[str] = None,
     fmt: str = 'pdf',
-    dpi: int = 600
-) -> None:
+    dpi: int = 600,
+    rasterize: bool = False,
+    background: bool = False
+):
     """
     保存 matplotlib 生成的图像文件。
 
@@ -31,11 +69,19 @@ def save_figure(
     fmt : str, optional
         文件格式，例如 'pdf'、'png'、'jpg'，默认 'pdf'。
     dpi : int, optional
-        保存图像的分辨率，默认 600 dpi。
+        保存图像的分辨率，默认 600 dpi（矢量格式中只作用于栅格化的部分）。
+    rasterize : bool, optional
+        为 True 时将填色等值线等填充对象按 dpi 栅格化，线条、文字和海岸线
+        仍为矢量，多子图 cartopy 图的 PDF 会小得多，默认 False。
+    background : bool, optional
+        为 True 时把图像交给后台线程写文件并立即返回，可以接着计算下一张图；
+        写完之前不要再修改 fig（关闭它没有问题）。用 wait_for_figures()
+        等待全部写完。默认 False。
 
     返回：
     --------
-    None
+    None 或 concurrent.futures.Future
+        后台写入时返回 Future，其结果为 (文件字节数, 写入秒数)。
     """
 
     # 确定保存路径
@@ -51,9 +97,28 @@ def save_figure(
     # 完整的输出路径，自动加上后缀
     outpath = os.path.join(folder, f"{filename}.{fmt}")
 
-    # 保存图像
-    fig.savefig(outpath, dpi=dpi, bbox_inches='tight', format=fmt)
-    print(f'Figure saved at: {outpath}')
+    if rasterize:
+        _rasterize_fills(fig)
+
+    if not background:
+        _write_figure(fig, outpath, dpi, fmt)
+        return None
+
+    # 后台线程直接写 fig 本身（复制 cartopy 图代价太高），
+    # 调用方在 Future 完成前不能再修改它；plt.close(fig) 不影响写入
+    global _FIGURE_WRITER
+    if _FIGURE_WRITER is None:
+        _FIGURE_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix='save_figure')
+    future = _FIGURE_WRITER.submit(_write_figure, fig, outpath, dpi, fmt)
+    _PENDING_WRITES.append(future)
+    return future
+
+
+def wait_for_figures() -> List[Tuple[int, float]]:
+    """等待所有后台写入完成，返回每个文件的 (字节数, 写入秒数)。"""
+    results = [f.result() for f in _PENDING_WRITES]
+    _PENDING_WRITES.clear()
+    return results
 
 def get_curve(
     he: Optional[List[float]] = None,
@@ -102,7 +167,57 @@ def get_curve(
     return kw_x, kw_y
 
 
-def create_cmap_from_string(color_string: str) -> colors.ListedColormap:
+def points_in_polygon(
+    x: np.ndarray,
+    y: np.ndarray,
+    px: np.ndarray,
+    py: np.ndarray,
+    tol: float = 1e-9
+) -> np.ndarray:
+    """
+    向量化的点在多边形内判断（射线法），落在边上的点视为在多边形内。
+
+    参数：
+    --------
+    x, y : np.ndarray
+        待判断点的坐标（形状相同，任意维度）。
+    px, py : np.ndarray
+        多边形顶点坐标（首尾可以重合，如 get_curve 的输出）。
+    tol : float, optional
+        判断点落在边上的容差，默认 1e-9。
+
+    返回：
+    --------
+    np.ndarray
+        与 x 形状相同的布尔数组。
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    shape = np.broadcast(x, y).shape
+    xf = np.broadcast_to(x, shape).ravel()[:, None]
+    yf = np.broadcast_to(y, shape).ravel()[:, None]
+    x0 = np.asarray(px, dtype=float)[None, :]
+    y0 = np.asarray(py, dtype=float)[None, :]
+    x1 = np.roll(x0, -1, axis=1)
+    y1 = np.roll(y0, -1, axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crosses = ((y0 > yf) != (y1 > yf)) & \
+                  (xf < (x1 - x0) * (yf - y0) / (y1 - y0) + x0)
+    inside = np.count_nonzero(crosses, axis=1) % 2 == 1
+
+    # 点到各边的距离，容差内视为在边上
+    dx, dy = x1 - x0, y1 - y0
+    seg2 = dx ** 2 + dy ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.clip(np.where(seg2 > 0, ((xf - x0) * dx + (yf - y0) * dy) / seg2, 0.), 0., 1.)
+    dist2 = (xf - (x0 + t * dx)) ** 2 + (yf - (y0 + t * dy)) ** 2
+    on_edge = (dist2 <= tol ** 2).any(axis=1)
+
+    return (inside | on_edge).reshape(shape)
+
+
+def create_cmap_from_string(color_string: str) -> 'ListedColormap':
     """
     根据给定的颜色字符串创建一个反转的颜色映射（Colormap）。
 
@@ -124,6 +239,8 @@ def create_cmap_from_string(color_string: str) -> colors.ListedColormap:
         plt.colorbar()
         plt.show()
     """
+    from matplotlib import colors
+
     # 去除多余的空白行并分割每行
     color_list = color_string.strip().split('\n')
     
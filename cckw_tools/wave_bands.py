@@ -0,0 +1,168 @@
+import hashlib
+import numpy as np
+import xarray as xr
+from typing import Dict, List, Optional, Tuple
+from .utils import get_curve, points_in_polygon
+from .ma import matsuno_modes_array
+
+
+class WaveBand:
+    """
+    波数-频率空间中的一个波带：由两条频散曲线（等效深度 he_range 下的
+    mode 模态）和周期线 period_range、波数范围 wn_range 围成的多边形。
+    mode 为 None 时只由波数和周期围成矩形（如 MJO）；也可直接给定 polygon。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        wn_range: Tuple[float, float],
+        period_range: Tuple[float, float],
+        mode: Optional[str] = None,
+        he_range: Tuple[float, float] = (8, 90),
+        n: int = 1,
+        polygon: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ):
+        self.name = name
+        self.wn_range = wn_range
+        self.period_range = period_range
+        self.mode = mode
+        self.he_range = he_range
+        self.n = n
+        self._polygon = polygon
+
+    def __repr__(self):
+        return (f'WaveBand({self.name!r}, wn={self.wn_range}, period={self.period_range}, '
+                f'mode={self.mode!r}, he={self.he_range})')
+
+    @property
+    def polygon(self) -> Tuple[np.ndarray, np.ndarray]:
+        """多边形顶点 (wavenumber, frequency)，首次访问时生成。"""
+        if self._polygon is None:
+            self._polygon = self._build_polygon()
+        return self._polygon
+
+    def _build_polygon(self, npts: int = 201) -> Tuple[np.ndarray, np.ndarray]:
+        wn0, wn1 = self.wn_range
+        fmin, fmax = 1. / max(self.period_range), 1. / min(self.period_range)
+        wn = np.linspace(wn0, wn1, npts)
+        lower = np.full(npts, fmin)
+        upper = np.full(npts, fmax)
+        if self.mode is not None:
+            max_wn = max(abs(wn0), abs(wn1))
+            curves = matsuno_modes_array(he=list(self.he_range), n=[self.n],
+                                         max_wn=max_wn, n_wn=2000)
+            f = curves.sel(mode=self.mode, n=self.n).interp(wavenumber=wn).values
+            lower = np.maximum(lower, np.nanmin(f, axis=0))
+            upper = np.minimum(upper, np.nanmax(f, axis=0))
+        keep = lower <= upper
+        x = np.concatenate([wn[keep], wn[keep][::-1], wn[keep][:1]])
+        y = np.concatenate([lower[keep], upper[keep][::-1], lower[keep][:1]])
+        return x, y
+
+
+def _kelvin_polygon() -> Tuple[np.ndarray, np.ndarray]:
+    kw_x, kw_y = get_curve()
+    return kw_x[0], kw_y[0]
+
+
+WAVE_BANDS: Dict[str, WaveBand] = {}
+
+
+def register_wave_band(band: WaveBand) -> WaveBand:
+    """注册（或覆盖）一个波带，并清除其已缓存的掩膜。"""
+    WAVE_BANDS[band.name] = band
+    for key in [k for k in _MASK_CACHE if k[0] == band.name]:
+        del _MASK_CACHE[key]
+    return band
+
+
+def get_wave_band(name: str) -> WaveBand:
+    """按名称取出已注册的波带。"""
+    try:
+        return WAVE_BANDS[name]
+    except KeyError:
+        raise KeyError(f'unknown wave band {name!r}, registered: {list(WAVE_BANDS)}')
+
+
+_MASK_CACHE: Dict[tuple, np.ndarray] = {}
+
+
+def _grid_key(a: np.ndarray) -> str:
+    a = np.ascontiguousarray(a, dtype=float)
+    return hashlib.sha1(a.tobytes()).hexdigest()
+
+
+def band_mask(name: str, wavenumber, frequency) -> np.ndarray:
+    """
+    将波带多边形栅格化到给定的谱网格上（向量化点在多边形内判断）。
+    同一网格只计算一次，之后直接返回缓存。
+
+    参数：
+    --------
+    name : str
+        波带名称，如 'Kelvin'、'ER'、'MRG'、'MJO'、'IG'。
+    wavenumber, frequency : array-like
+        谱网格坐标。
+
+    返回：
+    --------
+    np.ndarray
+        (frequency, wavenumber) 只读布尔数组。
+    """
+    wavenumber = np.asarray(wavenumber, dtype=float)
+    frequency = np.asarray(frequency, dtype=float)
+    key = (name, _grid_key(wavenumber), _grid_key(frequency))
+    mask = _MASK_CACHE.get(key)
+    if mask is None:
+        px, py = get_wave_band(name).polygon
+        mask = points_in_polygon(wavenumber[None, :], frequency[:, None], px, py)
+        mask.flags.writeable = False
+        _MASK_CACHE[key] = mask
+    return mask
+
+
+def band_mask_like(name: str, spectra: xr.DataArray) -> xr.DataArray:
+    """返回与 spectra 的 (frequency, wavenumber) 坐标一致的波带掩膜 DataArray。"""
+    mask = band_mask(name, spectra.wavenumber.values, spectra.frequency.values)
+    return xr.DataArray(mask, coords={'frequency': spectra.frequency, 'wavenumber': spectra.wavenumber},
+                        dims=('frequency', 'wavenumber'), name=name)
+
+
+def band_power(spectra: xr.DataArray, names: Optional[List[str]] = None, how: str = 'mean') -> xr.DataArray:
+    """
+    波带积分功率：对 spectra（可含 model 等其他维度）做一次掩膜归约。
+
+    参数：
+    --------
+    spectra : xr.DataArray
+        含 frequency、wavenumber 维的谱，如 all_wk_spectra.nc 的 psumsym。
+    names : list of str, optional
+        波带名称，默认全部已注册波带。
+    how : str, optional
+        'mean'（波带内平均）或 'sum'（波带内求和），默认 'mean'。
+
+    返回：
+    --------
+    xr.DataArray
+        增加 band 维、去掉 frequency/wavenumber 维的结果。
+    """
+    if names is None:
+        names = list(WAVE_BANDS)
+    masks = xr.concat([band_mask_like(n, spectra) for n in names], dim='band').astype(float)
+    masks['band'] = names
+    total = xr.dot(spectra.fillna(0.), masks, dim=['frequency', 'wavenumber'])
+    if how == 'sum':
+        return total
+    # 分母只计非缺测的格点，与 nanmean 一致
+    return total / xr.dot(spectra.notnull().astype(float), masks, dim=['frequency', 'wavenumber'])
+
+
+# Kelvin 波带与 get_curve / kelvin_filter 一致；其余按 Wheeler & Kiladis (1999)
+register_wave_band(WaveBand('Kelvin', (2, 14), (3, 20), polygon=_kelvin_polygon()))
+register_wave_band(WaveBand('ER', (-10, -1), (10, 48), mode='ER'))
+register_wave_band(WaveBand('MRG', (-10, -1), (3, 10), mode='MRG'))
+register_wave_band(WaveBand('MJO', (1, 5), (30, 96)))
+register_wave_band(WaveBand('IG', (-15, -1), (1.25, 2.5), mode='WIG', he_range=(12, 90)))
+# cal_corr / Taylor 图中使用的矩形 Kelvin 区域
+register_wave_band(WaveBand('Kelvin_box', (2, 14), (3, 20)))
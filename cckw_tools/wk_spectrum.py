@@ -0,0 +1,205 @@
+import numpy as np
+import xarray as xr
+from scipy import signal
+from typing import Optional, Tuple
+
+
+def smooth_121(data: np.ndarray, axis: int = -1, passes: int = 1) -> np.ndarray:
+    """
+    沿指定维度对数组做 passes 次 1-2-1 滑动平滑，两端点保持不变。
+
+    参数：
+    --------
+    data : np.ndarray
+        待平滑的数组。
+    axis : int, optional
+        平滑的维度，默认最后一维。
+    passes : int, optional
+        平滑次数，默认 1。
+
+    返回：
+    --------
+    np.ndarray
+        平滑后的数组（新数组，不修改输入）。
+    """
+    out = np.moveaxis(np.array(data, dtype=float, copy=True), axis, -1)
+    for _ in range(passes):
+        out[..., 1:-1] = 0.25 * out[..., :-2] + 0.5 * out[..., 1:-1] + 0.25 * out[..., 2:]
+    return np.moveaxis(out, -1, axis)
+
+
+def split_cosine_taper(n: int, fraction: float = 0.1) -> np.ndarray:
+    """
+    生成长度为 n 的分裂余弦钟形窗（两端各 fraction/2 的余弦过渡）。
+    """
+    return signal.windows.tukey(n, alpha=fraction)
+
+
+def segment_starts(ntime: int, seg_len: int = 96, overlap: int = 65) -> np.ndarray:
+    """
+    计算重叠分段的起始时间索引。
+
+    参数：
+    --------
+    ntime : int
+        时间序列总长度。
+    seg_len : int, optional
+        每段长度（时间步数），默认 96。
+    overlap : int, optional
+        相邻两段的重叠长度，默认 65。
+
+    返回：
+    --------
+    np.ndarray
+        每段的起始索引。
+    """
+    step = seg_len - overlap
+    if step <= 0:
+        raise ValueError('overlap must be smaller than seg_len')
+    if ntime < seg_len:
+        raise ValueError(f'time series ({ntime}) is shorter than one segment ({seg_len})')
+    return np.arange(0, ntime - seg_len + 1, step)
+
+
+def background_spectrum(
+    rawsym: np.ndarray,
+    rawanti: np.ndarray,
+    frequency: np.ndarray,
+    wn_passes: int = 10
+) -> np.ndarray:
+    """
+    按 Wheeler & Kiladis (1999) 由对称/反对称原始功率谱计算背景谱：
+    两者取平均后沿波数做 wn_passes 次 1-2-1 平滑，再沿频率按频段做
+    1 (f<0.1)、2 (0.1-0.2)、3 (0.2-0.3)、5 (f>=0.3) 次 1-2-1 平滑。
+
+    参数：
+    --------
+    rawsym, rawanti : np.ndarray
+        (frequency, wavenumber) 原始功率谱。
+    frequency : np.ndarray
+        频率坐标 (CPD)。
+    wn_passes : int, optional
+        波数方向的平滑次数，默认 10。
+
+    返回：
+    --------
+    np.ndarray
+        (frequency, wavenumber) 背景谱。
+    """
+    bg = smooth_121(0.5 * (rawsym + rawanti), axis=1, passes=wn_passes)
+    out = np.empty_like(bg)
+    bands = [(0., 0.1, 1), (0.1, 0.2, 2), (0.2, 0.3, 3), (0.3, np.inf, 5)]
+    for f0, f1, passes in bands:
+        sel = (frequency >= f0) & (frequency < f1)
+        if sel.any():
+            out[sel] = smooth_121(bg, axis=0, passes=passes)[sel]
+    return out
+
+
+def wk_spectrum(
+    data: xr.DataArray,
+    seg_len: int = 96,
+    overlap: int = 65,
+    lat_bounds: Tuple[float, float] = (-15, 15),
+    max_wn: int = 20,
+    max_freq: float = 0.5,
+    spd: int = 1,
+    taper: float = 0.1,
+    chunk_segments: int = 16,
+    dtype: Optional[type] = np.float64
+) -> xr.Dataset:
+    """
+    Wheeler-Kiladis 时空谱：将 (time, lat, lon) 日降水分成重叠段，去趋势并加窗，
+    分解为赤道对称/反对称部分，对所有段批量做 (lon, time) 二维实 FFT，
+    对纬度求和、对段求平均，并按 1-2-1 平滑得到背景谱。
+
+    输入按时间块逐段读取（每次 chunk_segments 段），
+    对于 xr.open_dataset 打开的惰性数据，不会把整个数据立方体读入内存。
+
+    参数：
+    --------
+    data : xr.DataArray
+        (time, lat, lon) 日降水（或其距平），纬度需关于赤道对称。
+    seg_len : int, optional
+        每段长度（时间步数），默认 96 天。
+    overlap : int, optional
+        相邻段重叠长度，默认 65 天。
+    lat_bounds : tuple, optional
+        纬度范围，默认 (-15, 15)。
+    max_wn : int, optional
+        输出的最大纬向波数，默认 20。
+    max_freq : float, optional
+        输出的最大频率 (CPD)，默认 0.5。
+    spd : int, optional
+        每天的采样次数，默认 1（日数据）。
+    taper : float, optional
+        分裂余弦窗的比例，默认 0.1。
+    chunk_segments : int, optional
+        每次读入并批量 FFT 的段数，默认 16。
+    dtype : type, optional
+        计算精度，默认 np.float64。
+
+    返回：
+    --------
+    xr.Dataset
+        变量 rawsym, rawanti, background, psumsym, psumanti，
+        维度 (frequency, wavenumber)，与 all_wk_spectra.nc 中单个模式的布局一致，
+        可直接传给 SpectrumPlotter.plot_cmip_future。
+    """
+    data = data.transpose('time', 'lat', 'lon')
+    if data.lat.values[0] > data.lat.values[-1]:
+        data = data.isel(lat=slice(None, None, -1))
+    data = data.sel(lat=slice(*lat_bounds))
+    lat = data.lat.values
+    if not np.allclose(lat, -lat[::-1]):
+        raise ValueError('latitudes must be symmetric about the equator')
+
+    ntime, nlat, nlon = data.shape
+    starts = segment_starts(ntime, seg_len, overlap)
+    window = split_cosine_taper(seg_len, taper).astype(dtype)
+    nfreq = seg_len // 2 + 1
+
+    power = np.zeros((2, nlon, nfreq))
+    for c0 in range(0, len(starts), chunk_segments):
+        chunk = starts[c0:c0 + chunk_segments]
+        t0, t1 = chunk[0], chunk[-1] + seg_len
+        block = np.asarray(data.isel(time=slice(t0, t1)).values, dtype=dtype)
+        # (nseg, lat, lon, seg_len) view, then detrend + taper in one copy
+        segs = np.lib.stride_tricks.sliding_window_view(block, seg_len, axis=0)[chunk - t0]
+        segs = signal.detrend(segs, axis=-1) * window
+        flip = segs[:, ::-1]
+        comp = np.stack([0.5 * (segs + flip), 0.5 * (segs - flip)])
+        spec = np.fft.rfft2(comp, axes=(-2, -1))
+        power += (np.abs(spec) ** 2).sum(axis=(1, 2))
+
+    power /= len(starts) * (nlon * seg_len) ** 2
+
+    # eastward waves exp(i(kx-wt)) land on numpy wavenumber -k for w>0
+    wavenumber = -np.fft.fftfreq(nlon, 1. / nlon)
+    frequency = np.fft.rfftfreq(seg_len, 1. / spd)
+    order = np.argsort(wavenumber)
+    wavenumber = wavenumber[order]
+    power = power[:, order, :].transpose(0, 2, 1)
+
+    rawsym, rawanti = power[0], power[1]
+    background = background_spectrum(rawsym, rawanti, frequency)
+
+    fsel = (frequency > 0) & (frequency <= max_freq)
+    wsel = np.abs(wavenumber) <= max_wn
+    coords = {'frequency': frequency[fsel], 'wavenumber': wavenumber[wsel]}
+    dims = ('frequency', 'wavenumber')
+
+    def _da(arr):
+        return xr.DataArray(arr[fsel][:, wsel], coords=coords, dims=dims)
+
+    return xr.Dataset(
+        {
+            'rawsym': _da(rawsym),
+            'rawanti': _da(rawanti),
+            'background': _da(background),
+            'psumsym': _da(rawsym / background),
+            'psumanti': _da(rawanti / background),
+        },
+        attrs={'seg_len': seg_len, 'overlap': overlap, 'nsegments': len(starts),
+               'lat_bounds': list(lat_bounds), 'spd': spd}
+    )